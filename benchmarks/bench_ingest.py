@@ -0,0 +1,87 @@
+"""
+Benchmark de memoria de la entrada de imágenes al OCR.
+
+Compara el camino anterior (``cv2.imdecode`` a BGR completo, ``cvtColor``,
+umbral y ``Image.fromarray``) con ``OCRService.prepare_image``, que decodifica
+el JPEG directamente en gris y reducido (``IMREAD_REDUCED_GRAYSCALE_*``) y
+entrega a PIL una vista del array sin copiarlo. Se usan fotos sintéticas de
+12 y 24 MP y se mide el pico de memoria con ``tracemalloc`` (los arrays de
+numpy/OpenCV quedan registrados) y el tiempo hasta la imagen lista para
+Tesseract. Tesseract no se ejecuta.
+
+Uso:
+    python benchmarks/bench_ingest.py --denoise
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import synthetic
+from services.ocr_service import OCRService
+
+SIZES = [(4000, 3000), (6000, 4000)]
+
+
+def prepare_full_color(data, denoise):
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if denoise:
+        binary = cv2.fastNlMeansDenoising(binary)
+    return Image.fromarray(binary)
+
+
+def measure(fn, data):
+    tracemalloc.start()
+    start = time.perf_counter()
+    image = fn(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'peak_mb': peak / 2 ** 20, 'ms': elapsed * 1000, 'output': list(image.size)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--denoise', action='store_true',
+                        help='Incluye fastNlMeansDenoising (lento a tamaño completo)')
+    parser.add_argument('--output', help='Ruta opcional para guardar los resultados en JSON')
+    args = parser.parse_args()
+
+    service = OCRService()
+    service.denoise = args.denoise
+    lines = synthetic.generate_lines(40)
+    results = []
+    for width, height in SIZES:
+        data = synthetic.receipt_photo_jpeg(lines, (width, height))
+        before = measure(lambda d: prepare_full_color(d, args.denoise), data)
+        after = measure(service.prepare_image, data)
+        results.append({
+            'megapixels': width * height / 1e6,
+            'jpeg_mb': len(data) / 2 ** 20,
+            'full_color': before,
+            'reduced_gray': after,
+            'peak_ratio': before['peak_mb'] / after['peak_mb'] if after['peak_mb'] else None,
+        })
+        print(f"{width}x{height}: pico {before['peak_mb']:7.1f} MB -> {after['peak_mb']:6.1f} MB  "
+              f"tiempo {before['ms']:7.0f} ms -> {after['ms']:6.0f} ms", file=sys.stderr)
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark de generación de PDFs: documentos por segundo.
+
+Compara el dibujo "desde cero" (como lo hacía ``generate_pdf`` antes de las
+plantillas: fuentes, título y geometría en cada llamada, un ``drawString``
+por celda) con la plantilla cacheada de ``services.pdf_templates``, para
+cuentas de 1, 10 y 200 líneas. Los PDFs se escriben en memoria para no medir
+el disco.
+
+Uso:
+    python benchmarks/bench_pdf.py --seconds 2
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+import synthetic
+from services.pdf_templates import get_template
+
+SIZES = [1, 10, 200]
+
+
+def render_from_scratch(items):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, height - 50, "Bill Splitter - Receipt")
+    c.setFont("Helvetica", 12)
+    c.drawString(50, height - 80, "Date: 2024-01-01 12:00")
+    y = height - 120
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "Items:")
+    y -= 20
+    c.setFont("Helvetica", 10)
+    total = 0
+    for item, price in items.items():
+        c.drawString(50, y, f"{item}")
+        c.drawString(width - 100, y, f"${price:.2f}")
+        total += price
+        y -= 15
+        if y < 50:
+            c.showPage()
+            y = height - 50
+            c.setFont("Helvetica", 10)
+    y -= 20
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "Total:")
+    c.drawString(width - 100, y, f"${total:.2f}")
+    c.save()
+
+
+def render_with_template(items):
+    template = get_template("Bill Splitter - Receipt")
+    template.render(
+        io.BytesIO(),
+        rows=[(str(item), f"${price:.2f}") for item, price in items.items()],
+        totals=[("Total:", f"${sum(items.values()):.2f}", True)],
+        subtitle="Date: 2024-01-01 12:00"
+    )
+
+
+def pdfs_per_second(fn, items, seconds):
+    fn(items)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(items)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help='Duración de cada medición')
+    parser.add_argument('--output', help='Ruta opcional para guardar los resultados en JSON')
+    args = parser.parse_args()
+
+    results = []
+    for size in SIZES:
+        items = synthetic.bill_data(size)['items']
+        scratch = pdfs_per_second(render_from_scratch, items, args.seconds)
+        template = pdfs_per_second(render_with_template, items, args.seconds)
+        results.append({
+            'lines': size,
+            'scratch_pdfs_per_s': scratch,
+            'template_pdfs_per_s': template,
+            'speedup': template / scratch,
+        })
+        print(f"{size:>4} líneas: desde cero {scratch:8.1f}/s  plantilla {template:8.1f}/s",
+              file=sys.stderr)
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+
+
+if __name__ == '__main__':
+    main()
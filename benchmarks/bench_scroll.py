@@ -0,0 +1,119 @@
+"""
+Benchmark de desplazamiento de las listas recicladas.
+
+Carga 5.000 filas en ``ItemsScreen`` y ``HistoryScreen``, recorre la lista de
+arriba a abajo moviendo ``scroll_y`` en cada frame y mide el tiempo de frame.
+También reporta cuántas filas (widgets) llegó a crear cada RecycleView, que
+debe mantenerse constante aunque crezca el número de filas.
+
+Uso:
+    python benchmarks/bench_scroll.py --rows 5000 --frames 600
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.uix.screenmanager import ScreenManager
+
+from ui.main_app import ItemsScreen, HistoryScreen
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ScrollBenchmarkApp(App):
+    """App mínima que desplaza cada lista y registra los tiempos de frame."""
+
+    def __init__(self, rows, frames, **kwargs):
+        super().__init__(**kwargs)
+        self.rows = rows
+        self.frames = frames
+        self.results = {}
+        self._targets = []
+        self._frame_times = []
+        self._frame = 0
+
+    def build(self):
+        sm = ScreenManager()
+        items_screen = ItemsScreen(name='items')
+        history_screen = HistoryScreen(name='history')
+        sm.add_widget(items_screen)
+        sm.add_widget(history_screen)
+
+        items_screen.comensales = ['Comensal 1', 'Comensal 2']
+        items_screen.set_items([(f'Item {i}', f'{i % 97}.50') for i in range(self.rows)])
+        history_screen.set_bills([
+            {'timestamp': f'20240101_{i:06d}', 'total': float(i % 500)}
+            for i in range(self.rows)
+        ])
+
+        self._targets = [
+            ('items', items_screen.items_view),
+            ('history', history_screen.bills_view),
+        ]
+        self.sm = sm
+        Clock.schedule_once(self._start_next, 0.5)
+        return sm
+
+    def _start_next(self, *args):
+        if not self._targets:
+            self.stop()
+            return
+        self._name, self._view = self._targets[0]
+        self.sm.current = self._name
+        self._frame_times = []
+        self._frame = 0
+        self._view.scroll_y = 1
+        Clock.schedule_interval(self._step, 0)
+
+    def _step(self, dt):
+        if self._frame > 0:
+            self._frame_times.append(dt * 1000)
+        self._frame += 1
+        self._view.scroll_y = max(0.0, 1 - self._frame / self.frames)
+        if self._frame <= self.frames:
+            return True
+
+        layout = self._view.layout_manager
+        self.results[self._name] = {
+            'rows': len(self._view.data),
+            'widgets': len(layout.children),
+            'frames': len(self._frame_times),
+            'frame_ms_mean': statistics.mean(self._frame_times),
+            'frame_ms_p95': _percentile(self._frame_times, 95),
+            'frame_ms_max': max(self._frame_times),
+        }
+        self._targets.pop(0)
+        Clock.schedule_once(self._start_next, 0.5)
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--output', help='Ruta opcional para guardar los resultados en JSON')
+    args = parser.parse_args()
+
+    app = ScrollBenchmarkApp(args.rows, args.frames)
+    app.run()
+
+    report = json.dumps(app.results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark de arranque de la aplicación.
+
+Mide dos cosas en procesos nuevos (sin cachés calientes de módulos):
+
+1. ``python -X importtime`` al importar ``ui.main_app``: tiempo acumulado de
+   importación y los módulos más costosos.
+2. Tiempo hasta el primer frame: desde que se lanza el proceso hasta que Kivy
+   dibuja el primer frame de ``BillSplitterApp``.
+
+Uso:
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SRC = os.path.join(ROOT, 'src')
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SRC + os.pathsep + env.get('PYTHONPATH', '')
+    env.setdefault('KIVY_NO_ARGS', '1')
+    return env
+
+
+def measure_importtime(top=10):
+    """Ejecuta ``-X importtime`` y devuelve el total y los módulos más lentos."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ui.main_app'],
+        env=_env(), capture_output=True, text=True
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        # Formato: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(cumulative_us)))
+    total_us = max((us for name, us in modules if name == 'ui.main_app'), default=0)
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+    return {
+        'total_ms': total_us / 1000,
+        'slowest': [{'module': name, 'cumulative_ms': us / 1000} for name, us in slowest],
+        'heavy_loaded': sorted({name.split('.')[0] for name, _ in modules} &
+                               {'cv2', 'pytesseract', 'numpy', 'reportlab'}),
+    }
+
+
+def measure_first_frame():
+    """Lanza la app en un proceso hijo y mide el tiempo hasta el primer frame."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--child'],
+        env=_env(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    for line in proc.stdout:
+        if line.startswith('FIRST_FRAME'):
+            elapsed = time.perf_counter() - start
+            break
+    else:
+        elapsed = float('nan')
+    proc.wait()
+    return elapsed * 1000
+
+
+def _child():
+    from kivy.clock import Clock
+    from ui.main_app import BillSplitterApp
+
+    class FirstFrameApp(BillSplitterApp):
+        def on_start(self):
+            # El callback se ejecuta tras el primer frame dibujado
+            Clock.schedule_once(self._report, 0)
+
+        def _report(self, dt):
+            print('FIRST_FRAME', flush=True)
+            self.stop()
+
+    FirstFrameApp().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='Ruta opcional para guardar los resultados en JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child()
+        return
+
+    importtimes = [measure_importtime() for _ in range(args.runs)]
+    first_frames = [measure_first_frame() for _ in range(args.runs)]
+    results = {
+        'import_ms_median': statistics.median(r['total_ms'] for r in importtimes),
+        'import_slowest': importtimes[-1]['slowest'],
+        'heavy_modules_at_import': importtimes[-1]['heavy_loaded'],
+        'first_frame_ms_median': statistics.median(first_frames),
+        'first_frame_ms_runs': first_frames,
+    }
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+
+
+if __name__ == '__main__':
+    main()
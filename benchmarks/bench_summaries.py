@@ -0,0 +1,87 @@
+"""
+Benchmark de resúmenes de texto: mensajes por segundo.
+
+Compara el armado mensaje a mensaje con f-strings agregados a una lista
+(como lo hacía ``generate_summary``), formateando y escapando cada campo en
+cada mensaje, con ``SummaryRenderer.render_views``, que produce exactamente
+el mismo texto para el lote completo en una pasada con plantillas
+precompiladas.
+Se mide una cuenta (4 comensales) y lotes de 1000 y 5000 cuentas.
+
+Uso:
+    python benchmarks/bench_summaries.py --seconds 2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+from services.summary_renderer import SummaryRenderer, _clean
+
+BILLS = [1, 1000, 5000]
+
+
+def render_one_by_one(views, renderer):
+    money = renderer.format_currency
+    messages = []
+    for view in views:
+        summary = []
+        summary.append(f"Resumen de cuenta para {_clean(view['name'])}")
+        summary.append(f"Fecha: {view['date']}")
+        for description, price in view['items']:
+            summary.append(f"{_clean(description)}: {money(price)}")
+        summary.append(f"Subtotal: {money(view['subtotal'])}")
+        summary.append(f"Propina: {money(view['tip_amount'])}")
+        summary.append(f"Total: {money(view['total'])}")
+        messages.append("\n".join(summary))
+    return messages
+
+
+def messages_per_second(fn, views, seconds):
+    fn(views)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(views)
+        count += len(views)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help='Duración de cada medición')
+    parser.add_argument('--output', help='Ruta opcional para guardar los resultados en JSON')
+    args = parser.parse_args()
+
+    renderer = SummaryRenderer()
+    results = []
+    for bills in BILLS:
+        views = synthetic.diner_views(bills)
+        assert render_one_by_one(views, renderer) == renderer.render_views(views, 'clipboard')
+        naive = messages_per_second(lambda v: render_one_by_one(v, renderer), views, args.seconds)
+        batch = messages_per_second(lambda v: renderer.render_views(v, 'clipboard'), views,
+                                    args.seconds)
+        results.append({
+            'bills': bills,
+            'messages': len(views),
+            'naive_msgs_per_s': naive,
+            'batch_msgs_per_s': batch,
+            'speedup': batch / naive,
+        })
+        print(f"{bills:>5} cuentas: f-strings {naive:10.0f}/s  lote {batch:10.0f}/s",
+              file=sys.stderr)
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Suite de benchmarks de los caminos críticos (OCR, parsing, almacenamiento y
+renderizado).
+
+Cada benchmark se mide con varios tamaños de datos y los resultados se
+guardan en JSON para compararlos entre commits:
+
+    python benchmarks/run.py --output bench.json
+    python benchmarks/run.py --only parse --compare bench.json
+
+Para agregar un benchmark basta decorar una función ``setup(size)`` que
+prepare los datos y devuelva la función a medir.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+
+BENCHMARKS = {}
+
+
+def benchmark(name, sizes, repeat=5):
+    """Registra un benchmark: ``setup(size)`` devuelve la función a medir."""
+    def decorator(setup):
+        BENCHMARKS[name] = {'setup': setup, 'sizes': sizes, 'repeat': repeat}
+        return setup
+    return decorator
+
+
+# Directorio temporal compartido por los benchmarks de una ejecución
+WORK_DIR = tempfile.mkdtemp(prefix='billsplit-bench-')
+
+
+@benchmark('ocr.preprocess_image', sizes=[10, 50, 200])
+def bench_preprocess(size):
+    from services.ocr_service import OCRService
+    service = OCRService()
+    image = synthetic.render_receipt_array(synthetic.generate_lines(size))
+    return lambda: service.preprocess_image(image)
+
+
+@benchmark('ocr.parse_text', sizes=[10, 100, 1000, 10000], repeat=10)
+def bench_parse(size):
+    from services.ocr_service import OCRService
+    service = OCRService()
+    text = synthetic.receipt_text(synthetic.generate_lines(size))
+    return lambda: service._parse_text(text)
+
+
+@benchmark('storage.get_all_bills', sizes=[10, 100, 1000, 10000])
+def bench_get_all_bills(size):
+    import json as _json
+    from services.storage_service import StorageService
+    service = StorageService(os.path.join(WORK_DIR, f'storage_{size}'))
+    with service._get_db() as (conn, cur):
+        cur.execute('DELETE FROM bills')
+        cur.executemany(
+            'INSERT INTO bills (date, total, items, metadata) VALUES (?, ?, ?, ?)',
+            [(f'2024-01-01T00:00:{i % 60:02d}', 10.0 + i,
+              _json.dumps([{'description': d, 'price': float(p)}
+                           for d, p in synthetic.generate_lines(5, seed=i)]), None)
+             for i in range(size)]
+        )
+        conn.commit()
+    return service.get_all_bills
+
+
+@benchmark('share.generate_pdf', sizes=[10, 100, 1000])
+def bench_generate_pdf(size):
+    from services.share_service import ShareService
+    service = ShareService(os.path.join(WORK_DIR, f'share_{size}'))
+    data = synthetic.bill_data(size)
+    renders = itertools.count()
+
+    def generate():
+        # Cada llamada es otra cuenta: se mide el render, no la caché
+        data['render'] = next(renders)
+        return service.generate_pdf(data, filename='bench.pdf')
+    return generate
+
+
+@benchmark('share.generate_pdf.cached', sizes=[10, 100, 1000], repeat=10)
+def bench_generate_pdf_cached(size):
+    from services.share_service import ShareService
+    service = ShareService(os.path.join(WORK_DIR, f'share_cached_{size}'))
+    data = synthetic.bill_data(size)
+    return lambda: service.generate_pdf(data)
+
+
+@benchmark('catalog.snap', sizes=[1000, 10000, 100000], repeat=10)
+def bench_catalog_snap(size):
+    from services.catalog_service import CatalogService
+    catalog = CatalogService()
+    descriptions = synthetic.catalog_descriptions(size)
+    for description in descriptions:
+        catalog.add(description)
+    # 1000 descripciones con un error de OCR cada una
+    sample = descriptions[::max(1, size // 1000)]
+    queries = [synthetic.ocr_typo(d, seed=i) for i, d in enumerate(sample)]
+    return lambda: [catalog.snap(q) for q in queries]
+
+
+def measure(fn, repeat):
+    """Ejecuta una vuelta de calentamiento y ``repeat`` mediciones."""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.mean(timings),
+        'stdev_ms': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(names, repeat=None):
+    results = []
+    for name in names:
+        spec = BENCHMARKS[name]
+        for size in spec['sizes']:
+            try:
+                fn = spec['setup'](size)
+                entry = measure(fn, repeat or spec['repeat'])
+            except Exception as e:
+                entry = {'error': f'{type(e).__name__}: {e}'}
+            entry.update({'name': name, 'size': size})
+            results.append(entry)
+            if 'error' in entry:
+                print(f"{name:<28} {size:>7}  ERROR {entry['error']}", file=sys.stderr)
+            else:
+                print(f"{name:<28} {size:>7}  {entry['median_ms']:10.3f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline_path):
+    """Imprime la relación actual/anterior de la mediana por benchmark y tamaño."""
+    with open(baseline_path) as f:
+        baseline = {(r['name'], r['size']): r for r in json.load(f)['results']}
+    print(f"\nComparación con {baseline_path} (actual / anterior):", file=sys.stderr)
+    for r in results:
+        old = baseline.get((r['name'], r['size']))
+        if old is None or 'median_ms' not in old or 'median_ms' not in r:
+            continue
+        ratio = r['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        print(f"{r['name']:<28} {r['size']:>7}  x{ratio:6.2f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de Bill Splitter')
+    parser.add_argument('--only', action='append', default=[],
+                        help='Ejecuta solo los benchmarks cuyo nombre contenga este texto')
+    parser.add_argument('--repeat', type=int, help='Repeticiones por medición')
+    parser.add_argument('--output', help='Archivo JSON de resultados')
+    parser.add_argument('--compare', help='JSON de una ejecución anterior para comparar')
+    parser.add_argument('--list', action='store_true', help='Lista los benchmarks disponibles')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, spec in BENCHMARKS.items():
+            print(f"{name}  sizes={spec['sizes']}")
+        return
+
+    names = [n for n in BENCHMARKS if not args.only or any(o in n for o in args.only)]
+    try:
+        results = run(names, args.repeat)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Generador determinista de tickets sintéticos para los benchmarks.
+
+Con la misma semilla produce siempre las mismas líneas, el mismo texto y la
+misma imagen, de modo que los resultados son comparables entre commits.
+"""
+import random
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+DISHES = [
+    "Hamburguesa", "Refresco", "Papas fritas", "Ensalada", "Tacos al pastor",
+    "Agua mineral", "Cerveza", "Pizza margarita", "Café americano", "Flan",
+    "Quesadilla", "Enchiladas", "Sopa del día", "Limonada", "Nachos",
+]
+
+LINE_HEIGHT = 30
+MARGIN = 50
+
+
+def generate_lines(count: int, seed: int = 0) -> List[Tuple[str, Decimal]]:
+    """Genera ``count`` líneas (descripción, precio) reproducibles."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        dish = rng.choice(DISHES)
+        if rng.random() < 0.3:
+            dish = f"{dish} {rng.randint(1, 9)}"
+        price = Decimal(rng.randint(100, 25000)) / 100
+        lines.append((dish, price))
+    return lines
+
+
+def receipt_text(lines: List[Tuple[str, Decimal]]) -> str:
+    """Texto de ticket como el que devuelve el OCR."""
+    text = ["RESTAURANTE EJEMPLO", "-------------------"]
+    text += [f"{desc:<20} {price:.2f}" for desc, price in lines]
+    text += ["-------------------", f"Total: {sum(p for _, p in lines):.2f}"]
+    return "\n".join(text)
+
+
+def render_receipt(lines: List[Tuple[str, Decimal]], width: int = 400):
+    """
+    Dibuja el ticket con PIL, igual que ``create_test_image`` en
+    ``tests/test_ocr_service.py`` pero con alto proporcional a las líneas.
+
+    Returns:
+        Imagen PIL en RGB
+    """
+    from PIL import Image, ImageDraw
+
+    text = receipt_text(lines).split("\n")
+    img = Image.new('RGB', (width, 2 * MARGIN + LINE_HEIGHT * len(text)), color='white')
+    draw = ImageDraw.Draw(img)
+    y = MARGIN
+    for line in text:
+        draw.text((MARGIN, y), line, fill='black')
+        y += LINE_HEIGHT
+    return img
+
+
+def render_receipt_array(lines: List[Tuple[str, Decimal]], width: int = 400):
+    """Igual que ``render_receipt`` pero como ``np.ndarray`` BGR (formato de OpenCV)."""
+    import numpy as np
+
+    rgb = np.asarray(render_receipt(lines, width))
+    return np.ascontiguousarray(rgb[:, :, ::-1])
+
+
+def receipt_photo_jpeg(lines: List[Tuple[str, Decimal]], size: Tuple[int, int] = (4000, 3000),
+                       quality: int = 90) -> bytes:
+    """
+    Simula la foto de un ticket: el ticket escalado sobre un fondo gris del
+    tamaño de una cámara (por defecto 12 MP), codificado en JPEG.
+    """
+    import io
+    from PIL import Image
+
+    width, height = size
+    receipt = render_receipt(lines)
+    scale = min(width * 0.6 / receipt.width, height * 0.9 / receipt.height)
+    receipt = receipt.resize((int(receipt.width * scale), int(receipt.height * scale)))
+    photo = Image.new('RGB', size, color=(96, 96, 96))
+    photo.paste(receipt, ((width - receipt.width) // 2, (height - receipt.height) // 2))
+    buffer = io.BytesIO()
+    photo.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def bill_data(count: int, seed: int = 0) -> Dict:
+    """Datos de cuenta en el formato de ``ShareService``/``StorageService``."""
+    items: Dict[str, float] = {}
+    for i, (desc, price) in enumerate(generate_lines(count, seed)):
+        items[f"{desc} #{i}"] = float(price)
+    return {'items': items}
+
+
+MODIFIERS = ["doble", "chica", "grande", "con queso", "sin cebolla", "de la casa", "especial",
+             "light"]
+
+
+def catalog_descriptions(count: int, seed: int = 0) -> List[str]:
+    """``count`` descripciones distintas de ítems para el catálogo."""
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "ma", "ri", "te", "su", "po", "ne", "la", "chi", "to", "ba", "de",
+                 "gu"]
+    # Vocabulario de platos inventados para llegar a 100k+ combinaciones
+    vocabulary = [w.lower() for dish in DISHES for w in dish.split()]
+    vocabulary += ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+                   for _ in range(3000)]
+    found = set()
+    while len(found) < count:
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.4:
+            words.append(rng.choice(MODIFIERS))
+        found.add(" ".join(words).capitalize())
+    return sorted(found)
+
+
+def ocr_typo(text: str, seed: int = 0) -> str:
+    """Copia de ``text`` con un error de OCR (carácter borrado, cambiado o insertado)."""
+    rng = random.Random(seed)
+    i = rng.randrange(len(text))
+    kind = rng.random()
+    if kind < 0.33:
+        return text[:i] + text[i + 1:]
+    if kind < 0.66:
+        return text[:i] + rng.choice("0ilco") + text[i + 1:]
+    return text[:i] + rng.choice("aeo") + text[i:]
+
+
+def diner_views(bills: int, diners: int = 4, items_per_diner: int = 5, seed: int = 0) -> List[Dict]:
+    """Vistas por comensal como las de ``ShareService._diner_view``."""
+    rng = random.Random(seed)
+    views = []
+    for b in range(bills):
+        for d in range(diners):
+            items = generate_lines(items_per_diner, seed=rng.randint(0, 2 ** 31))
+            subtotal = sum(price for _, price in items)
+            tip = (subtotal * Decimal('0.15')).quantize(Decimal('0.01'))
+            views.append({
+                'name': f"Comensal {d + 1}",
+                'date': f"2024-01-{b % 28 + 1:02d} 21:00",
+                'items': items,
+                'subtotal': subtotal,
+                'tip_amount': tip,
+                'total': subtotal + tip,
+            })
+    return views
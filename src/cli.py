@@ -0,0 +1,236 @@
+"""
+Interfaz de línea de comandos sin interfaz gráfica.
+
+Uso:
+    python src/cli.py batch <directorio> [--output DIR] [--storage DIR] [--workers N]
+    python src/cli.py serve [--host HOST] [--port PORT] [--storage DIR] [--workers N]
+    python src/cli.py --metrics-file metrics.json batch <directorio>
+    python src/cli.py replay <corpus> [--workers N] [--engine MODULO:CLASE] [--param CLAVE=VALOR]
+
+No importa Kivy: está pensada para procesar tickets en servidores o tareas
+programadas.
+"""
+import argparse
+import os
+import sys
+
+def _print_progress(done, total, result):
+    if result.error:
+        status = f"error: {result.error}"
+    else:
+        status = f"{len(result.items)} items ({'ok' if result.valid else 'no válido'})"
+        if result.duplicates:
+            status += f", posible duplicado de {', '.join(result.duplicates)}"
+    print(f"[{done}/{total}] {result.path}: {status}", file=sys.stderr, flush=True)
+
+def _make_ocr(args, profile_store=None):
+    from services.capture_service import CaptureStore, capture_store_from_env
+    from services.ocr_service import OCRService
+
+    capture_store = CaptureStore(args.capture) if args.capture else capture_store_from_env()
+    service = OCRService(capture_store=capture_store, profile_store=profile_store)
+    service.quality_gate = getattr(args, 'quality_gate', False)
+    return service
+
+def run_batch(args) -> int:
+    """Procesa un directorio de tickets y muestra las estadísticas."""
+    from services.batch_service import BatchPipeline, find_images
+    from services.storage_service import StorageService
+    from services.share_service import ShareService
+
+    paths = find_images(args.directory)
+    if not paths:
+        print(f"No se encontraron imágenes en {args.directory}", file=sys.stderr)
+        return 1
+
+    storage = StorageService(args.storage)
+    ocr = _make_ocr(args, profile_store=storage)
+    pipeline = BatchPipeline(
+        ocr,
+        storage,
+        ShareService(args.output),
+        ocr_workers=args.workers,
+        queue_size=args.queue_size
+    )
+    results, stats = pipeline.run(paths, progress=None if args.quiet else _print_progress)
+    # Los perfiles de comercio aprendidos en el lote quedan guardados
+    ocr.wait_learning()
+
+    print(f"Procesados: {stats.processed}/{stats.total}  "
+          f"no válidos: {stats.invalid}  errores: {stats.failed}")
+    print(f"Tiempo: {stats.elapsed:.2f}s  ({stats.throughput:.2f} tickets/s)")
+    print("Tiempo por etapa: " + ", ".join(
+        f"{stage} {seconds:.2f}s" for stage, seconds in stats.stage_seconds.items()))
+    return 0 if stats.failed == 0 else 2
+
+def run_server(args) -> int:
+    """Arranca la API HTTP local hasta que se interrumpa con Ctrl+C."""
+    import asyncio
+    from services.api_server import ApiServer
+    from services.storage_service import StorageService
+    from services.share_service import ShareService
+
+    storage = StorageService(args.storage)
+    server = ApiServer(
+        _make_ocr(args, profile_store=storage),
+        storage,
+        host=args.host,
+        port=args.port,
+        share_service=ShareService(args.output),
+        workers=args.workers,
+        max_batch=args.max_batch,
+        queue_size=args.queue_size
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def _parse_param(text: str):
+    key, sep, value = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Se esperaba CLAVE=VALOR: {text}")
+    if value.lower() in ('true', 'false'):
+        return key, value.lower() == 'true'
+    try:
+        return key, int(value)
+    except ValueError:
+        return key, value
+
+def _load_engine_factory(spec: str, params):
+    """Fábrica de motores 'modulo:Clase' con los atributos de ``--param`` aplicados."""
+    import importlib
+
+    module_name, _, class_name = spec.partition(':')
+    engine_class = getattr(importlib.import_module(module_name), class_name)
+
+    def factory():
+        engine = engine_class()
+        for key, value in params:
+            if not hasattr(engine, key):
+                raise AttributeError(f"{spec} no tiene el parámetro '{key}'")
+            setattr(engine, key, value)
+        return engine
+    return factory
+
+def run_replay(args) -> int:
+    """Reproduce el corpus capturado y muestra exactitud y latencias."""
+    import json
+    from services.capture_service import CaptureStore, ReplayRunner
+
+    store = CaptureStore(args.corpus)
+    if not len(store):
+        print(f"No hay tickets capturados en {args.corpus}", file=sys.stderr)
+        return 1
+
+    def progress(done, total, result):
+        status = f"error: {result.error}" if result.error else (
+            f"{result.price_matched}/{result.expected} items, {result.seconds * 1000:.0f} ms")
+        print(f"[{done}/{total}] {result.sha256[:12]}: {status}", file=sys.stderr, flush=True)
+
+    runner = ReplayRunner(store, _load_engine_factory(args.engine, args.param),
+                          workers=args.workers)
+    report = runner.run(progress=None if args.quiet else progress)
+    summary = report.summary()
+
+    print(f"Tickets: {summary['receipts']}  exactos: {summary['exact_receipts']}  "
+          f"errores: {summary['errors']}")
+    print(f"Items: recall {summary['item_recall']:.1%}  "
+          f"precisión {summary['item_precision']:.1%}  "
+          f"precios {summary['price_accuracy']:.1%}")
+    latency = summary['latency_ms']
+    print(f"Latencia: p50 {latency['p50']:.0f} ms  p95 {latency['p95']:.0f} ms  "
+          f"p99 {latency['p99']:.0f} ms")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2, default=str)
+    return 0 if summary['errors'] == 0 else 2
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='billsplit',
+                                     description='Bill Splitter sin interfaz gráfica')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Muestra también los mensajes de depuración')
+    parser.add_argument('--log-json', action='store_true',
+                        help='Registros en JSON, uno por línea '
+                             '(también BILLSPLIT_LOG_FORMAT=json)')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Mide latencias y errores de los servicios '
+                             '(también BILLSPLIT_METRICS=1)')
+    parser.add_argument('--metrics-file',
+                        help='Guarda las métricas de los servicios en JSON al terminar')
+    parser.add_argument('--profile', action='store_true',
+                        help='Perfila cada sesión de OCR en <storage>/profiles '
+                             '(también BILLSPLIT_PROFILE=1)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help='Procesa un directorio de imágenes de tickets')
+    batch.add_argument('directory', help='Directorio con las imágenes')
+    batch.add_argument('--output', default='output', help='Directorio para los resúmenes')
+    batch.add_argument('--storage', default='data', help='Directorio de almacenamiento')
+    batch.add_argument('--workers', type=int, default=2, help='Hilos de OCR en paralelo')
+    batch.add_argument('--queue-size', type=int, default=8,
+                       help='Capacidad de las colas entre etapas')
+    batch.add_argument('--quiet', action='store_true', help='No mostrar el progreso por ticket')
+    batch.add_argument('--capture',
+                       help='Guarda cada ticket en este corpus (también BILLSPLIT_CAPTURE_DIR)')
+    batch.set_defaults(func=run_batch)
+
+    serve = subparsers.add_parser('serve', help='Arranca la API HTTP local')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--storage', default='data', help='Directorio de almacenamiento')
+    serve.add_argument('--output', default='output', help='Directorio de salida de ShareService')
+    serve.add_argument('--workers', type=int, default=2, help='Hilos de OCR en paralelo')
+    serve.add_argument('--max-batch', type=int, default=4, help='Imágenes por micro-lote de OCR')
+    serve.add_argument('--queue-size', type=int, default=32,
+                       help='Peticiones de OCR en espera antes de responder 503')
+    serve.add_argument('--capture',
+                       help='Guarda cada ticket en este corpus (también BILLSPLIT_CAPTURE_DIR)')
+    serve.add_argument('--quality-gate', action='store_true',
+                       help='Rechaza con 422 las fotos movidas, con reflejos o inclinadas '
+                            'antes del OCR')
+    serve.set_defaults(func=run_server)
+
+    replay = subparsers.add_parser('replay',
+                                   help='Reproduce un corpus capturado y mide exactitud y latencia')
+    replay.add_argument('corpus', help='Directorio del corpus (CaptureStore)')
+    replay.add_argument('--workers', type=int, default=4, help='Tickets en paralelo')
+    replay.add_argument('--engine', default='services.ocr_service:OCRService',
+                        help='Motor de OCR como modulo:Clase (con read_items, como OCRService)')
+    replay.add_argument('--param', type=_parse_param, action='append', default=[],
+                        help='Atributo del motor a cambiar, p. ej. lang=spa o denoise=false')
+    replay.add_argument('--output', help='Guarda el informe completo en JSON')
+    replay.add_argument('--quiet', action='store_true', help='No mostrar el progreso por ticket')
+    replay.set_defaults(func=run_replay)
+
+    return parser
+
+def _configure_profiler(args) -> None:
+    from services import profiler
+
+    if args.profile:
+        profiler.configure(enabled=True)
+    if getattr(args, 'storage', None) and 'BILLSPLIT_PROFILE_DIR' not in os.environ:
+        profiler.configure(output_dir=os.path.join(args.storage, 'profiles'))
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    from services.logging_config import setup_logging
+    setup_logging(level='DEBUG' if args.verbose else None,
+                  json_format=True if args.log_json else None)
+    _configure_profiler(args)
+    if not (args.metrics or args.metrics_file):
+        return args.func(args)
+
+    from services.instrumentation import registry
+    registry.enable()
+    try:
+        return args.func(args)
+    finally:
+        if args.metrics_file:
+            registry.write_json(args.metrics_file)
+
+if __name__ == '__main__':
+    sys.exit(main())
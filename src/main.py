@@ -1,4 +1,6 @@
+from services.logging_config import setup_logging
 from ui.main_app import BillSplitterApp
 
 if __name__ == '__main__':
-    BillSplitterApp().run() 
\ No newline at end of file
+    setup_logging()
+    BillSplitterApp().run()
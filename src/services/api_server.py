@@ -0,0 +1,494 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from typing import Any, Callable, Deque, Dict, List, Optional
+import logging
+
+from .image_ingest import decode_image
+from .image_quality import ImageQualityError
+from .instrumentation import registry
+from .profiler import profile_session
+
+logger = logging.getLogger(__name__)
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    422: 'Unprocessable Entity',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+class QueueFullError(Exception):
+    """La cola de OCR está llena: el cliente debe reintentar más tarde."""
+
+class HTTPError(Exception):
+    """Error que se devuelve al cliente con un código HTTP."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _decode_image(data: bytes) -> Any:
+    return decode_image(data)
+
+def calculate_split(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calcula lo que debe pagar cada comensal.
+
+    Args:
+        payload: ``{"items": [{"description", "price", "diner"}], "tip_percentage"}``
+
+    Returns:
+        Subtotal, propina y total por comensal y de la cuenta completa
+    """
+    cents = Decimal('0.01')
+    items = payload.get('items')
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise HTTPError(400, "Cuenta no válida: 'items' debe ser una lista de objetos")
+    try:
+        tip_percentage = Decimal(str(payload.get('tip_percentage', 0)))
+        subtotals: Dict[str, Decimal] = {}
+        for item in items:
+            diner = item.get('diner') or 'Sin asignar'
+            subtotals[diner] = subtotals.get(diner, Decimal('0')) + Decimal(str(item['price']))
+    except (KeyError, TypeError, InvalidOperation) as e:
+        raise HTTPError(400, f"Cuenta no válida: {e}")
+
+    diners = []
+    for name, subtotal in subtotals.items():
+        tip_amount = (subtotal * tip_percentage / 100).quantize(cents, rounding=ROUND_HALF_UP)
+        diners.append({
+            'name': name,
+            'subtotal': str(subtotal),
+            'tip_amount': str(tip_amount),
+            'total': str(subtotal + tip_amount)
+        })
+    subtotal = sum(subtotals.values(), Decimal('0'))
+    tip_amount = (subtotal * tip_percentage / 100).quantize(cents, rounding=ROUND_HALF_UP)
+    return {
+        'diners': diners,
+        'subtotal': str(subtotal),
+        'tip_amount': str(tip_amount),
+        'total': str(subtotal + tip_amount)
+    }
+
+class Metrics:
+    """Latencias y contadores por ruta, calculados sobre una ventana reciente."""
+
+    def __init__(self, window: int = 1000):
+        self.started = time.monotonic()
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._batch_sizes: Deque[int] = deque(maxlen=window)
+        self.rejected = 0
+
+    def record(self, route: str, seconds: float, error: bool = False) -> None:
+        self._latencies.setdefault(route, deque(maxlen=self.window)).append(seconds)
+        self._counts[route] = self._counts.get(route, 0) + 1
+        if error:
+            self._errors[route] = self._errors.get(route, 0) + 1
+
+    def record_batch(self, size: int) -> None:
+        self._batch_sizes.append(size)
+
+    @staticmethod
+    def _percentile(ordered: List[float], pct: float) -> float:
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self, queue_depth: int = 0) -> Dict[str, Any]:
+        uptime = time.monotonic() - self.started
+        routes = {}
+        for route, latencies in self._latencies.items():
+            ordered = sorted(latencies)
+            routes[route] = {
+                'count': self._counts[route],
+                'errors': self._errors.get(route, 0),
+                'throughput_rps': self._counts[route] / uptime if uptime else 0.0,
+                'latency_ms': {
+                    'p50': self._percentile(ordered, 50) * 1000,
+                    'p95': self._percentile(ordered, 95) * 1000,
+                    'p99': self._percentile(ordered, 99) * 1000,
+                    'max': ordered[-1] * 1000,
+                }
+            }
+        batches = list(self._batch_sizes)
+        return {
+            'uptime_s': uptime,
+            'routes': routes,
+            'ocr': {
+                'queue_depth': queue_depth,
+                'rejected': self.rejected,
+                'batches': len(batches),
+                'mean_batch_size': sum(batches) / len(batches) if batches else 0.0,
+            }
+        }
+
+class OCRBatcher:
+    """
+    Agrupa peticiones de OCR concurrentes en micro-lotes.
+
+    Las peticiones entran en una cola acotada; si está llena se rechazan de
+    inmediato (``QueueFullError``) en lugar de acumular trabajo. Un colector
+    saca de la cola hasta ``max_batch`` imágenes (esperando como mucho
+    ``max_wait`` segundos a que lleguen más) y reparte las del lote entre
+    los hilos del pool, una por hilo: Tesseract corre en un proceso aparte,
+    así que las imágenes de un lote se leen en paralelo. Las fotos con
+    varios tickets (``submit_receipts``) pasan por la misma cola y ocupan
+    un hilo cada una.
+    """
+
+    def __init__(self, ocr_service, workers: int = 2, max_batch: int = 4,
+                 max_wait: float = 0.0, queue_size: int = 32,
+                 decoder: Callable[[bytes], Any] = _decode_image,
+                 metrics: Optional[Metrics] = None):
+        self.ocr_service = ocr_service
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.decoder = decoder
+        self.metrics = metrics or Metrics()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-ocr')
+        self._slots = asyncio.Semaphore(workers)
+        self._collector: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._collector = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self) -> None:
+        if self._collector:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, data: bytes) -> Dict[str, float]:
+        """Encola una imagen y espera su resultado."""
+        return await self._enqueue(data, self._process)
+
+    async def submit_receipts(self, data: bytes) -> List[Dict[str, float]]:
+        """Encola una foto con varios tickets y espera los items de cada uno."""
+        return await self._enqueue(data, self._process_receipts)
+
+    async def _enqueue(self, data: bytes, process: Callable[[bytes], Any]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((data, process, future))
+        except asyncio.QueueFull:
+            self.metrics.rejected += 1
+            raise QueueFullError("Cola de OCR llena")
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.metrics.record_batch(len(batch))
+            # Una imagen por hilo libre: si todos están ocupados, la cola se
+            # llena y se aplica contrapresión a los clientes
+            for data, process, future in batch:
+                await self._slots.acquire()
+                loop.create_task(self._run_one(data, process, future))
+
+    async def _run_one(self, data: bytes, process: Callable[[bytes], Any],
+                       future: asyncio.Future) -> None:
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, process, data)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def _process(self, data: bytes) -> Dict[str, float]:
+        return self.ocr_service.process_image(self.decoder(data))
+
+    def _process_receipts(self, data: bytes) -> List[Dict[str, float]]:
+        # OCRService decodifica la foto con más resolución para separar los
+        # tickets y los reparte en su propio pool (de tamaño fijo)
+        return self.ocr_service.process_receipts(data)
+
+class ApiServer:
+    """
+    Servidor HTTP local (asyncio, sin dependencias externas) para OCR y
+    división de cuentas.
+
+    Rutas:
+        POST /ocr      cuerpo: imagen (jpg/png); devuelve los items detectados
+        POST /ocr/receipts  cuerpo: foto con varios tickets; devuelve los items de cada uno
+        POST /split    cuerpo: JSON de la cuenta; devuelve el reparto
+        POST /bills    cuerpo: JSON de la cuenta; la guarda con StorageService
+        POST /render/pdf   cuerpo: JSON de la cuenta; devuelve el PDF generado en memoria
+        POST /render/json  cuerpo: JSON de la cuenta; devuelve el JSON de ShareService
+        GET  /bills    lista las cuentas guardadas
+        GET  /metrics  latencias, throughput y estado de la cola
+        GET  /metrics/prometheus  métricas de los servicios en formato Prometheus
+        GET  /health
+    """
+
+    def __init__(self, ocr_service, storage_service=None, host: str = '127.0.0.1',
+                 port: int = 8080, max_body: int = 20 * 1024 * 1024, share_service=None,
+                 **batcher_options):
+        self.ocr_service = ocr_service
+        self.storage_service = storage_service
+        self.share_service = share_service
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.metrics = Metrics()
+        self._batcher_options = batcher_options
+        self.batcher: Optional[OCRBatcher] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.logger = logging.getLogger(__name__)
+        self._routes = {
+            ('POST', '/ocr'): self._handle_ocr,
+            ('POST', '/ocr/receipts'): self._handle_ocr_receipts,
+            ('POST', '/split'): self._handle_split,
+            ('POST', '/bills'): self._handle_save_bill,
+            ('GET', '/bills'): self._handle_list_bills,
+            ('POST', '/render/pdf'): self._handle_render_pdf,
+            ('POST', '/render/json'): self._handle_render_json,
+            ('GET', '/metrics'): self._handle_metrics,
+            ('GET', '/metrics/prometheus'): self._handle_prometheus,
+            ('GET', '/health'): self._handle_health,
+        }
+
+    async def start(self) -> None:
+        """Arranca el servidor; ``self.port`` queda con el puerto real."""
+        self.batcher = OCRBatcher(self.ocr_service, metrics=self.metrics, **self._batcher_options)
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info("API escuchando en http://%s:%s", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.batcher:
+            await self.batcher.stop()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, {'error': 'Línea de petición no válida'},
+                                        close=True)
+                    break
+                method, target, _ = parts
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': 'Content-Length no válido'},
+                                        close=True)
+                    break
+                if length > self.max_body:
+                    await self._respond(writer, 413, {'error': 'Cuerpo demasiado grande'},
+                                        close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                path = target.split('?', 1)[0]
+                status, payload, extra_headers = await self._dispatch(method, path, body)
+                await self._respond(writer, status, payload, extra_headers, close=not keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes):
+        start = time.perf_counter()
+        handler = self._routes.get((method, path))
+        headers: Dict[str, str] = {}
+        error = False
+        try:
+            if handler is None:
+                known = any(route_path == path for _, route_path in self._routes)
+                raise HTTPError(405 if known else 404, f"Ruta no encontrada: {method} {path}")
+            status, payload = 200, await handler(body)
+            if isinstance(payload, tuple):
+                # Respuesta binaria: (contenido, tipo MIME)
+                payload, headers['Content-Type'] = payload
+        except QueueFullError as e:
+            status, payload, error = 503, {'error': str(e)}, True
+            headers['Retry-After'] = '1'
+        except HTTPError as e:
+            status, payload, error = e.status, {'error': str(e)}, True
+        except ImageQualityError as e:
+            # Captura rechazada antes del OCR: el cliente debe repetir la foto
+            status, payload, error = 422, {'error': str(e), 'quality': e.verdict.to_dict()}, True
+        except Exception as e:
+            self.logger.error("Error atendiendo %s %s: %s", method, path, e)
+            status, payload, error = 500, {'error': str(e)}, True
+        if handler is not None:
+            self.metrics.record(path, time.perf_counter() - start, error)
+        return status, payload, headers
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any,
+                       headers: Optional[Dict[str, str]] = None, close: bool = False) -> None:
+        headers = dict(headers or {})
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            # Se envía tal cual, sin copiar el buffer
+            body = payload
+            content_type = headers.pop('Content-Type', 'application/octet-stream')
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        lines = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {memoryview(body).nbytes}",
+            f"Connection: {'close' if close else 'keep-alive'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        writer.write(body)
+        await writer.drain()
+
+    def _parse_json(self, body: bytes) -> Dict[str, Any]:
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError as e:
+            raise HTTPError(400, f"JSON no válido: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Se esperaba un objeto JSON")
+        return payload
+
+    async def _handle_ocr(self, body: bytes) -> Dict[str, Any]:
+        if not body:
+            raise HTTPError(400, "Falta la imagen")
+        return {'items': await self.batcher.submit(body)}
+
+    async def _handle_ocr_receipts(self, body: bytes) -> Dict[str, Any]:
+        if not body:
+            raise HTTPError(400, "Falta la imagen")
+        receipts = await self.batcher.submit_receipts(body)
+        return {'receipts': [{'items': items} for items in receipts]}
+
+    async def _handle_split(self, body: bytes) -> Dict[str, Any]:
+        payload = self._parse_json(body)
+        items = payload.get('items')
+        item_count = len(items) if isinstance(items, list) else 0
+        with profile_session('split', metadata={'items': item_count}):
+            return calculate_split(payload)
+
+    async def _handle_save_bill(self, body: bytes) -> Dict[str, Any]:
+        if self.storage_service is None:
+            raise HTTPError(404, "Almacenamiento no configurado")
+        bill_data = self._parse_json(body)
+        items = bill_data.get('items', {})
+        if not isinstance(items, dict) or not all(
+                isinstance(price, (int, float)) and not isinstance(price, bool)
+                for price in items.values()):
+            raise HTTPError(400,
+                            "Cuenta no válida: 'items' debe ser un objeto descripción -> precio")
+        filename = await asyncio.get_running_loop().run_in_executor(
+            None, self.storage_service.save_bill, bill_data)
+        return {'filename': filename,
+                'possible_duplicates': bill_data.get('possible_duplicates', [])}
+
+    async def _handle_list_bills(self, body: bytes) -> Dict[str, Any]:
+        if self.storage_service is None:
+            raise HTTPError(404, "Almacenamiento no configurado")
+        bills = await asyncio.get_running_loop().run_in_executor(
+            None, self.storage_service.list_bills)
+        return {'bills': bills}
+
+    async def _handle_render_pdf(self, body: bytes):
+        if self.share_service is None:
+            raise HTTPError(404, "ShareService no configurado")
+        bill_data = self._parse_json(body)
+        pdf = await asyncio.get_running_loop().run_in_executor(
+            None, self.share_service.render_pdf, bill_data)
+        return pdf, 'application/pdf'
+
+    async def _handle_render_json(self, body: bytes):
+        if self.share_service is None:
+            raise HTTPError(404, "ShareService no configurado")
+        rendered = self.share_service.render_json(self._parse_json(body))
+        return rendered, 'application/json; charset=utf-8'
+
+    async def _handle_metrics(self, body: bytes) -> Dict[str, Any]:
+        snapshot = self.metrics.snapshot(self.batcher.queue.qsize() if self.batcher else 0)
+        # Latencias por operación de OCR/almacenamiento/compartir (si están activas)
+        snapshot['services'] = registry.snapshot()
+        return snapshot
+
+    async def _handle_prometheus(self, body: bytes):
+        return registry.to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+
+    async def _handle_health(self, body: bytes) -> Dict[str, Any]:
+        return {'status': 'ok'}
+
+class BackgroundServer:
+    """Ejecuta un ``ApiServer`` en un hilo con su propio event loop (pruebas, embebido)."""
+
+    def __init__(self, server: ApiServer):
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='api-server',
+                                        daemon=True)
+
+    def __enter__(self) -> ApiServer:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        return self.server
+
+    def __exit__(self, *exc_info) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
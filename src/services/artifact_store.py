@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Artifact:
+    """Archivo generado bajo control del almacén."""
+    path: str
+    size: int
+    last_access: float
+    leases: int = 0
+
+class ArtifactStore:
+    """
+    Ciclo de vida de los archivos generados en un directorio de salida.
+
+    - Leases: mientras alguien comparte un archivo (``lease``) nadie lo borra.
+    - TTL: un hilo en segundo plano elimina los archivos sin lease que no se
+      usan desde hace más de ``ttl`` segundos.
+    - Cuota: si el directorio supera ``quota_bytes`` se expulsan primero los
+      archivos sin lease usados hace más tiempo.
+
+    Hay un único almacén por directorio (``for_directory``), de modo que
+    todas las instancias de ShareService que escriben en el mismo sitio
+    respetan los leases de las demás.
+
+    Solo se gestionan los archivos registrados (``register``): el resto del
+    directorio (archivos del usuario, resúmenes de lote, la caché de render)
+    nunca se borra.
+    """
+
+    _stores: Dict[str, 'ArtifactStore'] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, root: str, quota_bytes: int = 256 * 1024 * 1024, ttl: float = 3600,
+                 sweep_interval: float = 60, start_sweeper: bool = True):
+        self.root = os.path.realpath(root)
+        self.quota_bytes = quota_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.start_sweeper = start_sweeper
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._artifacts: Dict[str, Artifact] = {}
+        self._total_bytes = 0
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        os.makedirs(self.root, exist_ok=True)
+
+    @classmethod
+    def for_directory(cls, root: str, **options) -> 'ArtifactStore':
+        """Devuelve el almacén compartido de un directorio (lo crea la primera vez)."""
+        key = os.path.realpath(root)
+        with cls._stores_lock:
+            store = cls._stores.get(key)
+            if store is None:
+                store = cls(root, **options)
+                cls._stores[key] = store
+            return store
+
+    def _add(self, path: str, size: int, last_access: float) -> Artifact:
+        artifact = self._artifacts.get(path)
+        if artifact is not None:
+            self._total_bytes += size - artifact.size
+            artifact.size = size
+            artifact.last_access = last_access
+            return artifact
+        artifact = Artifact(path, size, last_access)
+        self._artifacts[path] = artifact
+        self._total_bytes += size
+        return artifact
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def register(self, path: str) -> str:
+        """
+        Pone bajo control un archivo recién generado.
+
+        Args:
+            path: Ruta del archivo dentro del directorio del almacén
+
+        Returns:
+            La misma ruta
+        """
+        real_path = os.path.realpath(path)
+        with self._lock:
+            self._add(real_path, os.path.getsize(real_path), time.time())
+            self._enforce_quota()
+        self._ensure_sweeper()
+        return path
+
+    def touch(self, path: str) -> bool:
+        """
+        Marca como usado un archivo registrado que sigue en disco.
+
+        Returns:
+            False si el archivo no está registrado o ya no existe
+        """
+        real_path = os.path.realpath(path)
+        with self._lock:
+            artifact = self._artifacts.get(real_path)
+            if artifact is None:
+                return False
+            if not os.path.exists(real_path):
+                # Alguien lo borró por fuera: se olvida
+                self._artifacts.pop(real_path)
+                self._total_bytes -= artifact.size
+                return False
+            artifact.last_access = time.time()
+            return True
+
+    def acquire(self, path: str) -> None:
+        """Toma un lease sobre el archivo: no se borrará hasta ``release``."""
+        with self._lock:
+            artifact = self._artifacts.get(os.path.realpath(path))
+            if artifact is None:
+                raise FileNotFoundError(f"Archivo no registrado: {path}")
+            artifact.leases += 1
+            artifact.last_access = time.time()
+
+    def release(self, path: str) -> None:
+        """Libera un lease tomado con ``acquire``."""
+        with self._lock:
+            artifact = self._artifacts.get(os.path.realpath(path))
+            if artifact is not None and artifact.leases > 0:
+                artifact.leases -= 1
+                artifact.last_access = time.time()
+
+    @contextmanager
+    def lease(self, path: str) -> Iterator[str]:
+        """Context manager: el archivo está protegido mientras dure el bloque."""
+        self.acquire(path)
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def discard(self, paths: List[str]) -> int:
+        """
+        Elimina ya los archivos indicados que no tengan leases.
+
+        Returns:
+            Número de archivos eliminados
+        """
+        removed = 0
+        with self._lock:
+            for path in paths:
+                artifact = self._artifacts.get(os.path.realpath(path))
+                if artifact is not None and artifact.leases == 0:
+                    self._remove(artifact)
+                    removed += 1
+        return removed
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Elimina los archivos sin lease que superaron el TTL y aplica la cuota.
+
+        Returns:
+            Número de archivos eliminados
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [a for a in self._artifacts.values()
+                       if a.leases == 0 and now - a.last_access > self.ttl]
+            for artifact in expired:
+                self._remove(artifact)
+            return len(expired) + self._enforce_quota()
+
+    def _enforce_quota(self) -> int:
+        if self._total_bytes <= self.quota_bytes:
+            return 0
+        removed = 0
+        candidates = sorted((a for a in self._artifacts.values() if a.leases == 0),
+                            key=lambda a: a.last_access)
+        for artifact in candidates:
+            if self._total_bytes <= self.quota_bytes:
+                break
+            self._remove(artifact)
+            removed += 1
+        if self._total_bytes > self.quota_bytes:
+            self.logger.warning("Cuota de %s superada por archivos con lease activo", self.root)
+        return removed
+
+    def _remove(self, artifact: Artifact) -> None:
+        self._artifacts.pop(artifact.path, None)
+        self._total_bytes -= artifact.size
+        try:
+            os.remove(artifact.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning("Error eliminando archivo temporal %s: %s", artifact.path, e)
+
+    def _ensure_sweeper(self) -> None:
+        if not self.start_sweeper or self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name='artifact-sweeper',
+                                                 daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                self.logger.error("Error limpiando archivos temporales: %s", e)
+
+    def stop(self) -> None:
+        """Detiene el hilo de limpieza."""
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
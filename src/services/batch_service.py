@@ -0,0 +1,242 @@
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from .image_hash import phash
+from .image_ingest import decode_image
+from .receipt_fingerprint import to_hex
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+# Marca de fin de flujo entre etapas
+_DONE = object()
+
+@dataclass
+class BatchResult:
+    """Resultado del procesamiento de un ticket."""
+    path: str
+    items: List[Tuple[str, Decimal]] = field(default_factory=list)
+    valid: bool = False
+    filename: Optional[str] = None
+    summary_path: Optional[str] = None
+    error: Optional[str] = None
+    image_hash: Optional[int] = None
+    # Cuentas ya guardadas que parecen el mismo ticket
+    duplicates: List[str] = field(default_factory=list)
+
+@dataclass
+class BatchStats:
+    """Estadísticas de una ejecución del pipeline."""
+    total: int = 0
+    processed: int = 0
+    invalid: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    stage_seconds: Dict[str, float] = field(
+        default_factory=lambda: {'ocr': 0.0, 'parse': 0.0, 'write': 0.0})
+
+    @property
+    def throughput(self) -> float:
+        """Tickets por segundo."""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+def find_images(directory: str) -> List[str]:
+    """
+    Lista las imágenes de ticket de un directorio (recursivo, orden estable).
+
+    Args:
+        directory: Directorio a recorrer
+
+    Returns:
+        Rutas de las imágenes encontradas
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+def _read_image(path: str) -> Any:
+    try:
+        return decode_image(path)
+    except ValueError:
+        return None
+
+def _image_hash(image: Any) -> Optional[int]:
+    try:
+        return phash(image)
+    except Exception as e:
+        logger.warning("No se pudo calcular el hash de la imagen: %s", e)
+        return None
+
+class BatchPipeline:
+    """
+    Pipeline sin interfaz gráfica: imágenes de tickets -> OCR
+    (``OCRService.read``) -> parseo y validación (``OCRService.finish``) ->
+    almacenamiento y resumen.
+
+    Las etapas corren en hilos distintos y se comunican por colas acotadas,
+    de modo que el OCR de un ticket se solapa con el parseo, la validación
+    y la escritura de los anteriores sin acumular memoria si una etapa se
+    atrasa. Un ticket que no se pudo leer cuenta como fallido
+    (``BatchResult.error``), no como inválido.
+    """
+
+    def __init__(self, ocr_service, storage_service, share_service,
+                 ocr_workers: int = 2, queue_size: int = 8,
+                 image_loader: Callable[[str], Any] = _read_image,
+                 image_hasher: Optional[Callable[[Any], Optional[int]]] = _image_hash):
+        self.ocr_service = ocr_service
+        self.storage_service = storage_service
+        self.share_service = share_service
+        self.ocr_workers = max(1, ocr_workers)
+        self.queue_size = queue_size
+        self.image_loader = image_loader
+        self.image_hasher = image_hasher
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, paths: Iterable[str],
+            progress: Optional[Callable[[int, int, BatchResult], None]] = None
+            ) -> Tuple[List[BatchResult], BatchStats]:
+        """
+        Procesa un lote de imágenes.
+
+        Args:
+            paths: Rutas de las imágenes
+            progress: Callback opcional ``(hechos, total, resultado)``
+
+        Returns:
+            Tupla (resultados en orden de finalización, estadísticas)
+        """
+        paths = list(paths)
+        stats = BatchStats(total=len(paths))
+        results: List[BatchResult] = []
+        lock = threading.Lock()
+
+        path_queue: queue.Queue = queue.Queue()
+        parse_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        write_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        for path in paths:
+            path_queue.put(path)
+        for _ in range(self.ocr_workers):
+            path_queue.put(_DONE)
+
+        def add_time(stage, seconds):
+            with lock:
+                stats.stage_seconds[stage] += seconds
+
+        def ocr_stage():
+            while True:
+                path = path_queue.get()
+                if path is _DONE:
+                    parse_queue.put(_DONE)
+                    return
+                result = BatchResult(path=path)
+                start = time.perf_counter()
+                reading = None
+                try:
+                    image = self.image_loader(path)
+                    if image is None:
+                        raise ValueError("No se pudo leer la imagen")
+                    if self.image_hasher is not None:
+                        result.image_hash = self.image_hasher(image)
+                    # Mismo pipeline que la app y el servidor (QR, control de
+                    # calidad, perfiles de comercio, corpus de capturas), pero
+                    # los errores del OCR llegan aquí en lugar de un {}
+                    reading = self.ocr_service.read(image, source=path)
+                except Exception as e:
+                    result.error = str(e)
+                add_time('ocr', time.perf_counter() - start)
+                parse_queue.put((result, reading))
+
+        def parse_stage():
+            pending = self.ocr_workers
+            while pending:
+                entry = parse_queue.get()
+                if entry is _DONE:
+                    pending -= 1
+                    continue
+                result, reading = entry
+                if result.error is None:
+                    start = time.perf_counter()
+                    try:
+                        items = self.ocr_service.finish(reading)
+                        result.items = [(desc, Decimal(str(price)))
+                                        for desc, price in items.items()]
+                        result.valid = self.ocr_service.validate_items(result.items)
+                    except Exception as e:
+                        result.error = str(e)
+                    add_time('parse', time.perf_counter() - start)
+                write_queue.put(result)
+            write_queue.put(_DONE)
+
+        def write_stage():
+            while True:
+                result = write_queue.get()
+                if result is _DONE:
+                    return
+                if result.error is None:
+                    start = time.perf_counter()
+                    try:
+                        self._write(result)
+                    except Exception as e:
+                        result.error = str(e)
+                    add_time('write', time.perf_counter() - start)
+
+                if result.error is not None:
+                    stats.failed += 1
+                    self.logger.error("Error procesando %s: %s", result.path, result.error)
+                elif not result.valid:
+                    stats.invalid += 1
+                stats.processed += 1
+                results.append(result)
+                if progress:
+                    progress(stats.processed, stats.total, result)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=ocr_stage, name=f'batch-ocr-{i}', daemon=True)
+                   for i in range(self.ocr_workers)]
+        threads.append(threading.Thread(target=parse_stage, name='batch-parse', daemon=True))
+        threads.append(threading.Thread(target=write_stage, name='batch-write', daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats.elapsed = time.perf_counter() - start
+        self.logger.info("Lote terminado: %d tickets en %.2f s (%d con error)",
+                         stats.total, stats.elapsed, stats.failed,
+                         extra={'event': 'batch.run',
+                                'duration_ms': round(stats.elapsed * 1000, 3),
+                                'processed': stats.processed, 'failed': stats.failed,
+                                'invalid': stats.invalid,
+                                'stage_seconds': dict(stats.stage_seconds)})
+
+        return results, stats
+
+    def _write(self, result: BatchResult) -> None:
+        """Guarda la cuenta y su resumen de texto."""
+        bill_data = {
+            'source': result.path,
+            'valid': result.valid,
+            'items': {desc: float(price) for desc, price in result.items}
+        }
+        if result.image_hash is not None:
+            bill_data['image_hash'] = to_hex(result.image_hash)
+        # La foto original se conserva para poder volver a leerla
+        result.filename = self.storage_service.save_bill(bill_data, image=result.path)
+        result.duplicates = bill_data.get('possible_duplicates', [])
+
+        summary = self.share_service.generate_summary(bill_data)
+        summary_path = Path(self.share_service.output_dir) / f"{Path(result.filename).stem}.txt"
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(summary)
+        result.summary_path = str(summary_path)
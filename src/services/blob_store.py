@@ -0,0 +1,238 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Set
+import logging
+
+from .image_ingest import TARGET_LONG_SIDE, decode_image, image_sha256
+
+logger = logging.getLogger(__name__)
+
+# Extensiones de los formatos soportados, en orden de preferencia
+FORMATS = ('webp', 'jpg')
+
+THUMBNAIL_SUFFIX = '.thumb'
+
+class BlobStore:
+    """
+    Almacén de fotos de tickets direccionado por contenido.
+
+    Cada foto se guarda una sola vez en ``<root>/<aa>/<sha256>.<ext>``,
+    donde ``sha256`` es el hash de la foto recibida (bytes codificados o
+    array): guardar la misma foto dos veces devuelve la misma referencia sin
+    volver a codificarla. Se recomprime en WebP (o JPEG si OpenCV no tiene
+    WebP) con el lado largo limitado a ``max_side``, suficiente para volver
+    a pasar el OCR.
+
+    Las miniaturas (``<sha256>.thumb.<ext>``) se generan en un hilo en
+    segundo plano; ``thumbnail_path`` devuelve None mientras no estén
+    listas (``pending_thumbnail`` da el Future del trabajo en curso), de
+    modo que las vistas de historial nunca decodifican la foto completa.
+    Una miniatura que falla no se vuelve a intentar.
+
+    La referencia que se guarda en las cuentas es el nombre del archivo
+    (``<sha256>.<ext>``).
+    """
+
+    def __init__(self, root: str, format: str = 'webp', quality: int = 80,
+                 max_side: int = TARGET_LONG_SIDE, thumbnail_side: int = 256,
+                 thumbnail_quality: int = 70):
+        if format not in FORMATS:
+            raise ValueError(f"Formato no soportado: {format}")
+        self.root = root
+        self.format = format
+        self.quality = quality
+        self.max_side = max_side
+        self.thumbnail_side = thumbnail_side
+        self.thumbnail_quality = thumbnail_quality
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Miniaturas en curso por referencia
+        self._pending: Dict[str, Future] = {}
+        # Referencias cuya miniatura no se pudo generar (foto corrupta)
+        self._failed: Set[str] = set()
+
+    def _path(self, ref: str, suffix: str = '') -> str:
+        digest, ext = ref.rsplit('.', 1)
+        return os.path.join(self.root, digest[:2], f"{digest}{suffix}.{ext}")
+
+    def _find(self, digest: str) -> Optional[str]:
+        for ext in FORMATS:
+            ref = f"{digest}.{ext}"
+            if os.path.exists(self._path(ref)):
+                return ref
+        return None
+
+    @staticmethod
+    def content_hash(source: Any) -> str:
+        """SHA-256 de la foto tal como se recibe (ruta, bytes o array)."""
+        if isinstance(source, (str, os.PathLike)):
+            digest = hashlib.sha256()
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        return image_sha256(source)
+
+    def put(self, source: Any) -> str:
+        """
+        Guarda una foto (si no estaba ya) y programa su miniatura.
+
+        Args:
+            source: Ruta, bytes con la imagen codificada o array BGR/gris
+
+        Returns:
+            Referencia de la foto
+
+        Raises:
+            ValueError: Si la imagen no se puede decodificar o codificar
+        """
+        digest = self.content_hash(source)
+        ref = self._find(digest)
+        if ref is None:
+            import cv2
+
+            image = decode_image(source, self.max_side, color=True)
+            height, width = image.shape[:2]
+            scale = self.max_side / max(width, height)
+            if scale < 1:
+                image = cv2.resize(image, (round(width * scale), round(height * scale)),
+                                   interpolation=cv2.INTER_AREA)
+            ext, data = self._encode(image, self.quality)
+            ref = f"{digest}.{ext}"
+            self._write(self._path(ref), data)
+            self.logger.debug("Foto guardada: %s (%d bytes)", ref, len(data))
+        self._schedule_thumbnail(ref)
+        return ref
+
+    def _encode(self, image: Any, quality: int):
+        import cv2
+
+        formats = FORMATS[FORMATS.index(self.format):]
+        for ext in formats:
+            flag = cv2.IMWRITE_WEBP_QUALITY if ext == 'webp' else cv2.IMWRITE_JPEG_QUALITY
+            try:
+                ok, buffer = cv2.imencode(f'.{ext}', image, [flag, quality])
+            except cv2.error as e:
+                # OpenCV compilado sin WebP
+                self.logger.debug("No se pudo codificar en %s: %s", ext, e)
+                continue
+            if ok:
+                return ext, buffer.tobytes()
+        raise ValueError("No se pudo codificar la imagen")
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        # Escritura atómica: un lector nunca ve un archivo a medias
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def exists(self, ref: str) -> bool:
+        return os.path.exists(self._path(ref))
+
+    def path(self, ref: str) -> Optional[str]:
+        """Ruta de la foto o None si no existe."""
+        path = self._path(ref)
+        return path if os.path.exists(path) else None
+
+    def load(self, ref: str, target_side: int = TARGET_LONG_SIDE) -> Any:
+        """
+        Decodifica la foto guardada en gris para volver a pasar el OCR.
+
+        Raises:
+            FileNotFoundError: Si la foto no existe
+        """
+        path = self.path(ref)
+        if path is None:
+            raise FileNotFoundError(f"Foto no encontrada: {ref}")
+        return decode_image(path, target_side)
+
+    def thumbnail_path(self, ref: str) -> Optional[str]:
+        """
+        Ruta de la miniatura, o None si no está lista. En ese caso se
+        programa su generación si la foto existe y no falló antes; el
+        trabajo se obtiene con ``pending_thumbnail``.
+        """
+        path = self._path(ref, THUMBNAIL_SUFFIX)
+        if os.path.exists(path):
+            return path
+        if self.exists(ref):
+            self._schedule_thumbnail(ref)
+        return None
+
+    def pending_thumbnail(self, ref: str) -> Optional[Future]:
+        """Future de la miniatura en curso o None si no hay ninguna programada."""
+        with self._lock:
+            return self._pending.get(ref)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='blob-thumbnails')
+        return self._executor
+
+    def _schedule_thumbnail(self, ref: str) -> Optional[Future]:
+        with self._lock:
+            if ref in self._pending:
+                return self._pending[ref]
+            if ref in self._failed or os.path.exists(self._path(ref, THUMBNAIL_SUFFIX)):
+                return None
+            future = self._get_executor().submit(self._make_thumbnail, ref)
+            self._pending[ref] = future
+        future.add_done_callback(lambda f: self._thumbnail_done(ref, f))
+        return future
+
+    def _thumbnail_done(self, ref: str, future: Future) -> None:
+        failed = not future.cancelled() and future.exception() is not None
+        with self._lock:
+            self._pending.pop(ref, None)
+            if failed:
+                self._failed.add(ref)
+        if failed:
+            self.logger.error("Error generando la miniatura de %s: %s", ref, future.exception())
+
+    def _make_thumbnail(self, ref: str) -> str:
+        import cv2
+
+        # La reducción en el decodificador evita descomprimir la foto completa
+        image = decode_image(self._path(ref), self.thumbnail_side, color=True)
+        height, width = image.shape[:2]
+        scale = self.thumbnail_side / max(width, height)
+        if scale < 1:
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        _, data = self._encode(image, self.thumbnail_quality)
+        path = self._path(ref, THUMBNAIL_SUFFIX)
+        self._write(path, data)
+        return path
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Espera a que terminen las miniaturas programadas."""
+        with self._lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+
+    def delete(self, ref: str) -> bool:
+        """Elimina una foto y su miniatura."""
+        removed = False
+        for path in (self._path(ref), self._path(ref, THUMBNAIL_SUFFIX)):
+            try:
+                os.remove(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def shutdown(self) -> None:
+        """Libera el hilo de miniaturas (las pendientes se descartan)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,284 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+
+from .image_ingest import image_sha256
+
+logger = logging.getLogger(__name__)
+
+class CaptureStore:
+    """
+    Corpus de tickets capturados, indexado por el hash de la imagen.
+
+    Cada llamada capturada a ``OCRService.process_image`` se guarda en
+    ``<root>/<sha256>/``:
+
+    - ``image.bin`` (la imagen codificada tal como llegó) o ``image.npy``
+      (si el llamador pasó un array de numpy)
+    - ``record.json``: parámetros de preprocesado, texto del OCR, items
+      detectados y ``ground_truth`` (por defecto los mismos items; se puede
+      corregir con ``set_ground_truth``)
+
+    La misma imagen capturada dos veces actualiza su registro pero conserva
+    la verdad de referencia.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256)
+
+    def capture(self, image: Any, params: Dict[str, Any], text: str,
+                items: Dict[str, float]) -> str:
+        """
+        Guarda una llamada al OCR.
+
+        Args:
+            image: Imagen de entrada (array de numpy o bytes codificados)
+            params: Parámetros de preprocesado/motor usados
+            text: Texto devuelto por el OCR
+            items: Items detectados
+
+        Returns:
+            Hash SHA-256 de la imagen
+        """
+        sha256 = image_sha256(image)
+        directory = self._dir(sha256)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            record = self.load(sha256) or {}
+            if not record:
+                self._save_image(directory, image)
+            record.update({
+                'sha256': sha256,
+                'captured_at': datetime.now().isoformat(),
+                'params': params,
+                'text': text,
+                'items': items,
+            })
+            record.setdefault('ground_truth', items)
+            self._write_record(directory, record)
+        return sha256
+
+    @staticmethod
+    def _save_image(directory: str, image: Any) -> None:
+        if hasattr(image, 'shape'):
+            import numpy as np
+
+            np.save(os.path.join(directory, 'image.npy'), image)
+        else:
+            with open(os.path.join(directory, 'image.bin'), 'wb') as f:
+                f.write(bytes(image))
+
+    @staticmethod
+    def _write_record(directory: str, record: Dict[str, Any]) -> None:
+        tmp_path = os.path.join(directory, 'record.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, os.path.join(directory, 'record.json'))
+
+    def load(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el registro de una imagen o None si no está capturada."""
+        try:
+            with open(os.path.join(self._dir(sha256), 'record.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load_image(self, sha256: str) -> Any:
+        """Carga la imagen original de un registro."""
+        directory = self._dir(sha256)
+        npy_path = os.path.join(directory, 'image.npy')
+        if os.path.exists(npy_path):
+            import numpy as np
+
+            return np.load(npy_path)
+        with open(os.path.join(directory, 'image.bin'), 'rb') as f:
+            return f.read()
+
+    def set_ground_truth(self, sha256: str, items: Dict[str, float]) -> None:
+        """Corrige los items de referencia de un ticket (p. ej. tras editarlos a mano)."""
+        with self._lock:
+            record = self.load(sha256)
+            if record is None:
+                raise KeyError(f"Ticket no capturado: {sha256}")
+            record['ground_truth'] = items
+            self._write_record(self._dir(sha256), record)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Recorre los registros en orden de hash (determinista)."""
+        for name in sorted(os.listdir(self.root)):
+            record = self.load(name)
+            if record is not None:
+                yield record
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.root)
+                   if os.path.exists(os.path.join(self._dir(name), 'record.json')))
+
+def capture_store_from_env(environ: Optional[Dict[str, str]] = None) -> Optional[CaptureStore]:
+    """Corpus configurado con ``BILLSPLIT_CAPTURE_DIR`` (None si no está definido)."""
+    environ = os.environ if environ is None else environ
+    root = environ.get('BILLSPLIT_CAPTURE_DIR')
+    return CaptureStore(root) if root else None
+
+def _normalize(description: str) -> str:
+    return re.sub(r'\s+', ' ', str(description)).strip().casefold()
+
+def _cents(price: Any) -> Optional[Decimal]:
+    try:
+        return Decimal(str(price)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+
+def compare_items(expected: Dict[str, Any], actual: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Compara los items detectados con los de referencia.
+
+    Las descripciones se comparan sin distinguir mayúsculas ni espacios y
+    los precios al céntimo.
+
+    Returns:
+        Conteos: esperados, encontrados, descripciones coincidentes y
+        coincidentes también en precio
+    """
+    expected_prices = {_normalize(d): _cents(p) for d, p in expected.items()}
+    actual_prices = {_normalize(d): _cents(p) for d, p in actual.items()}
+    matched = expected_prices.keys() & actual_prices.keys()
+    return {
+        'expected': len(expected_prices),
+        'found': len(actual_prices),
+        'matched': len(matched),
+        'price_matched': sum(1 for d in matched if expected_prices[d] == actual_prices[d]),
+    }
+
+@dataclass
+class ReplayResult:
+    """Resultado de reproducir un ticket."""
+    sha256: str
+    seconds: float
+    expected: int
+    found: int
+    matched: int
+    price_matched: int
+    exact: bool
+    items: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+@dataclass
+class ReplayReport:
+    """Exactitud y latencias de una reproducción del corpus."""
+    results: List[ReplayResult]
+    elapsed: float
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        expected = sum(r.expected for r in self.results)
+        found = sum(r.found for r in self.results)
+        matched = sum(r.matched for r in self.results)
+        price_matched = sum(r.price_matched for r in self.results)
+        latencies = sorted(r.seconds for r in self.results if not r.error)
+        total = len(self.results)
+        return {
+            'receipts': total,
+            'errors': sum(1 for r in self.results if r.error),
+            'exact_receipts': sum(1 for r in self.results if r.exact),
+            'receipt_accuracy': sum(1 for r in self.results if r.exact) / total if total else 0.0,
+            'item_recall': matched / expected if expected else 0.0,
+            'item_precision': matched / found if found else 0.0,
+            'price_accuracy': price_matched / expected if expected else 0.0,
+            'latency_ms': {
+                'p50': _percentile(latencies, 50) * 1000,
+                'p95': _percentile(latencies, 95) * 1000,
+                'p99': _percentile(latencies, 99) * 1000,
+                'max': latencies[-1] * 1000 if latencies else 0.0,
+            },
+            'throughput': total / self.elapsed if self.elapsed else 0.0,
+            'elapsed_s': self.elapsed,
+            'params': self.params,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'summary': self.summary(), 'results': [asdict(r) for r in self.results]}
+
+class ReplayRunner:
+    """
+    Reproduce el corpus capturado con un motor de OCR y lo compara con la
+    verdad de referencia.
+
+    Cada hilo de trabajo usa su propia instancia del motor (creada con
+    ``engine_factory``), de modo que se puede reproducir con otro motor u
+    otra configuración sin tocar el corpus. El motor debe tener
+    ``read_items(imagen)`` como OCRService, que lanza una excepción si no
+    puede leer el ticket: esos tickets cuentan como errores y no como
+    fallos de exactitud.
+    """
+
+    def __init__(self, store: CaptureStore, engine_factory: Callable[[], Any], workers: int = 4):
+        self.store = store
+        self.engine_factory = engine_factory
+        self.workers = max(1, workers)
+        self._local = threading.local()
+
+    def _engine(self):
+        engine = getattr(self._local, 'engine', None)
+        if engine is None:
+            engine = self._local.engine = self.engine_factory()
+        return engine
+
+    def _replay_one(self, record: Dict[str, Any]) -> ReplayResult:
+        sha256 = record['sha256']
+        expected = record.get('ground_truth') or {}
+        try:
+            image = self.store.load_image(sha256)
+            engine = self._engine()
+            start = time.perf_counter()
+            items = engine.read_items(image)
+            seconds = time.perf_counter() - start
+        except Exception as e:
+            logger.error("Error reproduciendo %s: %s", sha256, e)
+            return ReplayResult(sha256, 0.0, len(expected), 0, 0, 0, False, error=str(e))
+        counts = compare_items(expected, items)
+        exact = counts['price_matched'] == counts['expected'] == counts['found']
+        return ReplayResult(sha256, seconds, exact=exact, items=items, **counts)
+
+    def run(self, progress: Optional[Callable[[int, int, ReplayResult], None]] = None
+            ) -> ReplayReport:
+        """
+        Reproduce todos los tickets del corpus en paralelo.
+
+        Args:
+            progress: Callback opcional (hechos, total, resultado)
+
+        Returns:
+            Informe con exactitud y latencias, en orden de hash
+        """
+        records = list(self.store)
+        probe = self.engine_factory()
+        params = probe.params() if hasattr(probe, 'params') else {}
+        start = time.perf_counter()
+        results = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for done, result in enumerate(executor.map(self._replay_one, records), 1):
+                results.append(result)
+                if progress:
+                    progress(done, len(records), result)
+        return ReplayReport(results, time.perf_counter() - start, params)
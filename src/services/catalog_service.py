@@ -0,0 +1,310 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+from .instrumentation import record_error
+
+logger = logging.getLogger(__name__)
+
+# Borrados indexados por palabra del vocabulario (ediciones máximas por palabra)
+_INDEX_DELETES = 2
+
+# Dígitos que el OCR confunde con letras dentro de una palabra ("Refresc0")
+_OCR_DIGITS = str.maketrans({'0': 'o', '1': 'l', '5': 's', '8': 'b'})
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+def _fix_token(token: str) -> str:
+    # Solo en palabras con letras y sin dígitos seguidos: "600ml" no se toca
+    if token.isalpha() or not any(c.isalpha() for c in token) or re.search(r'\d\d', token):
+        return token
+    return token.translate(_OCR_DIGITS)
+
+def normalize(text: str) -> str:
+    """
+    Forma canónica de una descripción para el índice: minúsculas, sin
+    acentos ni puntuación y con los dígitos confundidos por letras
+    corregidos ("HAMBURGUESA  doble." -> "hamburguesa doble").
+    """
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(_fix_token(token) for token in _TOKEN_RE.findall(text))
+
+def deletes(token: str, max_deletes: int) -> set:
+    """Variantes de ``token`` con hasta ``max_deletes`` caracteres borrados (incluido él mismo)."""
+    found = {token}
+    frontier = {token}
+    for _ in range(max_deletes):
+        frontier = {t[:i] + t[i + 1:] for t in frontier for i in range(len(t))} - found
+        found |= frontier
+    return found
+
+def levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Distancia de edición entre ``a`` y ``b``, acotada: devuelve
+    ``max_distance + 1`` en cuanto se sabe que la supera.
+
+    Descarta el prefijo y el sufijo comunes y solo calcula la banda de
+    ``max_distance`` celdas a cada lado de la diagonal.
+    """
+    limit = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return limit
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return min(len(b), limit)
+    previous = [i if i <= max_distance else limit for i in range(len(a) + 1)]
+    for j, cb in enumerate(b, 1):
+        current = [limit] * (len(a) + 1)
+        if j <= max_distance:
+            current[0] = j
+        for i in range(max(1, j - max_distance), min(len(a), j + max_distance) + 1):
+            current[i] = min(previous[i] + 1, current[i - 1] + 1,
+                             previous[i - 1] + (a[i - 1] != cb))
+        if min(current) >= limit:
+            return limit
+        previous = current
+    return min(previous[-1], limit)
+
+def default_max_distance(key: str) -> int:
+    """Ediciones toleradas según la longitud: 1 hasta 7 caracteres, luego una cada 4 (máx. 3)."""
+    return max(1, min(3, len(key) // 4))
+
+@dataclass
+class CatalogEntry:
+    """Descripción conocida del catálogo."""
+    text: str
+    key: str
+    count: int = 0
+    merchants: Counter = field(default_factory=Counter)
+    spellings: Counter = field(default_factory=Counter)
+
+@dataclass(frozen=True)
+class CatalogMatch:
+    """Entrada más cercana a una descripción leída por OCR."""
+    text: str
+    distance: int
+    score: float
+    count: int
+
+class CatalogService:
+    """
+    Catálogo de descripciones de ítems vistas en las cuentas guardadas y en
+    los menús de cada comercio, con búsqueda aproximada para corregir el OCR.
+
+    Las descripciones se indexan normalizadas (``normalize``) y por palabras:
+    el vocabulario de palabras es mucho menor que el de descripciones (unos
+    miles frente a 100k+), así que la corrección se hace palabra a palabra.
+
+    1. Clave exacta en un diccionario: el caso habitual, el plato ya está
+       en el catálogo con la misma grafía.
+    2. Cada palabra de la consulta se corrige con un índice de borrados
+       (``deletes``): dos palabras a ``k`` ediciones comparten una variante
+       con ``k`` caracteres borrados como máximo, de modo que las
+       candidatas salen de búsquedas en diccionario, sin recorrer el
+       vocabulario.
+    3. Si la descripción con cada palabra corregida está en el catálogo,
+       es el resultado. Si no, las candidatas son las descripciones que
+       contienen la palabra corregida más rara (y la segunda, si alguna la
+       tiene); solo de ellas se calcula la distancia de edición acotada
+       respecto a la consulta completa.
+
+    Las altas son incrementales (``add``); no hace falta reconstruir el
+    índice.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._entries: List[CatalogEntry] = []
+        self._ids: Dict[str, int] = {}
+        # palabra -> descripciones que la contienen
+        self._postings: Dict[str, List[int]] = {}
+        # variante con borrados -> palabras del vocabulario
+        self._deletes: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, description: str, merchant: Optional[str] = None,
+            count: int = 1) -> Optional[CatalogEntry]:
+        """
+        Agrega (o refuerza) una descripción.
+
+        Args:
+            description: Descripción tal como se guardó en la cuenta
+            merchant: Comercio en cuyo menú aparece, si se conoce
+            count: Veces que se vio
+
+        Returns:
+            La entrada o None si la descripción no tiene letras ni números
+        """
+        key = normalize(description)
+        if not key:
+            return None
+        text = ' '.join(description.split())
+        with self._lock:
+            entry_id = self._ids.get(key)
+            if entry_id is None:
+                entry_id = len(self._entries)
+                self._entries.append(CatalogEntry(text=text, key=key))
+                self._ids[key] = entry_id
+                for token in set(key.split()):
+                    if token not in self._postings:
+                        self._postings[token] = []
+                        for variant in deletes(token, _INDEX_DELETES if len(token) >= 5 else 1):
+                            self._deletes.setdefault(variant, []).append(token)
+                    self._postings[token].append(entry_id)
+            entry = self._entries[entry_id]
+            entry.count += count
+            entry.spellings[text] += count
+            # Se muestra la grafía más usada
+            entry.text = entry.spellings.most_common(1)[0][0]
+            if merchant:
+                entry.merchants[merchant] += count
+            return entry
+
+    def add_menu(self, merchant: str, descriptions: Iterable[str]) -> None:
+        """Agrega las descripciones del menú de un comercio."""
+        for description in descriptions:
+            self.add(description, merchant=merchant)
+
+    def add_bill(self, bill_data: Dict[str, Any]) -> None:
+        """
+        Agrega los ítems de una cuenta guardada. Acepta ``items`` como
+        diccionario descripción -> precio o como lista de
+        ``{'description', 'price'}``; el comercio se toma de ``merchant`` o
+        de ``metadata['merchant']``.
+        """
+        items = bill_data.get('items') or {}
+        descriptions = items.keys() if isinstance(items, dict) else \
+            [item.get('description', '') for item in items if isinstance(item, dict)]
+        merchant = bill_data.get('merchant') or (bill_data.get('metadata') or {}).get('merchant')
+        for description in descriptions:
+            self.add(str(description), merchant=merchant)
+
+    def load_from_storage(self, storage) -> int:
+        """
+        Construye el catálogo con todas las cuentas del almacenamiento
+        (archivos JSON y tabla ``bills``).
+
+        Returns:
+            Número de entradas del catálogo
+        """
+        try:
+            for bill in storage.list_bills():
+                data = storage.load_bill(bill['filename'])
+                if data:
+                    self.add_bill(data)
+            for data in storage.get_all_bills():
+                self.add_bill(data)
+        except Exception as e:
+            self.logger.error("Error cargando el catálogo: %s", e)
+            record_error('catalog.load')
+        self.logger.info("Catálogo cargado: %d descripciones", len(self._entries))
+        return len(self._entries)
+
+    def search(self, description: str, limit: int = 5, max_distance: Optional[int] = None,
+               merchant: Optional[str] = None) -> List[CatalogMatch]:
+        """
+        Entradas más parecidas a una descripción.
+
+        Args:
+            description: Descripción leída por OCR
+            limit: Máximo de resultados
+            max_distance: Ediciones toleradas en toda la descripción (por
+                defecto según la longitud)
+            merchant: Comercio del ticket; a igual distancia se prefieren
+                las entradas de su menú
+
+        Returns:
+            Coincidencias ordenadas por distancia, comercio y frecuencia
+        """
+        key = normalize(description)
+        if not key:
+            return []
+        k = default_max_distance(key) if max_distance is None else max_distance
+        with self._lock:
+            exact = self._ids.get(key)
+            if exact is not None and limit == 1:
+                return [self._match(exact, 0, key)]
+            corrections = {token: self.correct_token(token, min(k, default_max_distance(token)))
+                           for token in set(key.split())}
+            if limit == 1 and not merchant:
+                # Lo habitual: basta corregir cada palabra por separado
+                corrected = self._ids.get(' '.join((corrections[t] or [t])[0] for t in key.split()))
+                if corrected is not None:
+                    distance = levenshtein(key, self._entries[corrected].key, k)
+                    if distance <= k:
+                        return [self._match(corrected, distance, key)]
+            entries = self._entries
+            found = []
+            for entry_id in self._candidates(corrections):
+                candidate = entries[entry_id].key
+                if abs(len(candidate) - len(key)) <= k:
+                    distance = levenshtein(key, candidate, k)
+                    if distance <= k:
+                        found.append((distance, entry_id))
+            found.sort(key=lambda m: (m[0], -entries[m[1]].merchants[merchant] if merchant else 0,
+                                      -entries[m[1]].count))
+            return [self._match(entry_id, distance, key) for distance, entry_id in found[:limit]]
+
+    def snap(self, description: str, merchant: Optional[str] = None,
+             max_distance: Optional[int] = None) -> str:
+        """
+        Corrige una descripción con la entrada más cercana del catálogo.
+
+        Returns:
+            La descripción del catálogo o la original si no hay ninguna a
+            distancia tolerable
+        """
+        matches = self.search(description, limit=1, max_distance=max_distance, merchant=merchant)
+        return matches[0].text if matches else description
+
+    def correct_token(self, token: str, max_distance: int) -> List[str]:
+        """
+        Palabras del vocabulario a ``max_distance`` ediciones o menos de
+        ``token`` (normalizado), empezando por las más cercanas.
+        """
+        if token in self._postings:
+            return [token]
+        max_distance = min(max_distance, _INDEX_DELETES)
+        vocabulary = {word for variant in deletes(token, max_distance)
+                      for word in self._deletes.get(variant, ())}
+        scored = sorted((levenshtein(token, word, max_distance), word) for word in vocabulary)
+        return [word for distance, word in scored if distance <= max_distance]
+
+    def _candidates(self, corrections: Dict[str, List[str]]) -> Iterable[int]:
+        # Descripciones con la palabra (o alguna de sus correcciones) más
+        # rara, reducidas a las que además tienen la segunda más rara si hay
+        # alguna así
+        ranked = sorted((sum(len(self._postings[word]) for word in words), token)
+                        for token, words in corrections.items() if words)
+        if not ranked:
+            return ()
+        postings = [set(chain.from_iterable(self._postings[word] for word in corrections[token]))
+                    for _, token in ranked[:2]]
+        if len(postings) == 2:
+            both = postings[0] & postings[1]
+            if both:
+                return both
+        return postings[0]
+
+    def _match(self, entry_id: int, distance: int, key: str) -> CatalogMatch:
+        entry = self._entries[entry_id]
+        score = 1.0 - distance / max(len(key), len(entry.key))
+        return CatalogMatch(entry.text, distance, round(score, 3), entry.count)
@@ -0,0 +1,135 @@
+import threading
+from typing import Any, Callable, Dict
+
+class ServiceContainer:
+    """
+    Contenedor de servicios compartidos con construcción diferida.
+
+    Cada servicio se registra como una fábrica y se construye una sola vez,
+    la primera vez que alguien lo pide. Las fábricas importan sus módulos
+    dentro de la función, de modo que dependencias pesadas (cv2, pytesseract,
+    numpy, reportlab) no se cargan hasta que realmente se necesitan.
+
+    Cada servicio se construye bajo su propio lock: una fábrica puede pedir
+    otros servicios (p. ej. el OCR pide el almacenamiento) y construir un
+    servicio lento no bloquea a quien pide otro distinto.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        # Protege los diccionarios; nunca se retiene mientras corre una fábrica
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.RLock] = {}
+        self._building = threading.local()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """
+        Registra (o reemplaza) la fábrica de un servicio.
+
+        Args:
+            name: Nombre del servicio
+            factory: Función sin argumentos que construye el servicio
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """
+        Obtiene la instancia compartida de un servicio, creándola si hace falta.
+
+        Args:
+            name: Nombre del servicio
+
+        Returns:
+            Instancia única del servicio
+        """
+        # Camino rápido sin lock una vez construido
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Servicio no registrado: {name}")
+            build_lock = self._build_locks.setdefault(name, threading.RLock())
+
+        # Servicios que este hilo está construyendo (para detectar ciclos)
+        building = getattr(self._building, 'names', None)
+        if building is None:
+            building = self._building.names = []
+        if name in building:
+            cycle = ' -> '.join(building + [name])
+            raise RuntimeError(f"Dependencia circular entre servicios: {cycle}")
+        with build_lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                building.append(name)
+                try:
+                    instance = self._factories[name]()
+                finally:
+                    building.pop()
+                with self._lock:
+                    self._instances[name] = instance
+            return instance
+
+    def is_loaded(self, name: str) -> bool:
+        """Indica si el servicio ya fue construido."""
+        return name in self._instances
+
+    def reset(self) -> None:
+        """Descarta las instancias construidas (las fábricas se conservan)."""
+        with self._lock:
+            self._instances.clear()
+
+def _make_ocr_service():
+    from .capture_service import capture_store_from_env
+    from .ocr_service import OCRService
+    # Los perfiles de comercio se guardan junto a las cuentas
+    service = OCRService(capture_store=capture_store_from_env(),
+                         profile_store=container.get('storage'))
+    # En la app las capturas malas se rechazan antes del OCR para repetir la foto
+    service.quality_gate = True
+    return service
+
+def _make_storage_service():
+    from .storage_service import StorageService
+    return StorageService()
+
+def _make_catalog_service():
+    from .catalog_service import CatalogService
+    storage = container.get('storage')
+    catalog = CatalogService()
+    # Se engancha antes de cargar: las cuentas guardadas durante la carga
+    # también llegan al catálogo (alguna puede contarse dos veces, lo que
+    # solo afecta a la frecuencia)
+    storage.catalog = catalog
+    catalog.load_from_storage(storage)
+    return catalog
+
+def _make_share_service():
+    from .share_service import ShareService
+    return ShareService()
+
+container = ServiceContainer()
+container.register('ocr', _make_ocr_service)
+container.register('storage', _make_storage_service)
+container.register('share', _make_share_service)
+container.register('catalog', _make_catalog_service)
+
+def get_ocr_service():
+    """Devuelve el OCRService compartido."""
+    return container.get('ocr')
+
+def get_storage_service():
+    """Devuelve el StorageService compartido."""
+    return container.get('storage')
+
+def get_catalog_service():
+    """Devuelve el CatalogService compartido."""
+    return container.get('catalog')
+
+def get_share_service():
+    """Devuelve el ShareService compartido."""
+    return container.get('share')
@@ -0,0 +1,170 @@
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class EInvoice:
+    """
+    Datos estructurados leídos del código QR de un ticket.
+
+    Los QR fiscales (CFDI, TicketBAI, Verifactu) solo llevan el emisor, el
+    folio y el importe total; el detalle de conceptos está en la factura
+    electrónica del servidor fiscal. Solo los payloads con ``items`` permiten
+    saltarse el OCR.
+    """
+    format: str
+    total: Optional[Decimal] = None
+    items: Dict[str, float] = field(default_factory=dict)
+    issuer: Optional[str] = None
+    invoice_id: Optional[str] = None
+    raw: str = ''
+
+PayloadParser = Callable[[str], Optional[EInvoice]]
+
+# Parsers registrados, en orden de prueba
+PARSERS: List[PayloadParser] = []
+
+def register_parser(parser: PayloadParser) -> PayloadParser:
+    """
+    Registra un parser de payloads de QR. Se usa como decorador:
+
+        @register_parser
+        def parse_mi_formato(payload): ...
+
+    El parser devuelve un EInvoice o None si el payload no es de su formato.
+    """
+    PARSERS.append(parser)
+    return parser
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    try:
+        return Decimal(str(value).strip()).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+
+def _query(payload: str) -> Dict[str, str]:
+    parts = urlsplit(payload.strip())
+    if parts.scheme not in ('http', 'https'):
+        return {}
+    return {key.lower(): values[0] for key, values in parse_qs(parts.query).items()}
+
+@register_parser
+def parse_cfdi(payload: str) -> Optional[EInvoice]:
+    """
+    CFDI (México): URL de verificación del SAT con ``id`` (UUID), ``re``
+    (RFC emisor), ``rr`` (RFC receptor) y ``tt`` (total).
+    """
+    if 'facturaelectronica.sat.gob.mx' not in payload.lower():
+        return None
+    query = _query(payload)
+    if 'tt' not in query:
+        return None
+    return EInvoice('cfdi', total=_decimal(query['tt']), issuer=query.get('re'),
+                    invoice_id=query.get('id'), raw=payload)
+
+@register_parser
+def parse_ticketbai(payload: str) -> Optional[EInvoice]:
+    """
+    TicketBAI (País Vasco): URL con ``id=TBAI-...``, ``nf`` (número de
+    factura) e ``i`` (importe total).
+    """
+    query = _query(payload)
+    invoice_id = query.get('id', '')
+    if not invoice_id.upper().startswith('TBAI-') or 'i' not in query:
+        return None
+    # El identificador empieza por el NIF del emisor: TBAI-<NIF>-<fecha>-...
+    issuer = invoice_id.split('-')[1] if invoice_id.count('-') >= 2 else None
+    return EInvoice('ticketbai', total=_decimal(query['i']), issuer=issuer,
+                    invoice_id=query.get('nf') or invoice_id, raw=payload)
+
+@register_parser
+def parse_verifactu(payload: str) -> Optional[EInvoice]:
+    """
+    Verifactu (AEAT): URL de cotejo ``ValidarQR`` con ``nif``, ``numserie``,
+    ``fecha`` e ``importe``.
+    """
+    query = _query(payload)
+    if 'importe' not in query or 'numserie' not in query:
+        return None
+    return EInvoice('verifactu', total=_decimal(query['importe']), issuer=query.get('nif'),
+                    invoice_id=query['numserie'], raw=payload)
+
+@register_parser
+def parse_json_receipt(payload: str) -> Optional[EInvoice]:
+    """
+    Ticket en JSON (TPVs que imprimen el detalle en el QR):
+    ``{"items": [{"description", "price"}] | {"descripción": precio}, "total"}``.
+    """
+    text = payload.strip()
+    if not text.startswith('{'):
+        return None
+    try:
+        data = json.loads(text)
+        entries = data.get('items') or {}
+        if isinstance(entries, dict):
+            entries = [{'description': d, 'price': p} for d, p in entries.items()]
+        items = {}
+        for entry in entries:
+            price = _decimal(entry['price'])
+            if price is None:
+                return None
+            items[str(entry['description']).strip()] = float(price)
+    except (ValueError, AttributeError, KeyError, TypeError):
+        return None
+    if not items:
+        return None
+    return EInvoice('json', total=_decimal(data['total']) if 'total' in data else None,
+                    items=items, issuer=data.get('issuer'), invoice_id=data.get('id'), raw=payload)
+
+def parse_payload(payload: str) -> Optional[EInvoice]:
+    """
+    Interpreta el texto de un QR con los parsers registrados.
+
+    Returns:
+        El primer EInvoice reconocido o None
+    """
+    for parser in PARSERS:
+        try:
+            invoice = parser(payload)
+        except Exception as e:
+            logger.error("Error en el parser %s: %s", parser.__name__, e)
+            continue
+        if invoice is not None:
+            return invoice
+    return None
+
+def decode_qr_codes(image: Any) -> List[str]:
+    """
+    Detecta y decodifica los códigos QR de una imagen con ``cv2.QRCodeDetector``.
+
+    Args:
+        image: Imagen decodificada (gris o BGR)
+
+    Returns:
+        Textos de los QR legibles
+    """
+    import cv2
+
+    detector = cv2.QRCodeDetector()
+    ok, payloads, _, _ = detector.detectAndDecodeMulti(image)
+    if ok:
+        return [payload for payload in payloads if payload]
+    payload, _, _ = detector.detectAndDecode(image)
+    return [payload] if payload else []
+
+def read_einvoice(image: Any) -> Optional[EInvoice]:
+    """
+    Busca en la imagen un QR con datos de factura o ticket reconocibles.
+
+    Returns:
+        El EInvoice del primer QR reconocido (priorizando los que traen
+        items) o None
+    """
+    invoices = [invoice for invoice in map(parse_payload, decode_qr_codes(image)) if invoice]
+    invoices.sort(key=lambda invoice: not invoice.items)
+    return invoices[0] if invoices else None
@@ -0,0 +1,126 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+import logging
+
+from .image_hash import dhash, hamming
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SchedulerStats:
+    """Conteo de fotogramas recibidos y de por qué no se procesaron."""
+    frames: int = 0
+    ocr_runs: int = 0
+    moving: int = 0
+    unchanged: int = 0
+    busy: int = 0
+
+class FrameScheduler:
+    """
+    Decide qué fotogramas de la vista previa de la cámara pasan por el OCR.
+
+    Cada fotograma se resume con un hash perceptual (dHash) y solo se lanza
+    el OCR cuando:
+
+    - la imagen lleva ``stable_frames`` fotogramas seguidos sin moverse
+      (distancia con el anterior <= ``motion_threshold`` bits),
+    - difiere del último fotograma procesado en más de ``change_threshold``
+      bits (otro ticket o un encuadre distinto), y
+    - no hay otro OCR en curso.
+
+    El OCR corre en un único hilo, así que el coste de CPU está acotado a un
+    trabajo a la vez sin importar la frecuencia de la cámara.
+    """
+
+    def __init__(self, process: Callable[[Any], Any],
+                 on_result: Optional[Callable[[Any, Future], None]] = None,
+                 stable_frames: int = 5, motion_threshold: int = 4,
+                 change_threshold: int = 10, hasher: Callable[[Any], int] = dhash):
+        self.process = process
+        self.on_result = on_result
+        self.stable_frames = stable_frames
+        self.motion_threshold = motion_threshold
+        self.change_threshold = change_threshold
+        self.hasher = hasher
+        self.stats = SchedulerStats()
+        self._previous: Optional[int] = None
+        self._last_processed: Optional[int] = None
+        self._stable = 0
+        self._in_flight: Optional[Future] = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def busy(self) -> bool:
+        """Indica si hay un OCR en curso."""
+        return self._in_flight is not None
+
+    def offer(self, frame: Any) -> Optional[Future]:
+        """
+        Recibe un fotograma de la vista previa.
+
+        El fotograma no debe reutilizarse después si se lanza el OCR con él
+        (el OCR lo lee desde otro hilo).
+
+        Args:
+            frame: Fotograma (numpy array en gris o BGR)
+
+        Returns:
+            El Future del OCR si se lanzó con este fotograma, o None
+        """
+        frame_hash = self.hasher(frame)
+        with self._lock:
+            self.stats.frames += 1
+            if (self._previous is not None
+                    and hamming(frame_hash, self._previous) <= self.motion_threshold):
+                self._stable += 1
+            else:
+                self._stable = 0
+            self._previous = frame_hash
+
+            if self._stable + 1 < self.stable_frames:
+                self.stats.moving += 1
+                return None
+            if (self._last_processed is not None
+                    and hamming(frame_hash, self._last_processed) <= self.change_threshold):
+                self.stats.unchanged += 1
+                return None
+            if self._in_flight is not None:
+                self.stats.busy += 1
+                return None
+
+            self._last_processed = frame_hash
+            self.stats.ocr_runs += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preview-ocr')
+            future = self._executor.submit(self.process, frame)
+            self._in_flight = future
+        future.add_done_callback(lambda f: self._finished(frame, f))
+        return future
+
+    def _finished(self, frame: Any, future: Future) -> None:
+        with self._lock:
+            if self._in_flight is future:
+                self._in_flight = None
+        if not future.cancelled() and future.exception() is not None:
+            logger.debug("OCR de la vista previa fallido: %s", future.exception())
+        if self.on_result is not None:
+            self.on_result(frame, future)
+
+    def reset(self) -> None:
+        """Olvida los fotogramas vistos (p. ej. al volver a la pantalla)."""
+        with self._lock:
+            self._previous = None
+            self._last_processed = None
+            self._stable = 0
+
+    def shutdown(self) -> None:
+        """Descarta el OCR pendiente y libera el hilo."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._in_flight = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.reset()
@@ -0,0 +1,146 @@
+import hashlib
+import io
+import os
+from typing import Any, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lado largo mínimo tras reducir: con fotos de 12 MP (4000x3000) se decodifica
+# a la mitad, que sigue dando a Tesseract letras de sobra para leer el ticket
+TARGET_LONG_SIDE = 2000
+
+# Factores que libjpeg puede aplicar al decodificar (escala DCT), de mayor a menor
+_REDUCTIONS = (8, 4, 2)
+
+ImageSource = Union[str, os.PathLike, bytes, bytearray, memoryview, Any]
+
+def reduction_factor(width: int, height: int, target_side: int = TARGET_LONG_SIDE) -> int:
+    """
+    Mayor factor de reducción (1, 2, 4 u 8) que deja el lado largo de la
+    imagen en al menos ``target_side`` píxeles.
+
+    Args:
+        width: Ancho original
+        height: Alto original
+        target_side: Lado largo mínimo tras reducir (0 desactiva la reducción)
+
+    Returns:
+        Factor de reducción
+    """
+    long_side = max(width, height)
+    if target_side > 0:
+        for factor in _REDUCTIONS:
+            if long_side // factor >= target_side:
+                return factor
+    return 1
+
+def _imread_flag(factor: int, color: bool = False) -> int:
+    import cv2
+
+    if color:
+        return {
+            1: cv2.IMREAD_COLOR,
+            2: cv2.IMREAD_REDUCED_COLOR_2,
+            4: cv2.IMREAD_REDUCED_COLOR_4,
+            8: cv2.IMREAD_REDUCED_COLOR_8,
+        }[factor]
+    return {
+        1: cv2.IMREAD_GRAYSCALE,
+        2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+        4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+        8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    }[factor]
+
+def image_size(source: ImageSource) -> Tuple[int, int]:
+    """
+    Tamaño (ancho, alto) de una imagen codificada leyendo solo la cabecera.
+
+    Args:
+        source: Ruta o buffer con la imagen codificada
+
+    Returns:
+        Tupla (ancho, alto)
+    """
+    from PIL import Image
+
+    if isinstance(source, (str, os.PathLike)):
+        with Image.open(source) as image:
+            return image.size
+    # BytesIO no copia un objeto bytes; el resto de buffers sí (solo los
+    # bytes comprimidos, no la imagen decodificada)
+    with Image.open(io.BytesIO(source)) as image:
+        return image.size
+
+def decode_image(source: ImageSource, target_side: int = TARGET_LONG_SIDE,
+                 color: bool = False) -> Any:
+    """
+    Decodifica un ticket directamente a escala de grises y a resolución
+    reducida.
+
+    Las rutas se leen con ``cv2.imread`` y los buffers (bytes, bytearray,
+    memoryview, mmap) se pasan a ``cv2.imdecode`` como vista de numpy, sin
+    copiarlos. Con JPEG la reducción ocurre dentro del decodificador, de modo
+    que nunca se reserva la imagen BGR a tamaño completo. Los arrays de numpy
+    ya decodificados se devuelven tal cual.
+
+    Args:
+        source: Ruta, buffer con la imagen codificada o array de numpy
+        target_side: Lado largo mínimo tras reducir (0 decodifica a tamaño completo)
+        color: Decodifica en BGR en lugar de gris (para guardar o mostrar la foto)
+
+    Returns:
+        Imagen en escala de grises (``np.ndarray`` 2D de uint8) o BGR, o el array recibido
+
+    Raises:
+        ValueError: Si la imagen no se puede decodificar
+    """
+    if hasattr(source, 'shape'):
+        return source
+
+    import cv2
+    import numpy as np
+
+    try:
+        factor = reduction_factor(*image_size(source), target_side=target_side)
+    except Exception as e:
+        # Formatos que PIL no reconoce: se decodifica sin reducir
+        logger.debug("No se pudo leer la cabecera de la imagen: %s", e)
+        factor = 1
+
+    if isinstance(source, (str, os.PathLike)):
+        image = cv2.imread(os.fspath(source), _imread_flag(factor, color))
+    else:
+        image = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), _imread_flag(factor, color))
+    if image is None:
+        raise ValueError("Imagen no válida")
+    return image
+
+def to_pil(image: Any) -> Any:
+    """
+    Imagen de PIL que comparte la memoria del array (sin copia) cuando es
+    un array 2D de uint8 contiguo; en otro caso se convierte con
+    ``Image.fromarray``.
+    """
+    from PIL import Image
+
+    if image.ndim == 2 and image.dtype == 'uint8' and image.flags['C_CONTIGUOUS']:
+        height, width = image.shape
+        return Image.frombuffer('L', (width, height), image, 'raw', 'L', 0, 1)
+    return Image.fromarray(image)
+
+def image_sha256(image: Any) -> str:
+    """
+    Hash SHA-256 de una imagen (bytes codificados o array de numpy).
+
+    Para arrays se incluyen la forma y el tipo, de modo que dos imágenes
+    con los mismos bytes y distinta geometría no colisionan.
+    """
+    digest = hashlib.sha256()
+    if hasattr(image, 'shape') and hasattr(image, 'dtype'):
+        digest.update(f"{tuple(image.shape)}|{image.dtype}|".encode('ascii'))
+        data = memoryview(image) if image.flags['C_CONTIGUOUS'] else image.tobytes()
+        digest.update(data)
+    else:
+        digest.update(memoryview(image))
+    return digest.hexdigest()
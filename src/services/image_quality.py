@@ -0,0 +1,149 @@
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Motivos de rechazo y el mensaje que se muestra al usuario
+REASONS = {
+    'blur': "La foto está movida o desenfocada",
+    'glare': "Hay reflejos o la foto está sobreexpuesta",
+    'resolution': "La foto tiene muy poca resolución",
+    'skew': "El ticket está demasiado inclinado",
+}
+
+@dataclass(frozen=True)
+class QualityThresholds:
+    """
+    Umbrales del control de calidad. Las medidas se toman sobre una
+    miniatura de ``thumbnail_side`` píxeles de lado largo, así que los
+    umbrales de nitidez y reflejos dependen de ese tamaño.
+    """
+    thumbnail_side: int = 1024
+    min_sharpness: float = 100.0     # varianza del laplaciano
+    glare_level: int = 250           # gris a partir del cual un píxel está saturado
+    max_glare: float = 0.15          # fracción máxima de píxeles saturados
+    min_side: int = 1000             # lado largo mínimo de la imagen original
+    max_skew: float = 15.0           # grados
+
+@dataclass
+class QualityVerdict:
+    """Resultado del control de calidad de una captura."""
+    ok: bool
+    reasons: List[str] = field(default_factory=list)
+    sharpness: float = 0.0
+    glare_fraction: float = 0.0
+    width: int = 0
+    height: int = 0
+    skew_degrees: Optional[float] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def message(self) -> str:
+        """Motivos del rechazo en texto para el usuario ('' si es aceptable)."""
+        return ". ".join(REASONS[reason] for reason in self.reasons)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class ImageQualityError(ValueError):
+    """La captura no supera el control de calidad: hay que repetir la foto."""
+
+    def __init__(self, verdict: QualityVerdict):
+        super().__init__(verdict.message)
+        self.verdict = verdict
+
+def _thumbnail(image: Any, side: int) -> Any:
+    import cv2
+
+    height, width = image.shape[:2]
+    scale = side / max(width, height)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+def estimate_skew(gray: Any, max_angle: float = 45.0) -> Optional[float]:
+    """
+    Inclinación del texto en grados (positiva en sentido antihorario) por
+    perfil de proyección: se rota la tinta de una miniatura pequeña y se
+    elige el ángulo en el que las sumas por fila tienen mayor varianza
+    (las líneas de texto quedan horizontales). Primero en pasos de 3° y
+    luego de 0,5° alrededor del mejor.
+
+    Args:
+        gray: Imagen en escala de grises (normalmente la miniatura)
+        max_angle: Ángulo máximo a considerar
+
+    Returns:
+        Ángulo en grados o None si no hay texto suficiente
+    """
+    import cv2
+    import numpy as np
+
+    small = _thumbnail(gray, 512)
+    _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ink_fraction = float(ink.mean())
+    if not 0.005 <= ink_fraction <= 0.5:
+        return None
+    height, width = ink.shape
+    center = (width / 2, height / 2)
+
+    def score(angle):
+        matrix = cv2.getRotationMatrix2D(center, float(angle), 1.0)
+        rotated = cv2.warpAffine(ink, matrix, (width, height), flags=cv2.INTER_NEAREST)
+        return float(rotated.sum(axis=1, dtype=np.float64).var())
+
+    best = max(np.arange(-max_angle, max_angle + 0.01, 3.0), key=score)
+    best = max(np.arange(best - 3.0, best + 3.01, 0.5), key=score)
+    return -float(best)
+
+def assess_quality(image: Any, thresholds: Optional[QualityThresholds] = None) -> QualityVerdict:
+    """
+    Control de calidad rápido de una captura, antes del OCR.
+
+    Mide nitidez (varianza del laplaciano), reflejos (fracción de píxeles
+    saturados), resolución e inclinación sobre una miniatura, en unos pocos
+    milisegundos.
+
+    Args:
+        image: Imagen decodificada (BGR o escala de grises)
+        thresholds: Umbrales; por defecto ``QualityThresholds()``
+
+    Returns:
+        Veredicto con las medidas y los motivos de rechazo
+    """
+    import cv2
+
+    thresholds = thresholds or QualityThresholds()
+    start = time.perf_counter()
+    height, width = image.shape[:2]
+    thumb = _thumbnail(image, thresholds.thumbnail_side)
+
+    sharpness = float(cv2.Laplacian(thumb, cv2.CV_64F).var())
+    glare_fraction = float((thumb >= thresholds.glare_level).mean())
+    skew = estimate_skew(thumb)
+
+    reasons = []
+    if sharpness < thresholds.min_sharpness:
+        reasons.append('blur')
+    if glare_fraction > thresholds.max_glare:
+        reasons.append('glare')
+    if max(width, height) < thresholds.min_side:
+        reasons.append('resolution')
+    if skew is not None and abs(skew) > thresholds.max_skew:
+        reasons.append('skew')
+
+    return QualityVerdict(
+        ok=not reasons,
+        reasons=reasons,
+        sharpness=sharpness,
+        glare_fraction=glare_fraction,
+        width=width,
+        height=height,
+        skew_degrees=skew,
+        elapsed_ms=(time.perf_counter() - start) * 1000,
+    )
@@ -0,0 +1,234 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                              1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Histograma de latencias con buckets fijos, contador y errores."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'errors', 'total', 'max')
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimación del cuantil por el límite superior de su bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'error_rate': self.errors / self.count if self.count else 0.0,
+            'sum_s': self.total,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.quantile(0.50) * 1000,
+            'p95_ms': self.quantile(0.95) * 1000,
+            'p99_ms': self.quantile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+class MetricsRegistry:
+    """
+    Métricas por operación (p. ej. 'ocr.extract_text').
+
+    Desactivado por defecto: ``timed`` y ``span`` no miden nada hasta que se
+    llama a ``enable`` o se define la variable de entorno
+    ``BILLSPLIT_METRICS=1``.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def observe(self, name: str, seconds: float, error: bool = False) -> None:
+        """Registra una ejecución de la operación ``name``."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds, error)
+
+    def record_error(self, name: str) -> None:
+        """Cuenta un error que la operación capturó sin propagar la excepción."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.errors += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Resumen de todas las operaciones, apto para JSON."""
+        with self._lock:
+            return {name: histogram.to_dict()
+                    for name, histogram in sorted(self._histograms.items())}
+
+    def write_json(self, path: str) -> None:
+        """Vuelca el resumen a un archivo JSON."""
+        data = json.dumps({'timestamp': time.time(), 'operations': self.snapshot()}, indent=2)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+
+    def to_prometheus(self, prefix: str = 'billsplit') -> str:
+        """Exporta las métricas en el formato de texto de Prometheus."""
+        duration = f"{prefix}_operation_duration_seconds"
+        errors = f"{prefix}_operation_errors_total"
+        lines = [
+            f"# HELP {duration} Duración de las operaciones de los servicios.",
+            f"# TYPE {duration} histogram",
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            for name, histogram in histograms:
+                label = f'operation="{name}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{duration}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{duration}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f'{duration}_sum{{{label}}} {histogram.total}')
+                lines.append(f'{duration}_count{{{label}}} {histogram.count}')
+            lines.append(f"# HELP {errors} Operaciones que terminaron con una excepción.")
+            lines.append(f"# TYPE {errors} counter")
+            for name, histogram in histograms:
+                lines.append(f'{errors}{{operation="{name}"}} {histogram.errors}')
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorador que mide la latencia y los errores de una función.
+
+    Con las métricas desactivadas el único costo es comprobar un atributo.
+
+    Args:
+        name: Nombre de la operación (p. ej. 'storage.get_bill')
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                registry.observe(name, time.perf_counter() - start, error=True)
+                raise
+            registry.observe(name, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+def record_error(name: str) -> None:
+    """
+    Cuenta un error de ``name`` en los servicios que capturan la excepción
+    y devuelven un valor por defecto (no hace nada si está desactivado).
+    """
+    if registry.enabled:
+        registry.record_error(name)
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> '_Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        registry.observe(self.name, time.perf_counter() - self.start, error=exc_type is not None)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name: str):
+    """
+    Context manager que mide un bloque de código.
+
+    Uso:
+        with span('ocr.threshold'):
+            ...
+    """
+    if not registry.enabled:
+        return _NOOP_SPAN
+    return _Span(name)
+
+def configure_from_env(environ: Optional[Dict[str, str]] = None) -> None:
+    """
+    Activa las métricas según el entorno.
+
+    ``BILLSPLIT_METRICS=1`` las activa; ``BILLSPLIT_METRICS_FILE=<ruta>``
+    además vuelca el JSON al terminar el proceso.
+    """
+    environ = os.environ if environ is None else environ
+    if environ.get('BILLSPLIT_METRICS', '').lower() in ('1', 'true', 'yes', 'on'):
+        registry.enable()
+    path = environ.get('BILLSPLIT_METRICS_FILE')
+    if path:
+        registry.enable()
+        atexit.register(_dump_at_exit, path)
+
+def _dump_at_exit(path: str) -> None:
+    try:
+        registry.write_json(path)
+    except OSError as e:
+        logger.error("Error guardando métricas en %s: %s", path, e)
+
+configure_from_env()
@@ -0,0 +1,165 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+# Atributos estándar de LogRecord: lo demás son campos estructurados (extra=)
+_RECORD_ATTRS = (frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None)))
+                 | {'message', 'asctime'})
+
+# Niveles por subsistema (p. ej. 'services.ocr_service'); los loggers de
+# ``services``/``ui`` se configuran también con el prefijo ``src.`` (pruebas).
+# Por defecto solo se silencian las librerías ruidosas.
+DEFAULT_LEVELS: Dict[str, str] = {
+    'PIL': 'WARNING',
+    'kivy': 'WARNING',
+}
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """
+    Un objeto JSON por línea con la hora, nivel, logger y mensaje, más los
+    campos pasados con ``extra`` (p. ej. ``duration_ms``).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo que registra: el mensaje con sus
+    argumentos ``%`` se compone en el hilo del listener. Solo el traceback
+    se convierte a texto aquí, porque la pila deja de existir al salir del
+    ``except``.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Convierte ``"services.ocr_service=DEBUG,kivy=ERROR"`` en un diccionario."""
+    levels = {}
+    for part in spec.split(','):
+        name, sep, level = part.strip().partition('=')
+        if sep and name:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+_listener: Optional[QueueListener] = None
+
+def setup_logging(level: Optional[str] = None, levels: Optional[Dict[str, str]] = None,
+                  json_format: Optional[bool] = None, stream: Optional[TextIO] = None,
+                  filename: Optional[str] = None) -> QueueListener:
+    """
+    Configura el logging de la aplicación una sola vez, al arrancar.
+
+    Los loggers escriben en una cola en memoria y un hilo (QueueListener)
+    formatea y escribe en consola/archivo, de modo que la E/S no bloquea los
+    hilos de OCR ni la interfaz. Cada argumento tiene su variable de entorno:
+    BILLSPLIT_LOG_LEVEL, BILLSPLIT_LOG_LEVELS (``logger=NIVEL,...``),
+    BILLSPLIT_LOG_FORMAT (``json``/``text``) y BILLSPLIT_LOG_FILE.
+
+    Args:
+        level: Nivel raíz (por defecto INFO)
+        levels: Niveles por subsistema, se suman a DEFAULT_LEVELS
+        json_format: Registros JSON estructurados en lugar de texto
+        stream: Stream de salida (por defecto stderr)
+        filename: Archivo adicional de salida
+
+    Returns:
+        El QueueListener en marcha (se detiene solo al salir)
+    """
+    global _listener
+    environ = os.environ
+    level = level or environ.get('BILLSPLIT_LOG_LEVEL', 'INFO')
+    if json_format is None:
+        json_format = environ.get('BILLSPLIT_LOG_FORMAT', 'text').lower() == 'json'
+    filename = filename or environ.get('BILLSPLIT_LOG_FILE')
+    all_levels = dict(DEFAULT_LEVELS)
+    all_levels.update(parse_levels(environ.get('BILLSPLIT_LOG_LEVELS', '')))
+    all_levels.update(levels or {})
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(stream or sys.stderr)]
+    if filename:
+        handlers.append(logging.FileHandler(filename, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if _listener is not None:
+        _listener.stop()
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(level.upper())
+    for name, subsystem_level in all_levels.items():
+        logging.getLogger(name).setLevel(subsystem_level)
+        if name.split('.')[0] in ('services', 'ui'):
+            logging.getLogger(f"src.{name}").setLevel(subsystem_level)
+    return _listener
+
+def shutdown_logging() -> None:
+    """Vacía la cola y detiene el hilo de escritura."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
+@contextmanager
+def log_duration(log: logging.Logger, event: str, level: int = logging.DEBUG,
+                 **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Registra la duración de un bloque como campo estructurado.
+
+    Uso:
+        with log_duration(logger, 'ocr.process_image', image_bytes=n) as fields:
+            ...
+            fields['items'] = len(items)
+
+    Si el nivel no está habilitado no se mide ni se crea el registro.
+    """
+    if not log.isEnabledFor(level):
+        yield fields
+        return
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        log.log(level, "%s en %.1f ms", event, duration_ms,
+                extra={'event': event, 'duration_ms': round(duration_ms, 3), **fields})
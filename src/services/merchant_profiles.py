@@ -0,0 +1,191 @@
+import re
+from collections import namedtuple
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from .catalog_service import default_max_distance, levenshtein
+
+logger = logging.getLogger(__name__)
+
+# Fracción superior del ticket donde están el logo y el nombre del comercio
+HEADER_FRACTION = 0.15
+
+# Líneas que no son ítems aunque lleven precio
+DEFAULT_SKIP_WORDS = ['TOTAL', 'SUBTOTAL', 'IVA', 'PROPINA', 'CAMBIO', 'EFECTIVO', 'TARJETA',
+                      'IMPORTE']
+
+Word = namedtuple('Word', 'text left top width height')
+
+_PRICE_RE = re.compile(r'^[$€]?-?\d{1,3}(?:[.,]?\d{3})*[.,]\d{2}$')
+
+@dataclass
+class MerchantProfile:
+    """
+    Disposición conocida de los tickets de un comercio.
+
+    Las regiones son fracciones (0-1): ``item_region`` es ``(x0, y0, x1, y1)``
+    respecto al ticket y ``price_x_range`` es ``(x0, x1)`` respecto a la
+    región de ítems.
+    """
+    key: str
+    header_text: str = ''
+    logo_hash: Optional[int] = None
+    item_region: Tuple[float, float, float, float] = (0.0, HEADER_FRACTION, 1.0, 1.0)
+    price_x_range: Tuple[float, float] = (0.6, 1.0)
+    psm: int = 6
+    denoise: bool = True
+    decimal_sep: str = '.'
+    skip_words: List[str] = field(default_factory=lambda: list(DEFAULT_SKIP_WORDS))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MerchantProfile':
+        data = dict(data)
+        data['item_region'] = tuple(data.get('item_region') or cls.item_region)
+        data['price_x_range'] = tuple(data.get('price_x_range') or cls.price_x_range)
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+def header_key(text: str, lines: int = 2) -> str:
+    """
+    Clave normalizada del encabezado: las primeras líneas con texto, en
+    mayúsculas y solo con letras y números (tolera errores de puntuación
+    del OCR).
+    """
+    found = []
+    for line in text.splitlines():
+        normalized = ' '.join(re.findall(r'[A-Z0-9ÁÉÍÓÚÑÜ]+', line.upper()))
+        if len(normalized) >= 3:
+            found.append(normalized)
+        if len(found) == lines:
+            break
+    return ' | '.join(found)
+
+def same_header(read: str, known: str) -> bool:
+    """
+    Indica si un encabezado leído corresponde al de un perfil, tolerando
+    algunos errores del OCR. Un encabezado vacío nunca coincide.
+    """
+    if not read or not known:
+        return False
+    return levenshtein(read, known, default_max_distance(known)) <= default_max_distance(known)
+
+def header_strip(image: Any) -> Any:
+    """Franja superior del ticket (vista del array)."""
+    return image[:max(1, int(image.shape[0] * HEADER_FRACTION))]
+
+def words_to_lines(data: Dict[str, List[Any]]) -> List[List[Word]]:
+    """
+    Agrupa en líneas la salida de ``pytesseract.image_to_data`` (como dict).
+
+    Returns:
+        Líneas en orden de aparición, cada una con sus palabras de izquierda a derecha
+    """
+    lines: Dict[Tuple[int, int, int], List[Word]] = {}
+    for i, text in enumerate(data['text']):
+        text = str(text).strip()
+        if not text or float(data['conf'][i]) < 0:
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(
+            Word(text, data['left'][i], data['top'][i], data['width'][i], data['height'][i]))
+    return [sorted(words, key=lambda w: w.left) for words in lines.values()]
+
+def parse_price(text: str, decimal_sep: Optional[str] = None) -> Optional[float]:
+    """
+    Convierte un precio del ticket (``12.50``, ``1,234.50``, ``12,50``) a float.
+
+    Args:
+        text: Texto de la palabra
+        decimal_sep: Separador decimal conocido; si es None se toma el último
+            separador de la palabra
+
+    Returns:
+        El precio o None si la palabra no es un precio
+    """
+    text = text.strip()
+    if not _PRICE_RE.match(text):
+        return None
+    digits = text.lstrip('$€')
+    sep = decimal_sep or digits[-3]
+    thousands = ',' if sep == '.' else '.'
+    try:
+        return float(digits.replace(thousands, '').replace(sep, '.'))
+    except ValueError:
+        return None
+
+def parse_lines(lines: List[List[Word]], profile: MerchantProfile,
+                region_width: int) -> Dict[str, float]:
+    """
+    Extrae los ítems de las líneas de la región de ítems según el perfil:
+    el precio es la última palabra con precio dentro de ``price_x_range`` y
+    la descripción, lo que queda a su izquierda.
+    """
+    x0, x1 = profile.price_x_range
+    skip = [word.upper() for word in profile.skip_words]
+    items: Dict[str, float] = {}
+    for words in lines:
+        prices = [(w, parse_price(w.text, profile.decimal_sep)) for w in words
+                  if x0 <= (w.left + w.width / 2) / region_width <= x1]
+        prices = [(w, p) for w, p in prices if p is not None]
+        if not prices:
+            continue
+        price_word, price = prices[-1]
+        description = ' '.join(w.text for w in words if w.left + w.width <= price_word.left).strip()
+        if not description or any(s in description.upper() for s in skip):
+            continue
+        items[description] = price
+    return items
+
+def learn_profile(lines: List[List[Word]], items: Dict[str, float], shape: Tuple[int, ...],
+                  key: str, header_text: str = '', logo_hash: Optional[int] = None,
+                  psm: int = 6, denoise: bool = True,
+                  margin: float = 0.02) -> Optional[MerchantProfile]:
+    """
+    Deduce el perfil de un comercio a partir de un ticket ya leído.
+
+    Args:
+        lines: Líneas con cajas del ticket completo (``words_to_lines``)
+        items: Ítems que dio el OCR genérico
+        shape: Forma de la imagen del ticket
+        key: Clave del comercio
+        header_text: Encabezado normalizado
+        logo_hash: Hash perceptual de la franja del encabezado
+        psm, denoise: Ajustes con los que se leyó bien el ticket
+        margin: Margen añadido a las regiones
+
+    Returns:
+        El perfil o None si no hay al menos dos líneas de ítems reconocibles
+    """
+    height, width = shape[:2]
+    prices = {round(price, 2) for price in items.values()}
+    item_lines = []
+    for words in lines:
+        if len(words) < 2:
+            continue
+        price = parse_price(words[-1].text)
+        if price is not None and round(price, 2) in prices:
+            item_lines.append(words)
+    if len(item_lines) < 2:
+        return None
+
+    left = min(w.left for words in item_lines for w in words)
+    right = max(w.left + w.width for words in item_lines for w in words)
+    top = min(w.top for words in item_lines for w in words)
+    # Hasta el final del ticket: otro ticket del mismo comercio puede tener más ítems
+    region = (max(0.0, left / width - margin), max(0.0, top / height - margin),
+              min(1.0, right / width + margin), 1.0)
+    region_left = region[0] * width
+    region_width = (region[2] - region[0]) * width
+    price_words = [words[-1] for words in item_lines]
+    price_left = min(w.left for w in price_words) - region_left
+    price_right = max(w.left + w.width for w in price_words) - region_left
+    price_x_range = (max(0.0, price_left / region_width - margin),
+                     min(1.0, price_right / region_width + margin))
+    separators = [w.text.strip()[-3] for w in price_words]
+    decimal_sep = ',' if separators.count(',') > separators.count('.') else '.'
+    return MerchantProfile(key=key, header_text=header_text, logo_hash=logo_hash,
+                           item_region=region, price_x_range=price_x_range, psm=psm,
+                           denoise=denoise, decimal_sep=decimal_sep)
@@ -2,73 +2,513 @@ import pytesseract
 from PIL import Image, ImageEnhance
 import re
 from decimal import Decimal
-from typing import List, Tuple, Optional, Dict
+from collections import deque
+from typing import Any, Callable, Deque, List, Set, Tuple, Optional, Dict
 import logging
+import os
+import threading
+from dataclasses import dataclass
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 import numpy as np
 import cv2
 
-logging.basicConfig(level=logging.INFO)
+from .einvoice import EInvoice, read_einvoice
+from .image_hash import dhash, hamming
+from .image_ingest import TARGET_LONG_SIDE, decode_image, to_pil
+from .image_quality import ImageQualityError, QualityThresholds, QualityVerdict, assess_quality
+from .instrumentation import record_error, timed
+from .profiler import profile_session
+from .receipt_segmentation import find_receipts
+from .logging_config import log_duration
+from .merchant_profiles import (MerchantProfile, header_key, header_strip, learn_profile,
+                                parse_lines, same_header, words_to_lines)
+
 logger = logging.getLogger(__name__)
 
+@dataclass
+class OCRReading:
+    """
+    Ticket leído por ``OCRService.read`` y pendiente de ``finish``.
+    
+    ``items`` ya está resuelto si salió del QR o del perfil del comercio;
+    si es None, ``finish`` parsea ``text``.
+    """
+    source: Any
+    image: np.ndarray
+    text: str = ''
+    items: Optional[Dict[str, float]] = None
+    invoice: Optional[EInvoice] = None
+    header_text: str = ''
+    logo_hash: Optional[int] = None
+    # Comercio sin perfil: aprenderlo con los items parseados
+    learn: bool = False
+
 class OCRService:
     """Servicio para procesar imágenes de tickets usando OCR."""
     
-    def __init__(self):
+    def __init__(self, capture_store=None, profile_store=None):
         self.logger = logging.getLogger(__name__)
         # Configurar pytesseract para español
         self.config = '--psm 6 --oem 3 -l spa'
+        self.lang = 'eng'
+        self.denoise = True
+        # Lado largo mínimo al decodificar rutas/bytes (0 = tamaño completo)
+        self.target_side = TARGET_LONG_SIDE
+        # Control de calidad antes del OCR (rechaza fotos movidas o con reflejos)
+        self.quality_gate = False
+        self.quality_thresholds = QualityThresholds()
+        # Lectura del QR fiscal/de ticket antes del OCR
+        self.einvoice = True
+        # Varios tickets en una foto: se decodifica con más resolución y
+        # cada ticket se procesa en paralelo (Tesseract es un proceso aparte)
+        self.multi_target_side = 2 * TARGET_LONG_SIDE
+        self.receipt_workers = min(4, os.cpu_count() or 1)
+        self._receipt_pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # Corpus donde guardar cada llamada para reproducirla (CaptureStore)
+        self.capture_store = capture_store
+        # Perfiles de comercio (StorageService): los tickets de comercios
+        # conocidos solo se leen en la región de ítems con sus ajustes
+        self.profile_store = profile_store
+        self.logo_distance = 6
+        # El perfil de un comercio nuevo se aprende en segundo plano (una
+        # pasada de OCR con cajas), fuera del camino de la petición
+        self._learn_pool: Optional[ThreadPoolExecutor] = None
+        self._learning: Set[str] = set()
+        # Comercios cuyo perfil no se pudo aprender: no se vuelve a leer su
+        # encabezado ni a intentarlo en esta ejecución
+        self._unlearnable: Set[str] = set()
+        self._unlearnable_logos: Deque[int] = deque(maxlen=256)
     
-    def process_image(self, image: np.ndarray) -> Dict[str, float]:
+    def params(self) -> Dict[str, object]:
+        """Parámetros de preprocesado y del motor, tal como se guardan en las capturas."""
+        return {
+            'engine': 'tesseract',
+            'config': self.config,
+            'lang': self.lang,
+            'threshold': 'otsu',
+            'denoise': self.denoise,
+            'target_side': self.target_side,
+            'quality_gate': self.quality_gate,
+            'einvoice': self.einvoice,
+            'merchant_profiles': self.profile_store is not None,
+        }
+    
+    @timed('ocr.process_image')
+    def process_image(self, image,
+                      on_stage: Optional[Callable[[str, object], None]] = None) -> Dict[str, float]:
         """
         Procesa una imagen de ticket y extrae los items y precios.
         
         Args:
-            image: Imagen del ticket en formato numpy array
+            image: Imagen del ticket: ruta, bytes/buffer con la imagen
+                codificada (se decodifica en gris y reducida) o numpy array
+            on_stage: Callback ``on_stage(etapa, valor)`` que se llama al
+                terminar cada etapa ('decode', 'einvoice', 'quality',
+                'preprocess', 'text', 'items'; las que no aplican reciben
+                None). Lo usa el OCR especulativo para mostrar el progreso y
+                puede lanzar ``CancelledError`` para abandonar el trabajo.
             
+        Si el ticket trae un QR con el detalle de items (ver ``einvoice``) se
+        devuelven esos items sin ejecutar Tesseract. Si el QR es fiscal y solo
+        trae el total (CFDI, TicketBAI, Verifactu), se ejecuta el OCR y el
+        total se usa para validar los items detectados.
+        
         Returns:
-            Diccionario con los items y sus precios
+            Diccionario con los items y sus precios (vacío si la imagen no se
+            pudo leer; ``read_items`` propaga el error)
+            
+        Raises:
+            ImageQualityError: Si ``quality_gate`` está activo y la captura
+                no supera el control de calidad
+            CancelledError: Si ``on_stage`` la lanza
         """
         try:
-            text = self.extract_text(image)
-            return self.parse_bill(text)
+            return self.read_items(image, on_stage)
+        except ImageQualityError as e:
+            self.logger.warning("Captura rechazada (%s)", ', '.join(e.verdict.reasons),
+                                extra={'event': 'ocr.quality_rejected', **e.verdict.to_dict()})
+            record_error('ocr.quality_rejected')
+            raise
+        except CancelledError:
+            raise
         except Exception as e:
-            self.logger.error(f"Error procesando imagen: {str(e)}")
+            self.logger.error("Error procesando imagen: %s", e)
+            record_error('ocr.process_image')
             return {}
     
-    def preprocess_image(self, image: np.ndarray) -> np.ndarray:
+    def read_items(self, image,
+                   on_stage: Optional[Callable[[str, object], None]] = None) -> Dict[str, float]:
+        """
+        Como ``process_image`` pero propaga cualquier error (imagen ilegible,
+        fallo de Tesseract) en lugar de devolver un diccionario vacío.
+        """
+        return self.finish(self.read(image, on_stage), on_stage)
+    
+    @timed('ocr.read')
+    def read(self, image, on_stage: Optional[Callable[[str, object], None]] = None,
+             source: Any = None) -> OCRReading:
+        """
+        Primera mitad de ``process_image``: decodifica la imagen, lee el QR,
+        pasa el control de calidad y obtiene el texto del ticket (con el
+        perfil del comercio si se conoce). El parseo queda para ``finish``,
+        de modo que un pipeline puede leer un ticket mientras parsea otro.
+        
+        Args:
+            image: Ruta, bytes/buffer o numpy array del ticket
+            on_stage: Ver ``process_image`` (todas las etapas menos 'items')
+            source: Imagen tal como llegó (ruta o bytes) si ``image`` ya viene
+                decodificada; es la que se guarda en la captura
+            
+        Returns:
+            Lectura con el texto y, si ya se conocen (QR, perfil del
+            comercio), los items
+            
+        Raises:
+            ImageQualityError: Si la captura no supera el control de calidad
+            Exception: Cualquier error al decodificar o al ejecutar el OCR
+        """
+        emit = on_stage or (lambda stage, value: None)
+        source = image if source is None else source
+        image = decode_image(image, self.target_side)
+        emit('decode', image)
+        invoice = self.scan_einvoice(image) if self.einvoice else None
+        emit('einvoice', invoice)
+        reading = OCRReading(source=source, image=image, invoice=invoice)
+        if invoice is not None and invoice.items:
+            self.logger.info("Ticket leído del QR (%s): %d items",
+                             invoice.format, len(invoice.items),
+                             extra={'event': 'ocr.einvoice', 'einvoice': invoice.format})
+            reading.text, reading.items = invoice.raw, dict(invoice.items)
+            for stage, value in (('quality', None), ('preprocess', None), ('text', invoice.raw)):
+                emit(stage, value)
+            return reading
+        verdict = self.assess_quality(image) if self.quality_gate else None
+        emit('quality', verdict)
+        if verdict is not None and not verdict.ok:
+            raise ImageQualityError(verdict)
+        # Con BILLSPLIT_PROFILE=1 se guarda un perfil de la sesión junto
+        # con el hash de la imagen para reproducir los tickets lentos
+        with profile_session('ocr', image=image) as session, \
+                log_duration(self.logger, 'ocr.read') as fields:
+            profile, reading.header_text, reading.logo_hash = (
+                self.match_merchant(image) if self.profile_store is not None else (None, '', None))
+            text, items = self._read_with_profile(image, profile) if profile else ('', {})
+            if items:
+                fields['merchant'] = profile.key
+                fields['items'] = len(items)
+                self.profile_store.record_merchant_hit(profile.key)
+                reading.items = items
+                emit('preprocess', None)
+            else:
+                pil_image = self.prepare_image(image)
+                emit('preprocess', pil_image)
+                text = self.recognize(pil_image)
+                # Comercio nuevo: su perfil se aprende con los items parseados
+                reading.learn = profile is None and bool(reading.header_text)
+            reading.text = text
+            session.record(text=text)
+            emit('text', text)
+        return reading
+    
+    def finish(self, reading: OCRReading,
+               on_stage: Optional[Callable[[str, object], None]] = None) -> Dict[str, float]:
+        """
+        Segunda mitad de ``process_image``: parsea el texto de una lectura
+        de ``read`` (si sus items no vinieron del QR o del perfil), valida el
+        total del QR fiscal, programa el aprendizaje del comercio y guarda
+        la captura.
+        
+        Returns:
+            Diccionario con los items y sus precios
+        """
+        items = reading.items
+        if items is None:
+            items = self.parse_bill(reading.text)
+            if reading.learn and items and self.profile_store is not None:
+                self._schedule_learning(reading.image, items, reading.header_text,
+                                        reading.logo_hash)
+            if reading.invoice is not None and reading.invoice.total is not None:
+                self._check_total(items, reading.invoice)
+        if on_stage is not None:
+            on_stage('items', items)
+        if self.capture_store is not None:
+            self._capture(reading.source, reading.text, items)
+        return items
+    
+    @timed('ocr.process_receipts')
+    def process_receipts(self, image) -> List[Dict[str, float]]:
+        """
+        Procesa una foto con uno o varios tickets colocados uno junto a otro.
+        
+        Los tickets se detectan con ``find_receipts`` y cada uno pasa por el
+        OCR en paralelo en el pool de ``receipt_workers`` hilos.
+        
+        Args:
+            image: Ruta, bytes/buffer o numpy array de la foto
+            
+        Returns:
+            Una lista de items por ticket, en orden de lectura
+            
+        Raises:
+            ImageQualityError: Si ``quality_gate`` está activo y la foto
+                no supera el control de calidad
+        """
+        try:
+            image = decode_image(image, self.multi_target_side)
+            if self.quality_gate:
+                verdict = self.assess_quality(image)
+                if not verdict.ok:
+                    raise ImageQualityError(verdict)
+            with log_duration(self.logger, 'ocr.process_receipts') as fields:
+                regions = find_receipts(image)
+                crops = [region.crop(image) for region in regions]
+                results = list(self._get_receipt_pool().map(self._process_region, crops))
+                fields['receipts'] = len(results)
+            return results
+        except ImageQualityError:
+            record_error('ocr.quality_rejected')
+            raise
+        except Exception as e:
+            self.logger.error("Error procesando los tickets: %s", e)
+            record_error('ocr.process_receipts')
+            return []
+    
+    def _get_receipt_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._receipt_pool is None:
+                self._receipt_pool = ThreadPoolExecutor(max_workers=self.receipt_workers,
+                                                        thread_name_prefix='ocr-receipt')
+            return self._receipt_pool
+    
+    def _process_region(self, crop: np.ndarray) -> Dict[str, float]:
+        """OCR de un ticket recortado (con el atajo del QR si lo tiene)."""
+        invoice = self.scan_einvoice(crop) if self.einvoice else None
+        if invoice is not None and invoice.items:
+            return dict(invoice.items)
+        return self.parse_bill(self.extract_text(crop))
+    
+    @timed('ocr.match_merchant')
+    def match_merchant(self, image) -> Tuple[Optional[MerchantProfile], str, Optional[int]]:
+        """
+        Busca el perfil del comercio del ticket por el hash del encabezado
+        y lo confirma leyendo solo la franja del encabezado; si no aparece o
+        el texto no coincide, lo busca por ese texto (salvo que sea de un
+        comercio que no se pudo aprender).
+        
+        Args:
+            image: Ticket decodificado
+            
+        Returns:
+            Tupla (perfil o None, encabezado normalizado si se leyó, hash del
+            encabezado o None si no se pudo calcular)
+        """
+        try:
+            header = header_strip(image)
+            logo_hash = dhash(header)
+            found = self.profile_store.find_merchant_profile(logo_hash=logo_hash,
+                                                             max_distance=self.logo_distance)
+            if found is None and any(hamming(logo_hash, known) <= self.logo_distance
+                                     for known in list(self._unlearnable_logos)):
+                return None, '', logo_hash
+            # Un logo parecido no basta (encabezados genéricos, otro local de
+            # la misma plantilla): el perfil se confirma con el texto
+            header_text = header_key(self.recognize(to_pil(self.preprocess_image(header))))
+            if found is not None and not same_header(header_text, found.get('header_text', '')):
+                self.logger.info("El encabezado no coincide con el perfil %s", found.get('key'))
+                found = None
+            if found is None and header_text:
+                found = self.profile_store.find_merchant_profile(header_text=header_text)
+            return (MerchantProfile.from_dict(found) if found else None), header_text, logo_hash
+        except Exception as e:
+            self.logger.error("Error identificando el comercio: %s", e)
+            record_error('ocr.match_merchant')
+            return None, '', None
+    
+    def _read_with_profile(self, image: np.ndarray,
+                           profile: MerchantProfile) -> Tuple[str, Dict[str, float]]:
+        """OCR de la región de ítems con los ajustes del perfil."""
+        try:
+            height, width = image.shape[:2]
+            x0, y0, x1, y1 = profile.item_region
+            top, left = int(y0 * height), int(x0 * width)
+            region = image[top:max(top + 1, int(y1 * height)), left:max(left + 1, int(x1 * width))]
+            pil_image = to_pil(self.preprocess_image(region, denoise=profile.denoise))
+            data = pytesseract.image_to_data(pil_image, lang=self.lang,
+                                             config=f'--psm {profile.psm}',
+                                             output_type=pytesseract.Output.DICT)
+            lines = words_to_lines(data)
+            text = '\n'.join(' '.join(word.text for word in line) for line in lines)
+            return text, parse_lines(lines, profile, region.shape[1])
+        except Exception as e:
+            self.logger.error("Error leyendo con el perfil %s: %s", profile.key, e)
+            record_error('ocr.read_with_profile')
+            return '', {}
+    
+    def _schedule_learning(self, image: np.ndarray, items: Dict[str, float], header_text: str,
+                           logo_hash: Optional[int]) -> None:
+        """Programa el aprendizaje del perfil de un comercio (una vez por comercio)."""
+        with self._pool_lock:
+            if header_text in self._learning or header_text in self._unlearnable:
+                return
+            self._learning.add(header_text)
+            if self._learn_pool is None:
+                self._learn_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ocr-learn')
+            self._learn_pool.submit(self._learn_merchant, image, items, header_text, logo_hash)
+    
+    def _learn_merchant(self, image: np.ndarray, items: Dict[str, float], header_text: str,
+                        logo_hash: Optional[int]) -> None:
+        """
+        Aprende el perfil de un comercio nuevo a partir de un ticket leído con
+        el OCR genérico. Cuesta una pasada de OCR con cajas; se ejecuta en el
+        hilo de ``_schedule_learning``.
+        """
+        profile = None
+        try:
+            psm = 6
+            pil_image = to_pil(self.preprocess_image(image))
+            data = pytesseract.image_to_data(pil_image, lang=self.lang, config=f'--psm {psm}',
+                                             output_type=pytesseract.Output.DICT)
+            profile = learn_profile(words_to_lines(data), items, image.shape, key=header_text,
+                                    header_text=header_text, logo_hash=logo_hash, psm=psm,
+                                    denoise=self.denoise)
+            if profile is not None:
+                self.profile_store.save_merchant_profile(profile.to_dict())
+                self.logger.info("Perfil de comercio aprendido: %s", header_text,
+                                 extra={'event': 'ocr.merchant_learned', 'merchant': header_text})
+        except Exception as e:
+            self.logger.error("Error aprendiendo el perfil de comercio: %s", e)
+            record_error('ocr.learn_merchant')
+        finally:
+            with self._pool_lock:
+                self._learning.discard(header_text)
+                if profile is None:
+                    self._unlearnable.add(header_text)
+                    if logo_hash is not None:
+                        self._unlearnable_logos.append(logo_hash)
+    
+    def wait_learning(self) -> None:
+        """Espera a que terminen los aprendizajes de perfiles programados."""
+        with self._pool_lock:
+            pool, self._learn_pool = self._learn_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+    
+    @timed('ocr.scan_einvoice')
+    def scan_einvoice(self, image) -> Optional[EInvoice]:
+        """
+        Busca un QR de factura electrónica o de ticket en la imagen.
+        
+        Args:
+            image: Ruta, bytes/buffer o numpy array
+            
+        Returns:
+            Datos del QR reconocido o None
+        """
+        try:
+            return read_einvoice(decode_image(image, self.target_side))
+        except Exception as e:
+            self.logger.error("Error leyendo el QR: %s", e)
+            record_error('ocr.scan_einvoice')
+            return None
+    
+    def _check_total(self, items: Dict[str, float], invoice: EInvoice) -> bool:
+        """Compara la suma de los items del OCR con el total del QR fiscal."""
+        matches = self.validate_items([(d, Decimal(str(p))) for d, p in items.items()],
+                                      invoice.total)
+        if not matches:
+            self.logger.warning("Los items del OCR no suman el total del QR (%s): %s",
+                                invoice.format, invoice.total)
+        return matches
+    
+    def _capture(self, source: Any, text: str, items: Dict[str, float]) -> None:
+        """
+        Guarda en el corpus la imagen tal como llegó (los bytes del archivo,
+        no la versión decodificada y reducida), para que la reproducción
+        pueda probar otra decodificación, ``target_side`` o preprocesado.
+        """
+        try:
+            if isinstance(source, (str, os.PathLike)):
+                with open(source, 'rb') as f:
+                    source = f.read()
+            self.capture_store.capture(source, self.params(), text, items)
+        except Exception as e:
+            # Una captura fallida no debe afectar al resultado del OCR
+            self.logger.error("Error capturando ticket: %s", e)
+    
+    @timed('ocr.assess_quality')
+    def assess_quality(self, image) -> QualityVerdict:
+        """
+        Evalúa nitidez, reflejos, resolución e inclinación de una captura
+        sin ejecutar el OCR.
+        
+        Args:
+            image: Ruta, bytes/buffer o numpy array
+            
+        Returns:
+            Veredicto del control de calidad
+        """
+        return assess_quality(decode_image(image, self.target_side), self.quality_thresholds)
+    
+    @timed('ocr.preprocess_image')
+    def preprocess_image(self, image: np.ndarray, denoise: Optional[bool] = None) -> np.ndarray:
         """Preprocess the image for better OCR results."""
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            denoise = self.denoise if denoise is None else denoise
+            # Convert to grayscale (decode_image ya entrega gris)
+            if image.ndim == 2:
+                gray, owned = image, False
+            else:
+                gray, owned = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), True
             
-            # Apply thresholding to get a binary image
-            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            # Apply thresholding to get a binary image; sobre la copia en gris
+            # propia se umbraliza en el sitio, nunca sobre el array recibido
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                                      dst=gray if owned else None)
             
             # Noise removal
+            if not denoise:
+                return binary
             denoised = cv2.fastNlMeansDenoising(binary)
             
             return denoised
         except Exception as e:
-            self.logger.error(f"Error preprocessing image: {str(e)}")
+            self.logger.error("Error preprocessing image: %s", e)
+            record_error('ocr.preprocess_image')
             return image
 
-    def extract_text(self, image: np.ndarray) -> str:
+    def prepare_image(self, image):
+        """
+        Decodifica y preprocesa una imagen y la devuelve como imagen de PIL
+        que comparte la memoria del array preprocesado.
+        """
+        processed_image = self.preprocess_image(decode_image(image, self.target_side))
+        return to_pil(processed_image)
+
+    @timed('ocr.extract_text')
+    def extract_text(self, image, on_stage: Optional[Callable[[str, object], None]] = None) -> str:
         """Extract text from the preprocessed image."""
         try:
-            # Preprocess the image
-            processed_image = self.preprocess_image(image)
-            
-            # Convert numpy array to PIL Image
-            pil_image = Image.fromarray(processed_image)
+            # Preprocess the image (rutas y bytes se decodifican reducidos)
+            pil_image = self.prepare_image(image)
+            if on_stage is not None:
+                on_stage('preprocess', pil_image)
             
             # Extract text using pytesseract
-            text = pytesseract.image_to_string(pil_image, lang='eng')
-            
-            return text.strip()
+            return self.recognize(pil_image)
+        except CancelledError:
+            raise
         except Exception as e:
-            self.logger.error(f"Error extracting text: {str(e)}")
+            self.logger.error("Error extracting text: %s", e)
+            record_error('ocr.extract_text')
             return ""
 
+    def recognize(self, pil_image) -> str:
+        """Ejecuta Tesseract sobre una imagen ya preprocesada (de ``prepare_image``)."""
+        text = pytesseract.image_to_string(pil_image, lang=self.lang)
+        return text.strip()
+
+    @timed('ocr.parse_bill')
     def parse_bill(self, text: str) -> Dict[str, float]:
         """Parse the extracted text to identify items and prices."""
         try:
@@ -93,9 +533,11 @@ class OCRService:
             
             return items
         except Exception as e:
-            self.logger.error(f"Error parsing bill: {str(e)}")
+            self.logger.error("Error parsing bill: %s", e)
+            record_error('ocr.parse_bill')
             return {}
     
+    @timed('ocr.parse_text')
     def _parse_text(self, text: str) -> List[Tuple[str, Decimal]]:
         """
         Parsea el texto extraído para identificar items y precios.
@@ -0,0 +1,183 @@
+import threading
+import weakref
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional, Sequence, Tuple
+import logging
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger(__name__)
+
+HEADER_FORM = 'billsplit-header'
+
+@lru_cache(maxsize=None)
+def register_font(font_path: Optional[str], fallback: str) -> str:
+    """
+    Registra una fuente TrueType una sola vez por proceso.
+
+    Args:
+        font_path: Ruta al .ttf (None para usar una fuente estándar)
+        fallback: Fuente estándar de PDF a usar si no hay ``font_path``
+
+    Returns:
+        Nombre con el que usar la fuente en el canvas
+    """
+    if font_path is None:
+        return fallback
+    name = f"billsplit-{Path(font_path).stem}"
+    pdfmetrics.registerFont(TTFont(name, font_path))
+    return name
+
+class PDFTemplate:
+    """
+    Plantilla de recibo con las partes estáticas precalculadas.
+
+    La geometría (posiciones, filas por página), las fuentes y el logo se
+    resuelven una vez al construir la plantilla. La cabecera estática se
+    define una sola vez por documento como Form XObject y se reutiliza en
+    cada resumen del documento; por cuenta solo se dibujan las partes
+    variables.
+    """
+
+    def __init__(self, static_title: Optional[str] = None, logo_path: Optional[str] = None,
+                 font_path: Optional[str] = None, bold_font_path: Optional[str] = None,
+                 pagesize: Tuple[float, float] = letter, margin: float = 50):
+        self.static_title = static_title
+        self.pagesize = pagesize
+        self.width, self.height = pagesize
+        self.font = register_font(font_path, 'Helvetica')
+        self.bold_font = register_font(bold_font_path, 'Helvetica-Bold')
+        # El logo se decodifica una vez y se reutiliza en todos los documentos
+        self.logo = ImageReader(logo_path) if logo_path else None
+        # Canvas en los que ya se definió la cabecera; el nombre del form es
+        # propio de la plantilla para que dos plantillas puedan compartir documento
+        self.header_form = f"{HEADER_FORM}-{id(self):x}"
+        self._defined_in: 'weakref.WeakSet[canvas.Canvas]' = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+        # Geometría de columnas y filas
+        self.left = margin
+        self.price_right = self.width - margin
+        self.title_y = self.height - 50
+        self.subtitle_y = self.height - 80
+        self.items_label_y = self.height - 120
+        self.first_row_y = self.height - 140
+        self.continued_row_y = self.height - 50
+        self.bottom = 100
+        self.line_height = 15
+        self.total_line_height = 18
+        self.rows_first_page = int((self.first_row_y - self.bottom) // self.line_height) + 1
+        self.rows_per_page = int((self.continued_row_y - self.bottom) // self.line_height) + 1
+
+    def _define_header(self, c: canvas.Canvas) -> None:
+        """Define la cabecera estática en el documento (una vez por canvas)."""
+        with self._lock:
+            if c in self._defined_in:
+                return
+            self._defined_in.add(c)
+        c.beginForm(self.header_form)
+        if self.logo is not None:
+            logo_w, logo_h = self.logo.getSize()
+            scale = 40 / logo_h
+            c.drawImage(self.logo, self.price_right - logo_w * scale, self.title_y - 15,
+                        width=logo_w * scale, height=40, mask='auto')
+        if self.static_title:
+            c.setFont(self.bold_font, 16)
+            c.drawString(self.left, self.title_y, self.static_title)
+        c.setFont(self.bold_font, 12)
+        c.drawString(self.left, self.items_label_y, "Items:")
+        c.endForm()
+
+    def draw_header(self, c: canvas.Canvas, title: Optional[str] = None,
+                    subtitle: Optional[str] = None) -> None:
+        """Estampa la cabecera estática y dibuja el título/subtítulo variables."""
+        self._define_header(c)
+        c.doForm(self.header_form)
+        if title:
+            c.setFont(self.bold_font, 16)
+            c.drawString(self.left, self.title_y, title)
+        if subtitle:
+            c.setFont(self.font, 12)
+            c.drawString(self.left, self.subtitle_y, subtitle)
+
+    def draw_rows(self, c: canvas.Canvas, rows: Sequence[Tuple[str, str]]) -> float:
+        """
+        Dibuja las filas (descripción, importe) paginando según la geometría
+        precalculada.
+
+        Returns:
+            Coordenada y libre después de la última fila
+        """
+        y = self.first_row_y
+        capacity = self.rows_first_page
+        start = 0
+        while True:
+            chunk = rows[start:start + capacity]
+            # Un text object por columna y página en lugar de un drawString por celda
+            text = c.beginText(self.left, y)
+            text.setFont(self.font, 10)
+            text.setLeading(self.line_height)
+            for description, _ in chunk:
+                text.textLine(description)
+            c.drawText(text)
+
+            prices = c.beginText()
+            prices.setFont(self.font, 10)
+            row_y = y
+            for _, amount in chunk:
+                width = pdfmetrics.stringWidth(amount, self.font, 10)
+                prices.setTextOrigin(self.price_right - width, row_y)
+                prices.textOut(amount)
+                row_y -= self.line_height
+            c.drawText(prices)
+
+            start += capacity
+            if start >= len(rows):
+                return row_y
+            c.showPage()
+            y = self.continued_row_y
+            capacity = self.rows_per_page
+
+    def draw_totals(self, c: canvas.Canvas, y: float,
+                    totals: Sequence[Tuple[str, str, bool]]) -> None:
+        """Dibuja las líneas de totales (etiqueta, importe, en negrita)."""
+        y -= 20
+        if y < self.bottom - self.line_height:
+            c.showPage()
+            y = self.continued_row_y
+        for label, amount, bold in totals:
+            c.setFont(self.bold_font if bold else self.font, 12)
+            c.drawString(self.left, y, label)
+            c.drawRightString(self.price_right, y, amount)
+            y -= self.total_line_height
+
+    def render(self, target: Any, rows: Sequence[Tuple[str, str]],
+               totals: Sequence[Tuple[str, str, bool]], title: Optional[str] = None,
+               subtitle: Optional[str] = None) -> None:
+        """
+        Genera un documento completo.
+
+        Args:
+            target: Ruta o stream binario donde escribir el PDF
+            rows: Filas (descripción, importe ya formateado)
+            totals: Líneas de totales (etiqueta, importe, negrita)
+            title: Título variable (si la plantilla no tiene uno estático)
+            subtitle: Subtítulo variable (p. ej. la fecha)
+        """
+        c = canvas.Canvas(target, pagesize=self.pagesize)
+        self.draw_header(c, title, subtitle)
+        y = self.draw_rows(c, rows)
+        self.draw_totals(c, y, totals)
+        c.save()
+
+@lru_cache(maxsize=32)
+def get_template(static_title: Optional[str] = None, logo_path: Optional[str] = None,
+                 font_path: Optional[str] = None,
+                 bold_font_path: Optional[str] = None) -> PDFTemplate:
+    """Devuelve la plantilla cacheada en este proceso para esa configuración."""
+    return PDFTemplate(static_title, logo_path, font_path, bold_font_path)
@@ -0,0 +1,277 @@
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+
+from .image_ingest import image_sha256
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ProfilerSettings:
+    """
+    Configuración del modo de perfilado.
+
+    Variables de entorno:
+        BILLSPLIT_PROFILE=1            activa el perfilado
+        BILLSPLIT_PROFILE_DIR          directorio de salida (por defecto data/profiles,
+                                       dentro del directorio de StorageService)
+        BILLSPLIT_PROFILE_INTERVAL_MS  intervalo de muestreo
+        BILLSPLIT_PROFILE_MIN_MS       solo se guardan las sesiones más lentas que esto
+    """
+    enabled: bool = False
+    output_dir: str = os.path.join('data', 'profiles')
+    interval: float = 0.005
+    min_duration: float = 0.0
+    save_inputs: bool = True
+
+    @classmethod
+    def from_env(cls, environ: Optional[Dict[str, str]] = None) -> 'ProfilerSettings':
+        environ = os.environ if environ is None else environ
+        defaults = cls()
+        return cls(
+            enabled=environ.get('BILLSPLIT_PROFILE', '').lower() in ('1', 'true', 'yes', 'on'),
+            output_dir=environ.get('BILLSPLIT_PROFILE_DIR', defaults.output_dir),
+            interval=float(environ.get('BILLSPLIT_PROFILE_INTERVAL_MS',
+                                       defaults.interval * 1000)) / 1000,
+            min_duration=float(environ.get('BILLSPLIT_PROFILE_MIN_MS', 0)) / 1000,
+        )
+
+settings = ProfilerSettings.from_env()
+
+def configure(**changes: Any) -> ProfilerSettings:
+    """
+    Cambia la configuración en tiempo de ejecución (p. ej. desde la
+    pantalla de configuración o la CLI).
+
+    Returns:
+        La configuración resultante
+    """
+    global settings
+    settings = replace(settings, **changes)
+    return settings
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo de un hilo.
+
+    Un hilo auxiliar lee la pila del hilo perfilado con
+    ``sys._current_frames`` cada ``interval`` segundos y cuenta las pilas
+    en formato colapsado (``raíz;...;hoja``), el que usan flamegraph.pl y
+    speedscope. El hilo perfilado no ejecuta ningún código extra.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[';'.join(stack)] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='billsplit-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        """Pilas colapsadas, una por línea: ``a;b;c <muestras>``."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfileSession:
+    """
+    Sesión de perfilado: muestrea el hilo actual mientras dura el bloque y
+    al salir escribe en ``output_dir``:
+
+    - ``<id>.collapsed``: pilas colapsadas (flame graph)
+    - ``<id>.json``: metadatos (tipo, duración, hash de la imagen, ...)
+    - ``inputs/<sha256>.npy`` o ``.bin``: la imagen de entrada, para
+      reproducir el caso con ``replay_profile``
+    """
+
+    def __init__(self, kind: str, image: Any = None, metadata: Optional[Dict[str, Any]] = None,
+                 config: Optional[ProfilerSettings] = None):
+        self.kind = kind
+        self.image = image
+        self.metadata = dict(metadata or {})
+        self.config = config or settings
+        self.profiler = SamplingProfiler(interval=self.config.interval)
+        self.path: Optional[str] = None
+
+    def record(self, **values: Any) -> None:
+        """Añade resultados a los metadatos (p. ej. los items detectados)."""
+        self.metadata.update(values)
+
+    def __enter__(self) -> 'ProfileSession':
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.profiler.stop()
+        duration = time.perf_counter() - self.start
+        if duration < self.config.min_duration:
+            return
+        try:
+            self.path = self._write(duration, error=None if exc_type is None else repr(exc))
+        except Exception as e:
+            # El perfilado nunca debe romper la operación perfilada
+            logger.error("Error guardando el perfil: %s", e)
+
+    def _write(self, duration: float, error: Optional[str]) -> str:
+        os.makedirs(self.config.output_dir, exist_ok=True)
+        image_hash = image_sha256(self.image) if self.image is not None else None
+        session_id = (f"{self.started_at.strftime('%Y%m%d_%H%M%S')}_{self.kind}_"
+                      f"{(image_hash or 'noinput')[:12]}_{uuid.uuid4().hex[:6]}")
+        base = os.path.join(self.config.output_dir, session_id)
+
+        input_path = None
+        if image_hash and self.config.save_inputs:
+            input_path = self._save_input(image_hash)
+
+        with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+            f.write(self.profiler.collapsed())
+        meta = {
+            'id': session_id,
+            'kind': self.kind,
+            'started_at': self.started_at.isoformat(),
+            'duration_s': duration,
+            'samples': self.profiler.samples,
+            'interval_s': self.profiler.interval,
+            'image_sha256': image_hash,
+            'input_path': input_path,
+            'error': error,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'metadata': self.metadata,
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+        return base + '.json'
+
+    def _save_input(self, image_hash: str) -> str:
+        inputs_dir = os.path.join(self.config.output_dir, 'inputs')
+        os.makedirs(inputs_dir, exist_ok=True)
+        if hasattr(self.image, 'shape'):
+            import numpy as np
+
+            path = os.path.join(inputs_dir, f"{image_hash}.npy")
+            if not os.path.exists(path):
+                np.save(path, self.image)
+        else:
+            path = os.path.join(inputs_dir, f"{image_hash}.bin")
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(bytes(self.image))
+        return os.path.relpath(path, self.config.output_dir)
+
+class _NoopSession:
+    path = None
+
+    def record(self, **values: Any) -> None:
+        pass
+
+    def __enter__(self) -> '_NoopSession':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+_NOOP_SESSION = _NoopSession()
+
+def profile_session(kind: str, image: Any = None, metadata: Optional[Dict[str, Any]] = None):
+    """
+    Perfila un bloque si el modo de perfilado está activo.
+
+    Uso:
+        with profile_session('ocr', image=image):
+            ...
+
+    Args:
+        kind: Tipo de sesión ('ocr', 'split', ...)
+        image: Imagen de entrada (se guarda su hash para reproducir el caso)
+        metadata: Datos adicionales para el archivo de metadatos
+    """
+    if not settings.enabled:
+        return _NOOP_SESSION
+    return ProfileSession(kind, image, metadata)
+
+def load_profile_input(meta_path: str) -> Any:
+    """
+    Carga la imagen de entrada de una sesión perfilada.
+
+    Args:
+        meta_path: Ruta al ``.json`` de la sesión
+
+    Returns:
+        Array de numpy o bytes, según cómo llegó la imagen
+    """
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if not meta.get('input_path'):
+        raise FileNotFoundError(f"La sesión {meta['id']} no guardó la imagen de entrada")
+    path = os.path.join(os.path.dirname(meta_path), meta['input_path'])
+    if path.endswith('.npy'):
+        import numpy as np
+
+        return np.load(path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+def replay_profile(meta_path: str, ocr_service) -> Dict[str, Any]:
+    """
+    Reproduce offline el OCR de una sesión perfilada.
+
+    Args:
+        meta_path: Ruta al ``.json`` de la sesión
+        ocr_service: Instancia de OCRService
+
+    Returns:
+        Items detectados, duración y hash de la imagen
+    """
+    image = load_profile_input(meta_path)
+    start = time.perf_counter()
+    items = ocr_service.process_image(image)
+    return {
+        'items': items,
+        'duration_s': time.perf_counter() - start,
+        'image_sha256': image_sha256(image),
+    }
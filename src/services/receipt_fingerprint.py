@@ -0,0 +1,103 @@
+import hashlib
+from decimal import Decimal, InvalidOperation
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .catalog_service import normalize
+
+# Los hashes de 64 bits se parten en 4 trozos de 16 bits para el índice
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+_CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# Ítems mínimos para marcar un duplicado solo por la firma de ítems: con
+# uno o dos ítems muchas cuentas distintas coinciden por casualidad
+MIN_ITEMS = 3
+
+def _cents(price: Any) -> Optional[int]:
+    try:
+        return int((Decimal(str(price)) * 100).to_integral_value())
+    except (InvalidOperation, ValueError):
+        return None
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def item_signature(items: Any) -> Optional[int]:
+    """
+    Firma de 64 bits de los ítems de una cuenta (SimHash).
+
+    Cada ítem aporta dos rasgos con el mismo peso: su descripción
+    normalizada (``catalog_service.normalize``) y su precio en centavos.
+    Dos lecturas OCR del mismo ticket que difieren en una letra o un precio
+    cambian un solo rasgo de ``2 * n`` y dan firmas cercanas (tanto más
+    cuantos más ítems tenga la cuenta); dos cuentas de un ítem con el mismo
+    precio y distinta descripción no coinciden. El orden de los ítems no
+    influye.
+
+    Args:
+        items: Diccionario descripción -> precio, lista de ``(descripción,
+            precio)`` o lista de ``{'description', 'price'}``
+
+    Returns:
+        La firma o None si no hay ítems
+    """
+    if isinstance(items, dict):
+        pairs: Iterable[Tuple[Any, Any]] = items.items()
+    else:
+        pairs = [(item.get('description'), item.get('price')) if isinstance(item, dict)
+                 else tuple(item)[:2]
+                 for item in items or ()]
+    weights = [0] * HASH_BITS
+    found = False
+    for description, price in pairs:
+        cents = _cents(price)
+        features = [f'desc:{normalize(str(description or ""))}']
+        if cents is not None:
+            features.append(f'price:{cents}')
+        for feature in features:
+            value = _feature_hash(feature)
+            for bit in range(HASH_BITS):
+                weights[bit] += 1 if value >> bit & 1 else -1
+        found = True
+    if not found:
+        return None
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hash_chunks(value: int) -> List[int]:
+    """Trozos de ``CHUNK_BITS`` bits del hash, del más significativo al menos."""
+    return [(value >> (CHUNK_BITS * (CHUNKS - 1 - i))) & _CHUNK_MASK for i in range(CHUNKS)]
+
+def chunk_probes(value: int, max_distance: int) -> List[List[int]]:
+    """
+    Valores a buscar en cada trozo del índice (multi-index hashing).
+
+    Si dos hashes están a ``max_distance`` bits o menos, por el principio
+    del palomar al menos uno de sus ``CHUNKS`` trozos difiere en
+    ``max_distance // CHUNKS`` bits o menos. Basta buscar cada trozo con
+    ese radio en su columna indexada y verificar la distancia completa de
+    los resultados.
+
+    Returns:
+        Por cada trozo, los valores a ese radio del trozo del hash
+    """
+    radius = max_distance // CHUNKS
+    probes = []
+    for chunk in hash_chunks(value):
+        values = [chunk]
+        for flips in range(1, radius + 1):
+            for bits in combinations(range(CHUNK_BITS), flips):
+                values.append(chunk ^ sum(1 << bit for bit in bits))
+        probes.append(values)
+    return probes
+
+def to_hex(value: Optional[int]) -> Optional[str]:
+    """Hash en hexadecimal de 16 dígitos (como se guarda en la base de datos)."""
+    return f"{value:016x}" if value is not None else None
+
+def from_hex(value: Any) -> Optional[int]:
+    """Acepta un hash como entero o en hexadecimal."""
+    if value is None or value == '':
+        return None
+    return value if isinstance(value, int) else int(str(value), 16)
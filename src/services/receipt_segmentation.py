@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from typing import Any, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lado largo de la miniatura sobre la que se buscan los tickets
+DETECTION_SIDE = 800
+
+@dataclass(frozen=True)
+class ReceiptRegion:
+    """Rectángulo de un ticket dentro de la foto, en píxeles de la imagen original."""
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def area(self) -> int:
+        return self.width * self.height
+
+    def crop(self, image: Any) -> Any:
+        """Recorte del ticket (vista del array, sin copia)."""
+        return image[self.y:self.y + self.height, self.x:self.x + self.width]
+
+def _reading_order(regions: List[ReceiptRegion]) -> List[ReceiptRegion]:
+    """Ordena por filas (de arriba abajo) y dentro de cada fila de izquierda a derecha."""
+    rows: List[List[ReceiptRegion]] = []
+    for region in sorted(regions, key=lambda r: r.y):
+        row = rows[-1] if rows else None
+        # Misma fila si empieza antes de la mitad del primer ticket de la fila
+        if row and region.y < row[0].y + row[0].height / 2:
+            row.append(region)
+        else:
+            rows.append([region])
+    return [region for row in rows for region in sorted(row, key=lambda r: r.x)]
+
+def find_receipts(image: Any, min_area_fraction: float = 0.02, max_receipts: int = 12,
+                  padding: float = 0.01) -> List[ReceiptRegion]:
+    """
+    Detecta los tickets de una foto (papel claro sobre fondo más oscuro).
+
+    Sobre una miniatura se umbraliza con Otsu, se cierra con una operación
+    morfológica para que el texto no parta el papel y se toman los contornos
+    externos suficientemente grandes. Los rectángulos son paralelos a los
+    ejes: los tickets se suponen colocados uno junto a otro, no girados.
+
+    Args:
+        image: Imagen decodificada (gris o BGR)
+        min_area_fraction: Área mínima de un ticket respecto a la foto
+        max_receipts: Máximo de tickets a devolver (los más grandes)
+        padding: Margen añadido a cada recorte, como fracción del lado largo
+
+    Returns:
+        Regiones en orden de lectura; una sola con la foto completa si no se
+        distinguen tickets separados
+    """
+    import cv2
+
+    height, width = image.shape[:2]
+    whole = [ReceiptRegion(0, 0, width, height)]
+    scale = min(1.0, DETECTION_SIDE / max(width, height))
+    small = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                       interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    small = cv2.GaussianBlur(small, (5, 5), 0)
+    _, paper = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
+    paper = cv2.morphologyEx(paper, cv2.MORPH_CLOSE, kernel)
+
+    contours, _ = cv2.findContours(paper, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_area_fraction * paper.shape[0] * paper.shape[1]
+    boxes = [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) >= min_area]
+    if len(boxes) < 2:
+        return whole
+    # Un "ticket" que ocupa casi toda la foto es la foto de un solo ticket
+    if any(w * h >= 0.9 * paper.shape[0] * paper.shape[1] for _, _, w, h in boxes):
+        return whole
+
+    boxes = sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)[:max_receipts]
+    pad = round(padding * max(width, height))
+    regions = []
+    for x, y, w, h in boxes:
+        x0 = max(0, round(x / scale) - pad)
+        y0 = max(0, round(y / scale) - pad)
+        x1 = min(width, round((x + w) / scale) + pad)
+        y1 = min(height, round((y + h) / scale) + pad)
+        regions.append(ReceiptRegion(x0, y0, x1 - x0, y1 - y0))
+    return _reading_order(regions)
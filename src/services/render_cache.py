@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def content_hash(*parts: Any) -> str:
+    """
+    Hash estable del contenido (independiente del orden de las claves).
+
+    Decimal, datetime y demás tipos no JSON se serializan con ``str``.
+
+    Args:
+        parts: Datos a identificar (cuenta, vista por comensal, formato...)
+
+    Returns:
+        Hash SHA-256 en hexadecimal
+    """
+    canonical = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False,
+                           separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class RenderCache:
+    """
+    Caché LRU de documentos renderizados, en memoria y en disco.
+
+    Cada documento nuevo se guarda en memoria y en ``cache_dir``; lo que
+    la LRU de memoria expulsa (o lo que quedó de una ejecución anterior) se
+    lee del disco sin volver a renderizar. ``get_or_render`` devuelve los
+    bytes y ``get_or_render_path`` la ruta del archivo en la caché.
+
+    Las entradas se identifican por el hash del contenido y la variante
+    (formato, comensal), así que una cuenta editada nunca devuelve un
+    documento viejo. Además, cuando un mismo ``owner`` (el ID de la cuenta)
+    vuelve a renderizar una variante con otro contenido, la entrada anterior
+    se descarta de inmediato en lugar de esperar a la expulsión LRU.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_memory_bytes: int = 8 * 1024 * 1024,
+                 max_memory_entries: int = 256, max_disk_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.RLock()
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: 'OrderedDict[str, int]' = OrderedDict()
+        self._disk_bytes = 0
+        # (owner, variante) -> clave vigente
+        self._current: Dict[Tuple[Hashable, str], str] = {}
+
+        if cache_dir and os.path.isdir(cache_dir):
+            self._load_disk_index()
+
+    def _load_disk_index(self) -> None:
+        """Recupera las entradas en disco de ejecuciones anteriores (más viejas primero)."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    @staticmethod
+    def make_key(content: Any, variant: str) -> str:
+        """Clave (y nombre de archivo) para un contenido y una variante como 'pdf'."""
+        extension = variant.rsplit('.', 1)[-1]
+        return f"{content_hash(content, variant)[:40]}.{extension}"
+
+    def get_or_render(self, content: Any, variant: str, render: Callable[[], bytes],
+                      owner: Optional[Hashable] = None) -> bytes:
+        """
+        Devuelve el documento cacheado o lo renderiza y lo guarda.
+
+        Args:
+            content: Datos de los que depende el documento
+            variant: Formato/vista (p. ej. 'pdf', 'summary.txt', 'diner-<id>.pdf')
+            render: Función que genera los bytes si no están en caché
+            owner: Identidad de la cuenta, para invalidar versiones anteriores
+
+        Returns:
+            Bytes del documento
+        """
+        key = self.make_key(content, variant)
+        with self._lock:
+            self._track(owner, variant, key)
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+            data = self._read_disk(key)
+            if data is not None:
+                self.hits += 1
+                self._store_memory(key, data)
+                return data
+            self.misses += 1
+
+        data = bytes(render())
+        with self._lock:
+            self._store_memory(key, data)
+            self._write_disk(key, data)
+        return data
+
+    def get_or_render_path(self, content: Any, variant: str, render: Callable[[], bytes],
+                           owner: Optional[Hashable] = None) -> str:
+        """
+        Como ``get_or_render`` pero devuelve la ruta del archivo cacheado
+        (requiere ``cache_dir``). Un acierto no lee ni escribe el archivo.
+        """
+        if not self.cache_dir:
+            raise ValueError("RenderCache sin directorio en disco")
+        key = self.make_key(content, variant)
+        path = os.path.join(self.cache_dir, key)
+        with self._lock:
+            self._track(owner, variant, key)
+            if key in self._disk:
+                if os.path.exists(path):
+                    self._disk.move_to_end(key)
+                    self.hits += 1
+                    return path
+                # Alguien borró el archivo: se olvida la entrada
+                self._disk_bytes -= self._disk.pop(key)
+
+        data = self.get_or_render(content, variant, render, owner)
+        with self._lock:
+            if key not in self._disk:
+                self._write_disk(key, data)
+            if key not in self._disk:
+                # Más grande que el límite de disco: se escribe igual para
+                # poder devolver la ruta, sin indexarlo
+                self._write_file(path, data)
+        return path
+
+    def invalidate(self, owner: Hashable) -> None:
+        """Elimina todas las entradas vigentes de una cuenta."""
+        with self._lock:
+            for (entry_owner, variant) in [k for k in self._current if k[0] == owner]:
+                self._drop(self._current.pop((entry_owner, variant)))
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._disk):
+                self._drop(key)
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._current.clear()
+
+    def _track(self, owner: Optional[Hashable], variant: str, key: str) -> None:
+        if owner is None:
+            return
+        previous = self._current.get((owner, variant))
+        if previous is not None and previous != key:
+            # La cuenta cambió desde el último render: la versión vieja ya no sirve
+            self._drop(previous)
+        self._current[(owner, variant)] = key
+
+    def _drop(self, key: str) -> None:
+        data = self._memory.pop(key, None)
+        if data is not None:
+            self._memory_bytes -= len(data)
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, key))
+            except OSError:
+                pass
+
+    def _store_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory and (self._memory_bytes > self.max_memory_bytes or
+                                len(self._memory) > self.max_memory_entries):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if key not in self._disk:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            # Alguien borró el archivo: se olvida la entrada
+            self._disk_bytes -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        return data
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if not self.cache_dir or len(data) > self.max_disk_bytes or key in self._disk:
+            return
+        try:
+            self._write_file(os.path.join(self.cache_dir, key), data)
+        except OSError as e:
+            self.logger.warning("No se pudo escribir en la caché de render: %s", e)
+            return
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Escritura atómica: nunca se sirve un archivo a medio escribir
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict_disk(self) -> None:
+        while self._disk and self._disk_bytes > self.max_disk_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, key))
+            except OSError:
+                pass
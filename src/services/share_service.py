@@ -1,9 +1,10 @@
 import os
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, BinaryIO
 import logging
 from datetime import datetime
 import json
+import io
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
@@ -11,20 +12,62 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
 import tempfile
 import platform
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
+from .pdf_templates import get_template
+from .render_cache import RenderCache
+from .artifact_store import ArtifactStore
+from .summary_renderer import SummaryRenderer
+from .instrumentation import timed
 from ..models.models import Bill
 from ..utils.config import TEMP_DIR, SHARE_OPTIONS
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _draw_diner_summary(c: canvas.Canvas, view: Dict[str, Any]) -> None:
+    """Dibuja el resumen de un comensal en el canvas (puede ocupar varias páginas)."""
+    template = get_template()
+    template.draw_header(c, title=f"Resumen de cuenta para {view['name']}",
+                         subtitle=f"Fecha: {view['date']}")
+    rows = [(description, f"${price:.2f}") for description, price in view['items']]
+    y = template.draw_rows(c, rows)
+    template.draw_totals(c, y, [
+        ("Subtotal:", f"${view['subtotal']:.2f}", False),
+        ("Propina:", f"${view['tip_amount']:.2f}", False),
+        ("Total:", f"${view['total']:.2f}", True),
+    ])
+
+def _render_diner_pdf(view: Dict[str, Any], filepath: Union[str, BinaryIO]) -> Union[str, BinaryIO]:
+    """Genera el PDF de un comensal. Función de módulo para poder usarla en otro proceso."""
+    c = canvas.Canvas(filepath, pagesize=letter)
+    _draw_diner_summary(c, view)
+    c.save()
+    return filepath
+
 class ShareService:
     """Servicio para compartir facturas."""
     
     def __init__(self, output_dir: str = "output"):
         self.output_dir = output_dir
+        # Directorio de los resúmenes por comensal (por defecto, el de salida)
+        self.temp_dir = output_dir
         self.logger = logging.getLogger(__name__)
         self._ensure_output_dir()
+        # Documentos ya renderizados, por hash del contenido: compartir dos
+        # veces la misma cuenta no vuelve a generar nada
+        self.render_cache = RenderCache(os.path.join(output_dir, '.render_cache'))
+        # Archivos generados: TTL, cuota y leases compartidos por directorio
+        self.artifacts = ArtifactStore.for_directory(output_dir)
+        # Archivos que esta instancia comparte, con un lease propio cada uno
+        # (los más recientes al final); por encima de ``max_shared`` se
+        # sueltan los más viejos y quedan a cargo del TTL y la cuota
+        self.max_shared = 64
+        self._shared: 'OrderedDict[str, None]' = OrderedDict()
+        self._shared_lock = threading.Lock()
+        # Plantillas de texto por canal, compiladas una vez por instancia
+        self.summary_renderer = SummaryRenderer()
     
     def _ensure_output_dir(self):
         """Ensure the output directory exists."""
@@ -32,64 +75,104 @@ class ShareService:
             if not os.path.exists(self.output_dir):
                 os.makedirs(self.output_dir)
         except Exception as e:
-            self.logger.error(f"Error creating output directory: {str(e)}")
+            self.logger.error("Error creating output directory: %s", e)
             raise
     
+    @timed('share.generate_pdf')
     def generate_pdf(self, bill_data: Dict, filename: Optional[str] = None) -> str:
         """Generate a PDF file from bill data."""
         try:
             if filename is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"bill_{timestamp}.pdf"
-            
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Create PDF
-            c = canvas.Canvas(filepath, pagesize=letter)
-            width, height = letter
-            
-            # Add title
-            c.setFont("Helvetica-Bold", 16)
-            c.drawString(50, height - 50, "Bill Splitter - Receipt")
-            
-            # Add date
-            c.setFont("Helvetica", 12)
-            c.drawString(50, height - 80, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-            
-            # Add items
-            y = height - 120
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "Items:")
-            
-            y -= 20
-            c.setFont("Helvetica", 10)
-            total = 0
-            for item, price in bill_data.get('items', {}).items():
-                c.drawString(50, y, f"{item}")
-                c.drawString(width - 100, y, f"${price:.2f}")
-                total += price
-                y -= 15
-                
-                # Check if we need a new page
-                if y < 50:
-                    c.showPage()
-                    y = height - 50
-                    c.setFont("Helvetica", 10)
+                # Nombre por contenido: compartir dos veces la misma cuenta
+                # devuelve el archivo ya generado sin reescribirlo; el archivo
+                # queda fuera de la caché de render, que puede expulsarlo en
+                # cualquier momento
+                date = self._render_date(bill_data)
+                key = self.render_cache.make_key((bill_data, date), 'pdf')
+                path = os.path.join(self.output_dir, f"bill_{key[:16]}.pdf")
+                if self._store_for(path).touch(path):
+                    return self._hold(path)
+                return self._write_artifact(path, self._cached_pdf(bill_data, date))
             
-            # Add total
-            y -= 20
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "Total:")
-            c.drawString(width - 100, y, f"${total:.2f}")
-            
-            # Save PDF
-            c.save()
-            return filepath
+            return self._write_artifact(os.path.join(self.output_dir, filename),
+                                        self._cached_pdf(bill_data))
             
         except Exception as e:
-            self.logger.error(f"Error generating PDF: {str(e)}")
+            self.logger.error("Error generating PDF: %s", e)
+            raise
+    
+    @staticmethod
+    def _render_date(bill_data: Dict) -> str:
+        """
+        Fecha que se imprime en la cuenta y el resumen: la de la propia
+        cuenta (``date`` o ``created_at``), de modo que una cuenta sin
+        cambios conserva su clave en la caché de render. Las cuentas sin
+        fecha (aún no guardadas) muestran el día actual.
+        """
+        value = bill_data.get('date') or bill_data.get('created_at')
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                return value
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d %H:%M')
+        return datetime.now().strftime('%Y-%m-%d')
+    
+    def _draw_pdf(self, bill_data: Dict, target: Union[str, BinaryIO], date: str) -> None:
+        """Dibuja el PDF de la cuenta en una ruta o en un stream binario."""
+        # La plantilla cacheada aporta cabecera, fuentes y geometría;
+        # aquí solo se dibujan las filas de esta cuenta
+        template = get_template("Bill Splitter - Receipt")
+        items = bill_data.get('items', {})
+        total = sum(items.values())
+        template.render(
+            target,
+            rows=[(str(item), f"${price:.2f}") for item, price in items.items()],
+            totals=[("Total:", f"${total:.2f}", True)],
+            subtitle=f"Date: {date}"
+        )
+    
+    def write_pdf(self, bill_data: Dict, stream: BinaryIO) -> None:
+        """
+        Escribe el PDF de la cuenta en un stream binario sin generar archivos de salida.
+        
+        Args:
+            bill_data: Datos de la factura
+            stream: Destino con ``write`` (p. ej. ``BytesIO``, socket, respuesta HTTP)
+        """
+        try:
+            stream.write(self._cached_pdf(bill_data))
+        except Exception as e:
+            self.logger.error("Error generating PDF: %s", e)
             raise
     
+    @timed('share.render_pdf')
+    def render_pdf(self, bill_data: Dict) -> memoryview:
+        """
+        Genera el PDF de la cuenta en memoria.
+        
+        Args:
+            bill_data: Datos de la factura
+            
+        Returns:
+            Vista de solo lectura de los bytes del PDF (cacheados por contenido)
+        """
+        return memoryview(self._cached_pdf(bill_data))
+    
+    def _cached_pdf(self, bill_data: Dict, date: Optional[str] = None) -> bytes:
+        date = date or self._render_date(bill_data)
+        return self.render_cache.get_or_render(
+            (bill_data, date), 'pdf', lambda: self._render_pdf_bytes(bill_data, date),
+            owner=bill_data.get('id'))
+    
+    @timed('share.draw_pdf')
+    def _render_pdf_bytes(self, bill_data: Dict, date: str) -> bytes:
+        buffer = io.BytesIO()
+        self._draw_pdf(bill_data, buffer, date)
+        return buffer.getvalue()
+    
+    @timed('share.generate_json')
     def generate_json(self, bill_data: Dict[str, Any]) -> Path:
         """
         Genera un archivo JSON con los datos de la factura.
@@ -102,18 +185,64 @@ class ShareService:
         """
         try:
             # Crear archivo temporal
-            json_path = self.output_dir / f'bill_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            json_path = Path(self.output_dir) / f'bill_{timestamp}.json'
             
             # Guardar datos
-            with open(json_path, 'w') as f:
-                json.dump(bill_data, f, indent=2)
+            with open(json_path, 'wb') as f:
+                self.write_json(bill_data, f)
             
+            self._register(str(json_path))
             return json_path
             
         except Exception as e:
-            logger.error(f"Error generando JSON: {str(e)}")
+            logger.error("Error generando JSON: %s", e)
             raise
     
+    def write_json(self, bill_data: Dict[str, Any], stream: BinaryIO) -> None:
+        """
+        Escribe los datos de la factura como JSON (UTF-8) en un stream binario.
+        
+        Args:
+            bill_data: Datos de la factura
+            stream: Destino con ``write``
+        """
+        stream.write(self.render_json(bill_data))
+    
+    @timed('share.render_json')
+    def render_json(self, bill_data: Dict[str, Any]) -> bytes:
+        """
+        Genera el JSON de la factura en memoria.
+        
+        Args:
+            bill_data: Datos de la factura
+            
+        Returns:
+            Bytes UTF-8 del JSON
+        """
+        return json.dumps(bill_data, indent=2).encode('utf-8')
+    
+    def render_bill(self, bill_data: Dict[str, Any],
+                    format: str = 'pdf') -> Union[bytes, memoryview]:
+        """
+        Equivalente en memoria de ``share_bill``: devuelve los bytes en lugar
+        de una ruta, para compartir por portapapeles, email o HTTP sin
+        escribir en disco.
+        
+        Args:
+            bill_data: Datos de la factura
+            format: Formato de salida ('pdf' o 'json')
+            
+        Returns:
+            Contenido generado
+        """
+        if format.lower() == 'pdf':
+            return self.render_pdf(bill_data)
+        elif format.lower() == 'json':
+            return self.render_json(bill_data)
+        else:
+            raise ValueError(f"Formato no soportado: {format}")
+    
     def share_bill(self, bill_data: Dict[str, Any], format: str = 'pdf') -> Optional[Path]:
         """
         Comparte una factura en el formato especificado.
@@ -134,42 +263,269 @@ class ShareService:
                 raise ValueError(f"Formato no soportado: {format}")
             
         except Exception as e:
-            logger.error(f"Error compartiendo factura: {str(e)}")
+            logger.error("Error compartiendo factura: %s", e)
             raise
     
+    def _store_for(self, path: str) -> ArtifactStore:
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory == os.path.abspath(self.output_dir):
+            return self.artifacts
+        return ArtifactStore.for_directory(directory)
+    
+    def _write_artifact(self, path: str, data: bytes) -> str:
+        """Escribe un archivo generado (de forma atómica) y lo registra."""
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return self._register(path)
+    
+    def _register(self, path: str) -> str:
+        """Registra un archivo generado por esta instancia en su almacén."""
+        self._store_for(path).register(path)
+        return self._hold(path)
+    
+    def _hold(self, path: str) -> str:
+        """
+        Toma el lease de esta instancia sobre un archivo registrado (uno solo
+        aunque se comparta varias veces) hasta ``cleanup``.
+        """
+        with self._shared_lock:
+            if path in self._shared:
+                self._shared.move_to_end(path)
+                return path
+            self._store_for(path).acquire(path)
+            self._shared[path] = None
+            while len(self._shared) > self.max_shared:
+                oldest, _ = self._shared.popitem(last=False)
+                self._store_for(oldest).release(oldest)
+        return path
+    
+    def lease(self, path: str):
+        """
+        Protege un archivo generado mientras se comparte.
+        
+        Solo admite archivos devueltos por este servicio (``share_bill``,
+        ``generate_pdf``, ``generate_json``...), nunca rutas de la caché de
+        render.
+        
+        Uso:
+            with service.lease(path):
+                enviar(path)
+        """
+        return self._store_for(path).lease(path)
+    
     def cleanup(self):
-        """Limpia los archivos temporales."""
+        """
+        Suelta los leases de esta instancia y borra sus archivos.
+        
+        Los archivos con otro lease activo (otra instancia comparte el mismo
+        contenido) se conservan; los borra la última instancia que los
+        suelte o, más adelante, el TTL y la cuota del ArtifactStore.
+        """
         try:
-            for file in self.output_dir.glob('*'):
-                try:
-                    file.unlink()
-                except Exception as e:
-                    logger.warning(f"Error eliminando archivo temporal {file}: {str(e)}")
+            with self._shared_lock:
+                shared, self._shared = list(self._shared), OrderedDict()
+            for path in shared:
+                store = self._store_for(path)
+                store.release(path)
+                store.discard([path])
         except Exception as e:
-            logger.error(f"Error limpiando archivos temporales: {str(e)}")
-    
-    def __del__(self):
-        """Destructor que limpia los archivos temporales."""
-        self.cleanup()
+            logger.error("Error limpiando archivos temporales: %s", e)
 
+    @timed('share.generate_summary')
     def generate_summary(self, bill_data: Dict) -> str:
         """Generate a text summary of the bill."""
         try:
-            summary = []
-            summary.append("Bill Summary")
-            summary.append("=" * 50)
-            summary.append(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-            summary.append("\nItems:")
+            date = self._render_date(bill_data)
+            data = self.render_cache.get_or_render(
+                (bill_data, date), 'summary.txt',
+                lambda: self._render_summary(bill_data, date).encode('utf-8'),
+                owner=bill_data.get('id'))
+            return data.decode('utf-8')
             
-            total = 0
-            for item, price in bill_data.get('items', {}).items():
-                summary.append(f"{item}: ${price:.2f}")
-                total += price
-                
-            summary.append("\nTotal: ${:.2f}".format(total))
+        except Exception as e:
+            self.logger.error("Error generating summary: %s", e)
+            raise
+    
+    def _render_summary(self, bill_data: Dict, date: str) -> str:
+        summary = []
+        summary.append("Bill Summary")
+        summary.append("=" * 50)
+        summary.append(f"Date: {date}")
+        summary.append("\nItems:")
+        
+        total = 0
+        for item, price in bill_data.get('items', {}).items():
+            summary.append(f"{item}: ${price:.2f}")
+            total += price
+            
+        summary.append("\nTotal: ${:.2f}".format(total))
+        
+        return "\n".join(summary)
+    
+    def _diner_view(self, bill: Bill, diner_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Extrae los datos de un comensal necesarios para renderizar su resumen.
+        
+        Args:
+            bill: Cuenta
+            diner_id: ID del comensal
+            
+        Returns:
+            Diccionario serializable (apto para otro proceso) o None si el
+            comensal no existe
+        """
+        diner = next((d for d in bill.diners if d.id == diner_id), None)
+        if diner is None:
+            return None
+        return {
+            'name': diner.name,
+            'date': bill.date.strftime('%Y-%m-%d %H:%M'),
+            'items': [(item.description, item.price) for item in diner.items],
+            'subtotal': diner.subtotal,
+            'tip_amount': diner.tip_amount,
+            'total': diner.total
+        }
+    
+    def _summary_path(self, bill: Bill, suffix: str) -> str:
+        return os.path.join(self.temp_dir, f"summary_{str(bill.id)[:8]}_{suffix}.pdf")
+    
+    @timed('share.generate_pdf_summary')
+    def generate_pdf_summary(self, bill: Bill, diner_id: str) -> Optional[str]:
+        """
+        Genera el PDF con el resumen de un comensal.
+        
+        Args:
+            bill: Cuenta
+            diner_id: ID del comensal
+            
+        Returns:
+            Ruta al PDF generado (en ``temp_dir``, con el mismo nombre que
+            en ``generate_all_summaries``) o None si el comensal no existe
+        """
+        try:
+            view = self._diner_view(bill, diner_id)
+            if view is None:
+                return None
+            index = next(i for i, diner in enumerate(bill.diners) if diner.id == diner_id)
+            data = self.render_cache.get_or_render(
+                view, f"diner-{diner_id}.pdf",
+                lambda: _render_diner_pdf(view, io.BytesIO()).getvalue(),
+                owner=bill.id)
+            return self._write_artifact(self._summary_path(bill, f"{index + 1:02d}"), data)
+        except Exception as e:
+            self.logger.error("Error generating PDF summary: %s", e)
+            raise
+    
+    @timed('share.generate_all_summaries')
+    def generate_all_summaries(self, bill: Bill, workers: Optional[int] = None,
+                               combined: bool = False) -> List[str]:
+        """
+        Genera los PDFs de todos los comensales de la cuenta.
+        
+        Cada PDF se renderiza en un proceso del pool, de modo que una cuenta
+        con muchos comensales aprovecha todos los núcleos.
+        
+        Args:
+            bill: Cuenta
+            workers: Procesos a usar (por defecto, uno por CPU)
+            combined: Si es True genera un único PDF con una página por
+                comensal, pensado para imprimir
+            
+        Returns:
+            Rutas a los PDFs en el orden de los comensales (una sola ruta si
+            ``combined`` es True)
+        """
+        try:
+            views = [self._diner_view(bill, diner.id) for diner in bill.diners]
+            
+            if combined:
+                filepath = self._summary_path(bill, "all")
+                c = canvas.Canvas(filepath, pagesize=letter)
+                for view in views:
+                    _draw_diner_summary(c, view)
+                    c.showPage()
+                c.save()
+                return [self._register(filepath)]
+            
+            paths = [self._summary_path(bill, f"{i + 1:02d}") for i in range(len(views))]
+            workers = workers or os.cpu_count() or 1
+            if workers == 1 or len(views) <= 1:
+                # Arrancar procesos no compensa para un solo PDF
+                return [self._register(_render_diner_pdf(view, path))
+                        for view, path in zip(views, paths)]
+            
+            with ProcessPoolExecutor(max_workers=min(workers, len(views))) as executor:
+                rendered = executor.map(_render_diner_pdf, views, paths)
+                return [self._register(path) for path in rendered]
+        except Exception as e:
+            self.logger.error("Error generating diner summaries: %s", e)
+            raise
+
+    @timed('share.generate_text_summary')
+    def generate_text_summary(self, bill: Bill, diner_id: str, channel: str = 'clipboard') -> str:
+        """
+        Genera el resumen en texto de un comensal.
+        
+        Args:
+            bill: Cuenta
+            diner_id: ID del comensal
+            channel: Canal de destino ('whatsapp', 'imessage', 'email' o 'clipboard')
             
-            return "\n".join(summary)
+        Returns:
+            Texto del resumen o cadena vacía si el comensal no existe
+        """
+        try:
+            view = self._diner_view(bill, diner_id)
+            if view is None:
+                return ""
+            return self.summary_renderer.render(view, channel)
+        except Exception as e:
+            self.logger.error("Error generating text summary: %s", e)
+            raise
+    
+    @timed('share.generate_text_summaries')
+    def generate_text_summaries(self, bills: List[Bill],
+                                channel: str = 'clipboard') -> List[Dict[str, str]]:
+        """
+        Genera los resúmenes en texto de todos los comensales de una o
+        muchas cuentas en una sola pasada.
+        
+        Args:
+            bills: Cuentas
+            channel: Canal de destino
             
+        Returns:
+            Por cada cuenta, un diccionario {ID del comensal: texto}
+        """
+        try:
+            keys = [(index, diner.id) for index, bill in enumerate(bills) for diner in bill.diners]
+            views = [self._diner_view(bills[index], diner_id) for index, diner_id in keys]
+            messages = self.summary_renderer.render_views(views, channel)
+            result: List[Dict[str, str]] = [{} for _ in bills]
+            for (index, diner_id), message in zip(keys, messages):
+                result[index][diner_id] = message
+            return result
         except Exception as e:
-            self.logger.error(f"Error generating summary: {str(e)}")
-            raise 
\ No newline at end of file
+            self.logger.error("Error generating text summaries: %s", e)
+            raise
+    
+    def share_summary(self, bill: Bill, diner_id: str, method: str) -> str:
+        """
+        Prepara el resumen de un comensal para enviarlo por un canal.
+        
+        El envío en sí (intent de WhatsApp, portapapeles, correo) lo hace la
+        interfaz con el texto devuelto.
+        
+        Args:
+            bill: Cuenta
+            diner_id: ID del comensal
+            method: 'whatsapp', 'imessage', 'email' o 'clipboard'
+            
+        Returns:
+            Texto del mensaje adaptado al canal
+        """
+        if method not in self.summary_renderer.channels:
+            raise ValueError(f"Método de compartir no soportado: {method}")
+        return self.generate_text_summary(bill, diner_id, channel=method)
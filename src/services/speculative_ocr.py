@@ -0,0 +1,185 @@
+import threading
+import time
+from concurrent.futures import CancelledError, Future, InvalidStateError, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from .image_quality import ImageQualityError
+
+logger = logging.getLogger(__name__)
+
+# Etapas en orden; cada una tiene su Future en SpeculativeJob.futures
+STAGES = ('decode', 'einvoice', 'quality', 'preprocess', 'text', 'items')
+
+class SpeculativeJob:
+    """
+    OCR de una captura lanzado antes de que el usuario la confirme.
+
+    ``futures`` tiene un Future por etapa (ver ``STAGES``) para mostrar el
+    progreso; las etapas que no aplican (QR sin items, control de calidad
+    desactivado) terminan con ``None``. Un error en una etapa se propaga a
+    las siguientes.
+    """
+
+    def __init__(self, source: Any):
+        self.source = source
+        self.futures: Dict[str, Future] = {stage: Future() for stage in STAGES}
+        self.created_at = time.perf_counter()
+        self._cancelled = threading.Event()
+
+    @property
+    def items(self) -> Future:
+        """Future con el diccionario de items (resultado final)."""
+        return self.futures['items']
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """
+        Descarta el trabajo: las etapas pendientes se cancelan y la que esté
+        en curso termina sin publicar su resultado (Tesseract no se puede
+        interrumpir a mitad).
+        """
+        self._cancelled.set()
+        for future in self.futures.values():
+            future.cancel()
+
+    def completed_stages(self) -> List[str]:
+        """Etapas terminadas con éxito, en orden."""
+        return [stage for stage, future in self.futures.items()
+                if future.done() and not future.cancelled() and future.exception() is None]
+
+    def on_stage(self, callback: Callable[[str, Future], None]) -> None:
+        """Llama a ``callback(etapa, future)`` al terminar cada etapa."""
+        for stage, future in self.futures.items():
+            future.add_done_callback(lambda f, stage=stage: callback(stage, f))
+
+    def result(self, timeout: Optional[float] = None) -> Dict[str, float]:
+        """Espera y devuelve los items."""
+        return self.items.result(timeout)
+
+    def _set(self, stage: str, value: Any) -> None:
+        if self.cancelled:
+            raise CancelledError()
+        try:
+            self.futures[stage].set_result(value)
+        except InvalidStateError:
+            # Cancelado entre la comprobación y el resultado
+            raise CancelledError()
+
+    def _fail(self, error: BaseException) -> None:
+        for future in self.futures.values():
+            if not future.done():
+                try:
+                    future.set_exception(error)
+                except InvalidStateError:
+                    pass
+
+class SpeculativeOCR:
+    """
+    Pipeline especulativo para el flujo de captura.
+
+    ``start`` lanza el OCR en segundo plano en cuanto hay una foto; ``retake``
+    lo cancela y ``accept`` devuelve el Future de los items, que normalmente
+    ya está resuelto cuando el usuario pulsa "Usar foto".
+
+    Uso:
+        speculative = SpeculativeOCR(ocr_service)
+        job = speculative.start(path)
+        job.on_stage(mostrar_progreso)
+        ...
+        speculative.accept().add_done_callback(mostrar_items)
+    """
+
+    def __init__(self, ocr_service, workers: int = 2):
+        self.ocr_service = ocr_service
+        self.workers = workers
+        self.current: Optional[SpeculativeJob] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            # Dos hilos: una nueva foto no espera a que termine el Tesseract
+            # de la foto descartada
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix='speculative-ocr')
+        return self._executor
+
+    def start(self, source: Any) -> SpeculativeJob:
+        """
+        Empieza a procesar una captura, cancelando la anterior.
+
+        Args:
+            source: Ruta, bytes/buffer o numpy array de la foto
+
+        Returns:
+            El trabajo con sus futures por etapa
+        """
+        job = SpeculativeJob(source)
+        with self._lock:
+            if self.current is not None:
+                self.current.cancel()
+            self.current = job
+        self._get_executor().submit(self._run, job)
+        return job
+
+    def retake(self) -> None:
+        """El usuario descarta la foto: se cancela su trabajo."""
+        with self._lock:
+            job, self.current = self.current, None
+        if job is not None:
+            job.cancel()
+            logger.debug("OCR especulativo cancelado tras %.1f ms",
+                         (time.perf_counter() - job.created_at) * 1000)
+
+    def accept(self) -> Future:
+        """
+        El usuario confirma la foto: devuelve el Future de los items del
+        trabajo en curso y registra cuánto se esperó tras confirmar.
+
+        Raises:
+            RuntimeError: Si no hay ninguna captura en curso
+        """
+        with self._lock:
+            job, self.current = self.current, None
+        if job is None:
+            raise RuntimeError("No hay ninguna captura para confirmar")
+        accepted_at = time.perf_counter()
+        was_ready = job.items.done()
+
+        def log_wait(future):
+            waited_ms = (time.perf_counter() - accepted_at) * 1000
+            logger.info("OCR especulativo: %.1f ms de espera tras confirmar", waited_ms,
+                        extra={'event': 'ocr.speculative_accept',
+                               'duration_ms': round(waited_ms, 3), 'was_ready': was_ready,
+                               'total_ms': round((time.perf_counter() - job.created_at) * 1000, 3)})
+        job.items.add_done_callback(log_wait)
+        return job.items
+
+    def shutdown(self) -> None:
+        """Cancela el trabajo en curso y libera los hilos."""
+        self.retake()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _run(self, job: SpeculativeJob) -> None:
+        # Mismo pipeline que OCRService.process_image (perfiles de comercio,
+        # control de calidad, capturas, métricas); cada etapa publica su
+        # resultado en el Future del trabajo y aborta si se canceló
+        try:
+            if job.cancelled:
+                raise CancelledError()
+            self.ocr_service.process_image(job.source, on_stage=job._set)
+            if not job.items.done():
+                # process_image ya registró el error y devolvió {}
+                job._fail(RuntimeError("No se pudo leer el ticket"))
+        except CancelledError:
+            pass
+        except Exception as e:
+            if not isinstance(e, ImageQualityError):
+                logger.error("Error en el OCR especulativo: %s", e)
+            job._fail(e)
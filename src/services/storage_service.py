@@ -5,11 +5,21 @@ from typing import Dict, List, Optional, Any
 import logging
 from datetime import datetime
 import sqlite3
+import uuid
 from contextlib import contextmanager
 
-logging.basicConfig(level=logging.INFO)
+from .blob_store import BlobStore
+from .image_hash import phash
+from .image_ingest import decode_image
+from .instrumentation import record_error, timed
+from .logging_config import log_duration
+from .receipt_fingerprint import (CHUNKS, MIN_ITEMS, chunk_probes, from_hex, hash_chunks,
+                                  item_signature, to_hex)
+
 logger = logging.getLogger(__name__)
 
+BILL_COLUMNS = 'id, date, total, items, metadata, image_ref'
+
 class StorageService:
     """Servicio para manejar el almacenamiento de datos."""
     
@@ -18,6 +28,10 @@ class StorageService:
         self.logger = logging.getLogger(__name__)
         self._ensure_storage_dir()
         self.db_path = Path(self.storage_dir) / 'bills.db'
+        # Catálogo de descripciones a actualizar con cada cuenta guardada
+        self.catalog = None
+        # Fotos originales de los tickets
+        self.blobs = BlobStore(os.path.join(self.storage_dir, 'blobs'))
         self._init_storage()
     
     def _ensure_storage_dir(self):
@@ -26,15 +40,13 @@ class StorageService:
             if not os.path.exists(self.storage_dir):
                 os.makedirs(self.storage_dir)
         except Exception as e:
-            self.logger.error(f"Error creating storage directory: {str(e)}")
+            self.logger.error("Error creating storage directory: %s", e)
             raise
     
     def _init_storage(self):
         """Inicializa el almacenamiento."""
         try:
-            # Crear directorio de datos si no existe
-            self.storage_dir.mkdir(exist_ok=True)
-            
+            # El directorio ya fue creado por _ensure_storage_dir
             # Inicializar base de datos
             with self._get_db() as (conn, cur):
                 cur.execute('''
@@ -46,9 +58,45 @@ class StorageService:
                         metadata TEXT
                     )
                 ''')
+                # Migración: referencia a la foto del ticket en el BlobStore
+                cur.execute('PRAGMA table_info(bills)')
+                if 'image_ref' not in {row[1] for row in cur.fetchall()}:
+                    cur.execute('ALTER TABLE bills ADD COLUMN image_ref TEXT')
+                # Perfiles de comercio (ver merchant_profiles.MerchantProfile);
+                # el hash del logo se guarda en hexadecimal (64 bits sin signo)
+                cur.execute('''
+                    CREATE TABLE IF NOT EXISTS merchant_profiles (
+                        key TEXT PRIMARY KEY,
+                        header_text TEXT,
+                        logo_hash TEXT,
+                        profile TEXT NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0,
+                        updated_at TEXT NOT NULL
+                    )
+                ''')
+                cur.execute('CREATE INDEX IF NOT EXISTS idx_merchant_header '
+                            'ON merchant_profiles(header_text)')
+                # Huellas de los tickets guardados para detectar duplicados:
+                # hash perceptual de la foto y firma de los ítems, cada uno
+                # partido en trozos indexados (ver receipt_fingerprint)
+                chunk_columns = ''.join(f'image_{i} INTEGER, items_{i} INTEGER, '
+                                        for i in range(CHUNKS))
+                cur.execute(f'''
+                    CREATE TABLE IF NOT EXISTS receipt_fingerprints (
+                        bill_ref TEXT PRIMARY KEY,
+                        image_hash TEXT,
+                        items_hash TEXT,
+                        {chunk_columns}
+                        created_at TEXT NOT NULL
+                    )
+                ''')
+                for i in range(CHUNKS):
+                    for kind in ('image', 'items'):
+                        cur.execute(f'CREATE INDEX IF NOT EXISTS idx_fingerprint_{kind}_{i} '
+                                    f'ON receipt_fingerprints({kind}_{i})')
                 conn.commit()
         except Exception as e:
-            logger.error(f"Error inicializando almacenamiento: {str(e)}")
+            logger.error("Error inicializando almacenamiento: %s", e)
             raise
     
     @contextmanager
@@ -63,27 +111,94 @@ class StorageService:
             if conn:
                 conn.close()
     
-    def save_bill(self, bill_data: Dict[str, Any]) -> str:
-        """Save bill data to a JSON file."""
+    @timed('storage.save_bill')
+    def save_bill(self, bill_data: Dict[str, Any], image: Any = None) -> str:
+        """
+        Save bill data to a JSON file.
+        
+        Args:
+            bill_data: Datos de la cuenta
+            image: Foto del ticket (ruta, bytes o array) a guardar en el
+                BlobStore; su referencia queda en ``bill_data['image_ref']``
+        """
         try:
-            # Generate filename with timestamp
+            # Generate filename with timestamp (the suffix avoids collisions
+            # when several bills are saved within the same second)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"bill_{timestamp}.json"
+            filename = f"bill_{timestamp}_{uuid.uuid4().hex[:8]}.json"
             filepath = os.path.join(self.storage_dir, filename)
             
             # Add metadata
             bill_data['timestamp'] = timestamp
             bill_data['created_at'] = datetime.now().isoformat()
             
+            if image is not None:
+                self._store_image(bill_data, image)
+            
+            # Otra foto del mismo ticket duplicaría los gastos al repartir
+            image_hash = self._image_hash(bill_data, image)
+            items_hash = item_signature(bill_data.get('items'))
+            if image_hash is not None:
+                bill_data['image_hash'] = to_hex(image_hash)
+            duplicates = self.find_duplicate_bills(image_hash, items_hash,
+                                                   item_count=len(bill_data.get('items') or ()))
+            if duplicates:
+                bill_data['possible_duplicates'] = [d['bill_ref'] for d in duplicates]
+                self.logger.warning("La cuenta %s parece un duplicado de %s", filename,
+                                    ', '.join(bill_data['possible_duplicates']),
+                                    extra={'event': 'storage.duplicate_bill'})
+            
             # Save to file
-            with open(filepath, 'w', encoding='utf-8') as f:
+            with log_duration(self.logger, 'storage.save_bill', filename=filename), \
+                    open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(bill_data, f, ensure_ascii=False, indent=2)
-                
+            
+            if image_hash is not None or items_hash is not None:
+                self.save_fingerprint(filename, image_hash, items_hash)
+            if self.catalog is not None:
+                self._update_catalog(bill_data)
             return filename
         except Exception as e:
-            self.logger.error(f"Error saving bill: {str(e)}")
+            self.logger.error("Error saving bill: %s", e)
             raise
     
+    def _image_hash(self, bill_data: Dict[str, Any], image: Any) -> Optional[int]:
+        """
+        Hash perceptual de la foto: el de ``bill_data['image_hash']`` o, si
+        no viene (o no es válido), el calculado a partir de ``image``.
+        """
+        value = bill_data.pop('image_hash', None)
+        try:
+            image_hash = from_hex(value)
+        except ValueError:
+            self.logger.warning("Se ignora un image_hash no válido: %r", value)
+            image_hash = None
+        if image_hash is not None or image is None:
+            return image_hash
+        try:
+            return phash(decode_image(image))
+        except Exception as e:
+            self.logger.warning("No se pudo calcular el hash de la foto: %s", e)
+            record_error('storage.image_hash')
+            return None
+    
+    def _store_image(self, bill_data: Dict[str, Any], image: Any) -> None:
+        """Guarda la foto de la cuenta (un fallo no impide guardar la cuenta)."""
+        try:
+            bill_data['image_ref'] = self.blobs.put(image)
+        except Exception as e:
+            self.logger.error("Error guardando la foto del ticket: %s", e)
+            record_error('storage.store_image')
+    
+    def _update_catalog(self, bill_data: Dict[str, Any]) -> None:
+        """Agrega al catálogo los ítems de una cuenta (un fallo no impide guardarla)."""
+        try:
+            self.catalog.add_bill(bill_data)
+        except Exception as e:
+            self.logger.error("Error actualizando el catálogo: %s", e)
+            record_error('storage.update_catalog')
+    
+    @timed('storage.load_bill')
     def load_bill(self, filename: str) -> Optional[Dict]:
         """Load bill data from a JSON file."""
         try:
@@ -94,9 +209,11 @@ class StorageService:
             with open(filepath, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except Exception as e:
-            self.logger.error(f"Error loading bill: {str(e)}")
+            self.logger.error("Error loading bill: %s", e)
+            record_error('storage.load_bill')
             return None
     
+    @timed('storage.list_bills')
     def list_bills(self) -> List[Dict]:
         """List all saved bills with their metadata."""
         try:
@@ -110,25 +227,65 @@ class StorageService:
                             'filename': filename,
                             'timestamp': bill_data.get('timestamp'),
                             'created_at': bill_data.get('created_at'),
+                            'image_ref': bill_data.get('image_ref'),
                             'total': sum(bill_data.get('items', {}).values())
                         })
             return sorted(bills, key=lambda x: x['timestamp'], reverse=True)
         except Exception as e:
-            self.logger.error(f"Error listing bills: {str(e)}")
+            self.logger.error("Error listing bills: %s", e)
+            record_error('storage.list_bills')
             return []
     
+    @timed('storage.delete_bill')
     def delete_bill(self, filename: str) -> bool:
         """Delete a bill file."""
         try:
             filepath = os.path.join(self.storage_dir, filename)
             if os.path.exists(filepath):
                 os.remove(filepath)
+                with self._get_db() as (conn, cur):
+                    cur.execute('DELETE FROM receipt_fingerprints WHERE bill_ref = ?', (filename,))
+                    conn.commit()
                 return True
             return False
         except Exception as e:
-            self.logger.error(f"Error deleting bill: {str(e)}")
+            self.logger.error("Error deleting bill: %s", e)
+            record_error('storage.delete_bill')
             return False
     
+    def _bill_from_row(self, row) -> Dict[str, Any]:
+        return {
+            'id': row[0],
+            'date': row[1],
+            'total': row[2],
+            'items': json.loads(row[3]),
+            'metadata': json.loads(row[4]) if row[4] else {},
+            'image_ref': row[5]
+        }
+    
+    @timed('storage.set_bill_image')
+    def set_bill_image(self, bill_id: int, image: Any) -> Optional[str]:
+        """
+        Guarda la foto de una factura de la tabla ``bills`` y su referencia.
+        
+        Args:
+            bill_id: ID de la factura
+            image: Foto del ticket (ruta, bytes o array)
+            
+        Returns:
+            Referencia de la foto o None si la factura no existe
+        """
+        try:
+            ref = self.blobs.put(image)
+            with self._get_db() as (conn, cur):
+                cur.execute('UPDATE bills SET image_ref = ? WHERE id = ?', (ref, bill_id))
+                conn.commit()
+                return ref if cur.rowcount else None
+        except Exception as e:
+            logger.error("Error guardando la foto de la factura: %s", e)
+            raise
+    
+    @timed('storage.get_bill')
     def get_bill(self, bill_id: int) -> Optional[Dict[str, Any]]:
         """
         Obtiene una factura por su ID.
@@ -141,21 +298,14 @@ class StorageService:
         """
         try:
             with self._get_db() as (conn, cur):
-                cur.execute('SELECT * FROM bills WHERE id = ?', (bill_id,))
+                cur.execute(f'SELECT {BILL_COLUMNS} FROM bills WHERE id = ?', (bill_id,))
                 row = cur.fetchone()
-                if row:
-                    return {
-                        'id': row[0],
-                        'date': row[1],
-                        'total': row[2],
-                        'items': json.loads(row[3]),
-                        'metadata': json.loads(row[4]) if row[4] else {}
-                    }
-                return None
+                return self._bill_from_row(row) if row else None
         except Exception as e:
-            logger.error(f"Error obteniendo factura: {str(e)}")
+            logger.error("Error obteniendo factura: %s", e)
             raise
     
+    @timed('storage.get_all_bills')
     def get_all_bills(self) -> List[Dict[str, Any]]:
         """
         Obtiene todas las facturas.
@@ -165,18 +315,269 @@ class StorageService:
         """
         try:
             with self._get_db() as (conn, cur):
-                cur.execute('SELECT * FROM bills ORDER BY date DESC')
-                return [{
-                    'id': row[0],
-                    'date': row[1],
-                    'total': row[2],
-                    'items': json.loads(row[3]),
-                    'metadata': json.loads(row[4]) if row[4] else {}
-                } for row in cur.fetchall()]
-        except Exception as e:
-            logger.error(f"Error obteniendo facturas: {str(e)}")
+                cur.execute(f'SELECT {BILL_COLUMNS} FROM bills ORDER BY date DESC')
+                return [self._bill_from_row(row) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error("Error obteniendo facturas: %s", e)
             raise
     
+    @timed('storage.save_merchant_profile')
+    def save_merchant_profile(self, profile: Dict[str, Any]) -> str:
+        """
+        Guarda (o reemplaza) el perfil de un comercio conservando su contador de usos.
+        
+        Args:
+            profile: Perfil como diccionario (``MerchantProfile.to_dict()``)
+            
+        Returns:
+            Clave del perfil
+        """
+        try:
+            logo_hash = profile.get('logo_hash')
+            with self._get_db() as (conn, cur):
+                cur.execute('''
+                    INSERT INTO merchant_profiles (key, header_text, logo_hash, profile, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        header_text = excluded.header_text,
+                        logo_hash = excluded.logo_hash,
+                        profile = excluded.profile,
+                        updated_at = excluded.updated_at
+                ''', (profile['key'], profile.get('header_text') or None,
+                      f"{logo_hash:016x}" if logo_hash is not None else None,
+                      json.dumps(profile, ensure_ascii=False), datetime.now().isoformat()))
+                conn.commit()
+            return profile['key']
+        except Exception as e:
+            logger.error("Error guardando perfil de comercio: %s", e)
+            raise
+    
+    def _profile_from_row(self, row) -> Dict[str, Any]:
+        profile = json.loads(row[0])
+        profile['hits'] = row[1]
+        return profile
+    
+    @timed('storage.get_merchant_profile')
+    def get_merchant_profile(self, key: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el perfil de un comercio por su clave (None si no existe)."""
+        try:
+            with self._get_db() as (conn, cur):
+                cur.execute('SELECT profile, hits FROM merchant_profiles WHERE key = ?', (key,))
+                row = cur.fetchone()
+                return self._profile_from_row(row) if row else None
+        except Exception as e:
+            logger.error("Error obteniendo perfil de comercio: %s", e)
+            record_error('storage.get_merchant_profile')
+            return None
+    
+    @timed('storage.find_merchant_profile')
+    def find_merchant_profile(self, header_text: Optional[str] = None,
+                              logo_hash: Optional[int] = None,
+                              max_distance: int = 6) -> Optional[Dict[str, Any]]:
+        """
+        Busca el perfil de un comercio por el texto del encabezado o por el
+        hash del logo.
+        
+        Args:
+            header_text: Encabezado normalizado (coincidencia exacta)
+            logo_hash: Hash perceptual del encabezado
+            max_distance: Distancia de Hamming máxima para el hash
+            
+        Returns:
+            El perfil más cercano o None
+        """
+        try:
+            with self._get_db() as (conn, cur):
+                if header_text:
+                    cur.execute('SELECT profile, hits FROM merchant_profiles WHERE header_text = ?',
+                                (header_text,))
+                    row = cur.fetchone()
+                    if row:
+                        return self._profile_from_row(row)
+                if logo_hash is None:
+                    return None
+                cur.execute('SELECT profile, hits, logo_hash FROM merchant_profiles '
+                            'WHERE logo_hash IS NOT NULL')
+                best, best_distance = None, max_distance + 1
+                for row in cur.fetchall():
+                    distance = (int(row[2], 16) ^ logo_hash).bit_count()
+                    if distance < best_distance:
+                        best, best_distance = row, distance
+                return self._profile_from_row(best) if best else None
+        except Exception as e:
+            logger.error("Error buscando perfil de comercio: %s", e)
+            record_error('storage.find_merchant_profile')
+            return None
+    
+    def record_merchant_hit(self, key: str) -> None:
+        """Cuenta un ticket leído con el perfil de un comercio."""
+        try:
+            with self._get_db() as (conn, cur):
+                cur.execute('UPDATE merchant_profiles SET hits = hits + 1 WHERE key = ?', (key,))
+                conn.commit()
+        except Exception as e:
+            logger.error("Error actualizando perfil de comercio: %s", e)
+    
+    def list_merchant_profiles(self) -> List[Dict[str, Any]]:
+        """Lista los perfiles de comercio, los más usados primero."""
+        try:
+            with self._get_db() as (conn, cur):
+                cur.execute('SELECT profile, hits FROM merchant_profiles ORDER BY hits DESC, key')
+                return [self._profile_from_row(row) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error("Error listando perfiles de comercio: %s", e)
+            return []
+    
+    def delete_merchant_profile(self, key: str) -> bool:
+        """Elimina el perfil de un comercio (p. ej. si da malos resultados)."""
+        try:
+            with self._get_db() as (conn, cur):
+                cur.execute('DELETE FROM merchant_profiles WHERE key = ?', (key,))
+                conn.commit()
+                return cur.rowcount > 0
+        except Exception as e:
+            logger.error("Error eliminando perfil de comercio: %s", e)
+            return False
+    
+    @timed('storage.save_fingerprint')
+    def save_fingerprint(self, bill_ref: str, image_hash: Optional[int] = None,
+                         items_hash: Optional[int] = None) -> None:
+        """
+        Guarda (o reemplaza) la huella de un ticket.
+        
+        Args:
+            bill_ref: Archivo de la cuenta
+            image_hash: Hash perceptual de la foto (``image_hash.phash``)
+            items_hash: Firma de los ítems (``receipt_fingerprint.item_signature``)
+        """
+        try:
+            image_chunks = hash_chunks(image_hash) if image_hash is not None else [None] * CHUNKS
+            items_chunks = hash_chunks(items_hash) if items_hash is not None else [None] * CHUNKS
+            columns = [f'{kind}_{i}' for i in range(CHUNKS) for kind in ('image', 'items')]
+            values = [chunks[i] for i in range(CHUNKS) for chunks in (image_chunks, items_chunks)]
+            with self._get_db() as (conn, cur):
+                cur.execute(f'''
+                    INSERT OR REPLACE INTO receipt_fingerprints
+                        (bill_ref, image_hash, items_hash, {', '.join(columns)}, created_at)
+                    VALUES ({', '.join('?' * (len(columns) + 4))})
+                ''', [bill_ref, to_hex(image_hash), to_hex(items_hash), *values,
+                      datetime.now().isoformat()])
+                conn.commit()
+        except Exception as e:
+            self.logger.error("Error guardando la huella del ticket: %s", e)
+            record_error('storage.save_fingerprint')
+    
+    @timed('storage.find_duplicate_bills')
+    def find_duplicate_bills(self, image_hash: Optional[int] = None,
+                             items_hash: Optional[int] = None,
+                             max_image_distance: int = 10, max_items_distance: int = 6,
+                             max_items_distance_with_image: int = 12,
+                             item_count: Optional[int] = None,
+                             exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Busca tickets guardados que parecen el mismo ticket.
+        
+        - Con los dos hashes: la foto debe estar a ``max_image_distance``
+          bits o menos y los ítems a ``max_items_distance_with_image`` (dos
+          tickets del mismo local se parecen en la foto aunque sean
+          distintos; un precio mal leído mueve la firma de ítems unos bits).
+        - Solo con ítems: la firma a ``max_items_distance`` bits o menos, y
+          solo si la cuenta tiene al menos ``MIN_ITEMS`` ítems.
+        - Solo con la foto: la foto a ``max_image_distance`` bits o menos.
+        
+        La búsqueda usa los trozos indexados de los hashes (multi-index
+        hashing), así que lee unas pocas filas del índice en lugar de
+        recorrer todo el historial.
+        
+        Args:
+            image_hash: Hash perceptual de la foto
+            items_hash: Firma de los ítems
+            max_image_distance: Distancia de Hamming máxima entre fotos
+            max_items_distance: Distancia máxima entre firmas de ítems sin foto
+            max_items_distance_with_image: Distancia máxima entre firmas de
+                ítems cuando las fotos coinciden
+            item_count: Ítems de la cuenta (None si no se conoce)
+            exclude: Cuenta a ignorar (la propia)
+            
+        Returns:
+            Lista de ``{'bill_ref', 'image_distance', 'items_distance'}``,
+            los más parecidos primero
+        """
+        probes = []
+        if items_hash is not None:
+            probes += [('items', i, values)
+                       for i, values in enumerate(chunk_probes(items_hash, max_items_distance))]
+        if image_hash is not None:
+            probes += [('image', i, values)
+                       for i, values in enumerate(chunk_probes(image_hash, max_image_distance))]
+        if not probes:
+            return []
+        try:
+            where = ' OR '.join(f"{kind}_{i} IN ({', '.join('?' * len(values))})"
+                                for kind, i, values in probes)
+            with self._get_db() as (conn, cur):
+                cur.execute('SELECT bill_ref, image_hash, items_hash FROM receipt_fingerprints '
+                            f'WHERE {where}',
+                            [v for _, _, values in probes for v in values])
+                rows = cur.fetchall()
+        except Exception as e:
+            self.logger.error("Error buscando tickets duplicados: %s", e)
+            record_error('storage.find_duplicate_bills')
+            return []
+        
+        duplicates = []
+        for bill_ref, row_image, row_items in rows:
+            if bill_ref == exclude:
+                continue
+            image_distance = (int(row_image, 16) ^ image_hash).bit_count() \
+                if row_image and image_hash is not None else None
+            items_distance = (int(row_items, 16) ^ items_hash).bit_count() \
+                if row_items and items_hash is not None else None
+            if image_distance is not None and image_distance > max_image_distance:
+                continue
+            if items_distance is None:
+                if image_distance is None:
+                    continue
+            elif image_distance is not None:
+                if items_distance > max_items_distance_with_image:
+                    continue
+            elif (items_distance > max_items_distance
+                  or (item_count is not None and item_count < MIN_ITEMS)):
+                continue
+            duplicates.append({'bill_ref': bill_ref, 'image_distance': image_distance,
+                               'items_distance': items_distance})
+        return sorted(duplicates,
+                      key=lambda d: ((d['items_distance'] or 0) + (d['image_distance'] or 0),
+                                     d['bill_ref']))
+    
+    def backfill_fingerprints(self) -> int:
+        """
+        Calcula la firma de ítems de las cuentas guardadas antes de que
+        existieran las huellas (las fotos ya no están, solo los ítems).
+        
+        Returns:
+            Número de cuentas agregadas al índice
+        """
+        try:
+            with self._get_db() as (conn, cur):
+                cur.execute('SELECT bill_ref FROM receipt_fingerprints')
+                known = {row[0] for row in cur.fetchall()}
+            added = 0
+            for filename in sorted(os.listdir(self.storage_dir)):
+                if not filename.endswith('.json') or filename in known:
+                    continue
+                bill_data = self.load_bill(filename) or {}
+                items_hash = item_signature(bill_data.get('items'))
+                image_hash = from_hex(bill_data.get('image_hash'))
+                if items_hash is not None or image_hash is not None:
+                    self.save_fingerprint(filename, image_hash, items_hash)
+                    added += 1
+            return added
+        except Exception as e:
+            self.logger.error("Error indexando huellas de tickets: %s", e)
+            record_error('storage.backfill_fingerprints')
+            return 0
+    
     def clear_all_bills(self) -> None:
         """Elimina todas las facturas."""
         try:
@@ -184,7 +585,7 @@ class StorageService:
                 cur.execute('DELETE FROM bills')
                 conn.commit()
         except Exception as e:
-            logger.error(f"Error limpiando facturas: {str(e)}")
+            logger.error("Error limpiando facturas: %s", e)
             raise
     
     def backup_data(self, backup_path: Path) -> None:
@@ -202,7 +603,7 @@ class StorageService:
             with self._get_db() as (conn, _):
                 conn.backup(sqlite3.connect(str(backup_path)))
         except Exception as e:
-            logger.error(f"Error creando backup: {str(e)}")
+            logger.error("Error creando backup: %s", e)
             raise
     
     def restore_from_backup(self, backup_path: Path) -> None:
@@ -221,5 +622,5 @@ class StorageService:
                 with self._get_db() as (conn, _):
                     backup_conn.backup(conn)
         except Exception as e:
-            logger.error(f"Error restaurando backup: {str(e)}")
+            logger.error("Error restaurando backup: %s", e)
             raise 
\ No newline at end of file
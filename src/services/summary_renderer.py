@@ -0,0 +1,246 @@
+import re
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from operator import itemgetter
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Caracteres de control (salvo saltos de línea) que el OCR a veces deja pasar
+_CONTROL_CHARS = re.compile(r'[\x00-\x09\x0b-\x1f\x7f]')
+# Marcas de formato de WhatsApp: *negrita* _cursiva_ ~tachado~ `código`
+_WHATSAPP_MARKUP = re.compile(r'([*_~`])')
+_ZERO_WIDTH_SPACE = '\u200b'
+
+def _clean(text: str) -> str:
+    return _CONTROL_CHARS.sub('', text.replace('\n', ' ')).strip()
+
+def _escape_whatsapp(text: str) -> str:
+    # WhatsApp no tiene carácter de escape: un espacio de ancho cero después
+    # de cada marca evita que "2*3" o "_casa_" se interpreten como formato
+    return _WHATSAPP_MARKUP.sub('\\1' + _ZERO_WIDTH_SPACE, _clean(text))
+
+@dataclass(frozen=True)
+class Channel:
+    """
+    Plantillas de mensaje para un canal de envío.
+
+    ``header`` y ``footer`` pueden usar ``{name}``, ``{date}``,
+    ``{subtotal}``, ``{tip_amount}`` y ``{total}``; ``line`` usa
+    ``{description}`` y ``{price}``.
+    """
+    name: str
+    header: str
+    line: str
+    footer: str
+    max_length: Optional[int] = None
+    escape: Callable[[str], str] = _clean
+    more_items: str = "… y {count} ítems más"
+
+    def compile(self) -> 'CompiledChannel':
+        return CompiledChannel(self)
+
+def _compile_template(template: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Traduce una plantilla ``{campo}`` a formato ``%`` posicional.
+
+    Returns:
+        Cadena para el operador ``%`` y orden de los campos
+    """
+    parts = []
+    fields = []
+    for literal, field, _, _ in Formatter().parse(template):
+        parts.append(literal.replace('%', '%%'))
+        if field is not None:
+            parts.append('%s')
+            fields.append(field)
+    return ''.join(parts), tuple(fields)
+
+def _values_getter(fields: Tuple[str, ...]) -> Callable[[Dict[str, str]], Tuple[str, ...]]:
+    """Extrae de un dict los valores en el orden de la plantilla."""
+    if not fields:
+        return lambda values: ()
+    getter = itemgetter(*fields)
+    if len(fields) == 1:
+        return lambda values: (getter(values),)
+    return getter
+
+class CompiledChannel:
+    """Canal con las plantillas ya traducidas a ``%`` posicional."""
+
+    def __init__(self, channel: Channel):
+        self.channel = channel
+        self.header, header_fields = _compile_template(channel.header)
+        self.line, self.line_fields = _compile_template(channel.line)
+        self.footer, footer_fields = _compile_template(channel.footer)
+        self.header_values = _values_getter(header_fields)
+        self.line_values = _values_getter(self.line_fields)
+        self.footer_values = _values_getter(footer_fields)
+        self.more_items = channel.more_items.format
+        self.escape = channel.escape
+        self.max_length = channel.max_length
+
+CHANNELS: Dict[str, Channel] = {
+    'whatsapp': Channel(
+        name='whatsapp',
+        header="*Resumen de cuenta para {name}*\n{date}",
+        line="• {description}: {price}",
+        footer="Subtotal: {subtotal}\nPropina: {tip_amount}\n*Total: {total}*",
+        max_length=65536,
+        escape=_escape_whatsapp,
+    ),
+    'imessage': Channel(
+        name='imessage',
+        header="Resumen de cuenta para {name}\n{date}",
+        line="{description}: {price}",
+        footer="Subtotal: {subtotal}\nPropina: {tip_amount}\nTotal: {total}",
+        max_length=20000,
+    ),
+    'email': Channel(
+        name='email',
+        header="Resumen de cuenta para {name}\nFecha: {date}\n" + "-" * 40,
+        line="{description}: {price}",
+        footer="-" * 40 + "\nSubtotal: {subtotal}\nPropina: {tip_amount}\nTotal: {total}",
+    ),
+    'clipboard': Channel(
+        name='clipboard',
+        header="Resumen de cuenta para {name}\nFecha: {date}",
+        line="{description}: {price}",
+        footer="Subtotal: {subtotal}\nPropina: {tip_amount}\nTotal: {total}",
+    ),
+}
+
+class SummaryRenderer:
+    """
+    Motor de resúmenes de texto por comensal para los canales de mensajería.
+
+    Las plantillas se compilan una vez por canal a formato ``%`` posicional.
+    ``render_views`` procesa un lote completo (todos los comensales de una
+    cuenta o de miles de cuentas) en una sola pasada; los importes y textos
+    ya formateados se memorizan, así que los precios y platos que se repiten
+    entre cuentas se formatean y escapan una sola vez.
+    """
+
+    # Tope de las memorias de importes y textos formateados
+    MEMO_SIZE = 65536
+
+    def __init__(self, currency_symbol: str = '$', thousands_sep: str = ',',
+                 decimal_sep: str = '.', channels: Optional[Dict[str, Channel]] = None):
+        self.currency_symbol = currency_symbol
+        self.thousands_sep = thousands_sep
+        self.decimal_sep = decimal_sep
+        self._channels = {name: channel.compile()
+                          for name, channel in (channels or CHANNELS).items()}
+        self._amounts: Dict[Any, str] = {}
+        self._texts: Dict[Tuple[str, Any], str] = {}
+
+    @property
+    def channels(self) -> List[str]:
+        return list(self._channels)
+
+    def format_currency(self, amount: Any) -> str:
+        """Formatea un importe con dos decimales (redondeo half-up), separadores y símbolo."""
+        with localcontext() as ctx:
+            ctx.rounding = ROUND_HALF_UP
+            return self._format_currency(amount)
+
+    def _format_currency(self, amount: Any) -> str:
+        # El redondeo lo decide el contexto decimal activo
+        if not isinstance(amount, Decimal):
+            amount = Decimal(str(amount))
+        text = format(amount, ',.2f')
+        if self.thousands_sep != ',' or self.decimal_sep != '.':
+            text = text.replace(',', '\0').replace('.', self.decimal_sep)
+            text = text.replace('\0', self.thousands_sep)
+        return self.currency_symbol + text
+
+    def _channel(self, channel: str) -> CompiledChannel:
+        try:
+            return self._channels[channel]
+        except KeyError:
+            raise ValueError(f"Canal no soportado: {channel}")
+
+    def render(self, view: Dict[str, Any], channel: str = 'clipboard') -> str:
+        """Renderiza el mensaje de un comensal."""
+        return self.render_views([view], channel)[0]
+
+    def render_views(self, views: Iterable[Dict[str, Any]],
+                     channel: str = 'clipboard') -> List[str]:
+        """
+        Renderiza los mensajes de muchos comensales en una pasada.
+
+        Args:
+            views: Vistas por comensal con ``name``, ``date``, ``items``
+                (lista de (descripción, precio)), ``subtotal``,
+                ``tip_amount`` y ``total``
+            channel: Canal de destino
+
+        Returns:
+            Un mensaje por vista, en el mismo orden
+        """
+        compiled = self._channel(channel)
+        escape, channel_name = compiled.escape, compiled.channel.name
+        amounts, texts, memo_size = self._amounts, self._texts, self.MEMO_SIZE
+        format_currency = self._format_currency
+        header, header_values = compiled.header, compiled.header_values
+        footer, footer_values = compiled.footer, compiled.footer_values
+        line, line_values = compiled.line, compiled.line_values
+        # Caso habitual: la plantilla del ítem usa (descripción, precio) en ese orden
+        plain_line = compiled.line_fields == ('description', 'price')
+        max_length = compiled.max_length
+
+        def money(amount: Any) -> str:
+            text = amounts.get(amount)
+            if text is None:
+                if len(amounts) >= memo_size:
+                    amounts.clear()
+                text = amounts[amount] = format_currency(amount)
+            return text
+
+        def clean(value: Any) -> str:
+            key = (channel_name, value)
+            text = texts.get(key)
+            if text is None:
+                if len(texts) >= memo_size:
+                    texts.clear()
+                text = texts[key] = escape(str(value))
+            return text
+
+        messages = []
+        append = messages.append
+        with localcontext() as ctx:
+            ctx.rounding = ROUND_HALF_UP
+            for view in views:
+                if plain_line:
+                    lines = [line % (clean(d), money(p)) for d, p in view['items']]
+                else:
+                    lines = [line % line_values({'description': clean(d), 'price': money(p)})
+                             for d, p in view['items']]
+                values = {
+                    'name': clean(view['name']),
+                    'date': view['date'],
+                    'subtotal': money(view['subtotal']),
+                    'tip_amount': money(view['tip_amount']),
+                    'total': money(view['total']),
+                }
+                head = header % header_values(values)
+                foot = footer % footer_values(values)
+                message = "\n".join([head, *lines, foot])
+                if max_length and len(message) > max_length:
+                    message = self._truncate(compiled, head, lines, foot)
+                append(message)
+        return messages
+
+    @staticmethod
+    def _truncate(compiled: CompiledChannel, header: str, lines: List[str], footer: str) -> str:
+        """Recorta ítems (nunca cabecera ni totales) para respetar el límite del canal."""
+        budget = compiled.max_length - len(header) - len(footer) - 2
+        kept = []
+        for index, text in enumerate(lines):
+            remaining = len(lines) - index - 1
+            note = compiled.more_items(count=remaining) if remaining else ''
+            if len(text) + 1 + len(note) + 1 > budget:
+                break
+            kept.append(text)
+            budget -= len(text) + 1
+        kept.append(compiled.more_items(count=len(lines) - len(kept)))
+        return "\n".join([header, *kept, footer])[:compiled.max_length]
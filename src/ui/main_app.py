@@ -8,12 +8,19 @@ from kivy.uix.spinner import Spinner
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.popup import Popup
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.camera import Camera
+from kivy.uix.image import Image
+from kivy.uix.behaviors import ButtonBehavior
 from kivy.core.window import Window
 from kivy.utils import platform
 from kivy.clock import Clock
 from kivy.properties import ObjectProperty, StringProperty
 from kivy.metrics import dp
 import os
+import threading
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 import logging
@@ -24,29 +31,46 @@ import json
 from datetime import datetime
 
 # Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from models.models import Bill, Item, Diner
-from services.ocr_service import OCRService
-from services.storage_service import StorageService
-from services.share_service import ShareService
+# Los servicios se construyen bajo demanda: importar este módulo no carga
+# cv2, pytesseract, numpy ni reportlab
+from services.container import (container, get_catalog_service, get_ocr_service, get_share_service,
+                                get_storage_service)
+from services import profiler
 
 class CameraScreen(Screen):
     """Pantalla para capturar la foto del ticket."""
     
+    # Texto de progreso al terminar cada etapa del OCR especulativo
+    STAGE_STATUS = {
+        'decode': 'Foto cargada',
+        'einvoice': 'Buscando código QR...',
+        'quality': 'Revisando la foto...',
+        'preprocess': 'Leyendo el ticket...',
+        'text': 'Detectando ítems...',
+        'items': 'Ticket listo',
+    }
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.ocr_service = OCRService()
-        self.storage_service = StorageService()
-        self.share_service = ShareService()
+        self._speculative = None
+        self._frame_scheduler = None
+        self._preview_event = None
+        self.preview_camera = None
         
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
         # Camera preview will be added here
-        self.camera_preview = BoxLayout()
+        self.camera_preview = BoxLayout(orientation='vertical')
+        self.live_items_label = Label(text='', size_hint_y=0.3)
+        self.camera_preview.add_widget(self.live_items_label)
         layout.add_widget(self.camera_preview)
         
+        self.status_label = Label(text='', size_hint_y=None, height=30)
+        layout.add_widget(self.status_label)
+        
         # Capture button
         capture_btn = Button(
             text='Capture',
@@ -56,12 +80,212 @@ class CameraScreen(Screen):
         capture_btn.bind(on_press=self.capture)
         layout.add_widget(capture_btn)
         
+        # Confirmación: el OCR ya corre mientras el usuario decide
+        confirm_box = BoxLayout(size_hint_y=None, height=50, spacing=10)
+        self.retake_btn = Button(text='Repetir', disabled=True, on_press=self.retake)
+        self.use_btn = Button(text='Usar foto', disabled=True, on_press=self.use_photo)
+        confirm_box.add_widget(self.retake_btn)
+        confirm_box.add_widget(self.use_btn)
+        layout.add_widget(confirm_box)
+        
         self.add_widget(layout)
     
+    @property
+    def ocr_service(self):
+        return get_ocr_service()
+    
+    @property
+    def storage_service(self):
+        return get_storage_service()
+    
+    @property
+    def share_service(self):
+        return get_share_service()
+    
+    @property
+    def speculative(self):
+        if self._speculative is None:
+            from services.speculative_ocr import SpeculativeOCR
+            self._speculative = SpeculativeOCR(self.ocr_service)
+        return self._speculative
+    
+    @property
+    def frame_scheduler(self):
+        if self._frame_scheduler is None:
+            from services.frame_scheduler import FrameScheduler
+            self._frame_scheduler = FrameScheduler(
+                self._preview_ocr,
+                on_result=lambda frame, future: Clock.schedule_once(
+                    lambda dt: self._show_preview_items(future)))
+        return self._frame_scheduler
+    
+    def on_enter(self):
+        self._start_preview()
+        # El catálogo de descripciones se carga mientras se fotografía el
+        # ticket, para tenerlo listo en la pantalla de ítems
+        if not container.is_loaded('catalog'):
+            threading.Thread(target=get_catalog_service, name='catalog-load', daemon=True).start()
+    
+    def _start_preview(self):
+        """Muestra la cámara y lee los ítems en vivo de los fotogramas estables."""
+        if self.preview_camera is None:
+            try:
+                self.preview_camera = Camera(play=False, resolution=(1280, 720))
+            except Exception as e:
+                logger.warning("Vista previa de cámara no disponible: %s", e)
+                return
+            self.camera_preview.add_widget(self.preview_camera, index=1)
+        self.preview_camera.play = True
+        self.frame_scheduler.reset()
+        if self._preview_event is None:
+            self._preview_event = Clock.schedule_interval(self._on_preview_frame, 1 / 10)
+    
+    def _stop_preview(self):
+        if self._preview_event is not None:
+            self._preview_event.cancel()
+            self._preview_event = None
+        if self.preview_camera is not None:
+            self.preview_camera.play = False
+        if self._frame_scheduler is not None:
+            self._frame_scheduler.shutdown()
+    
+    def _on_preview_frame(self, dt):
+        texture = self.preview_camera.texture if self.preview_camera else None
+        if texture is None:
+            return
+        import cv2
+        import numpy as np
+        # Las texturas de Kivy son RGBA y de abajo arriba; cada lectura es
+        # un buffer nuevo, así que el OCR puede quedarse con el fotograma
+        rgba = np.frombuffer(texture.pixels, dtype=np.uint8)
+        rgba = rgba.reshape(texture.height, texture.width, 4)
+        frame = cv2.flip(cv2.cvtColor(rgba, cv2.COLOR_RGBA2GRAY), 0)
+        self.frame_scheduler.offer(frame)
+    
+    def _preview_ocr(self, frame):
+        # Solo texto e ítems: sin control de calidad, QR ni capturas al corpus
+        ocr = self.ocr_service
+        return ocr.parse_bill(ocr.extract_text(frame))
+    
+    def _show_preview_items(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        items = future.result()
+        if items:
+            self.live_items_label.text = "\n".join(
+                f"{desc}: {price:.2f}" for desc, price in list(items.items())[:8])
+    
     def capture(self, instance):
         # Capture image and process with OCR
-        # This will be implemented with platform-specific camera code
-        pass
+        captures_dir = os.path.join(App.get_running_app().user_data_dir, 'captures')
+        os.makedirs(captures_dir, exist_ok=True)
+        path = os.path.join(captures_dir, f'{uuid.uuid4().hex}.jpg')
+        try:
+            camera.take_picture(filename=path, on_complete=self.on_picture)
+        except NotImplementedError:
+            self.status_label.text = 'Cámara no disponible en esta plataforma'
+    
+    def on_picture(self, path):
+        """Empieza el OCR en segundo plano en cuanto hay foto."""
+        # La foto tiene prioridad: se pausa el OCR de la vista previa
+        Clock.schedule_once(lambda dt: self._stop_preview())
+        job = self.speculative.start(path)
+        job.on_stage(lambda stage, future: Clock.schedule_once(
+            lambda dt: self._show_stage(job, stage, future)))
+        Clock.schedule_once(lambda dt: self._set_confirming(True))
+        # False: plyer conserva el archivo
+        return False
+    
+    def _show_stage(self, job, stage, future):
+        if job is not self.speculative.current or future.cancelled() or future.exception():
+            return
+        self.status_label.text = self.STAGE_STATUS[stage]
+    
+    def _set_confirming(self, confirming):
+        self.retake_btn.disabled = not confirming
+        self.use_btn.disabled = not confirming
+    
+    def retake(self, instance):
+        self.speculative.retake()
+        self._set_confirming(False)
+        self.status_label.text = ''
+        self._start_preview()
+        self.capture(instance)
+    
+    def use_photo(self, instance):
+        self._set_confirming(False)
+        future = self.speculative.accept()
+        if not future.done():
+            self.status_label.text = 'Terminando de leer el ticket...'
+        future.add_done_callback(lambda f: Clock.schedule_once(lambda dt: self._show_items(f)))
+    
+    def _show_items(self, future):
+        from services.image_quality import ImageQualityError
+        try:
+            items = future.result()
+        except ImageQualityError as e:
+            self.status_label.text = e.verdict.message
+            return
+        except Exception as e:
+            logger.error("Error procesando la foto: %s", e)
+            self.status_label.text = 'No se pudo leer el ticket, repite la foto'
+            return
+        self.status_label.text = ''
+        self.manager.get_screen('items').set_items(list(items.items()))
+        self.manager.current = 'items'
+    
+    def on_leave(self):
+        self._stop_preview()
+        if self._speculative is not None:
+            self._speculative.retake()
+        self._set_confirming(False)
+
+class ItemRow(RecycleDataViewBehavior, BoxLayout):
+    """Fila reciclable del listado de ítems (descripción, precio, comensal, borrar)."""
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.index = 0
+        self.owner = None
+        # Evita propagar al modelo los cambios hechos al reciclar la fila
+        self._syncing = False
+        
+        self.desc_input = TextInput(multiline=False)
+        self.price_input = TextInput(multiline=False, input_filter='float')
+        self.spinner = Spinner(size_hint_x=0.7)
+        self.del_btn = Button(text='X', size_hint_x=0.3, on_press=self._on_delete)
+        
+        self.desc_input.bind(text=lambda inst, val: self._on_edit(0, val))
+        self.price_input.bind(text=lambda inst, val: self._on_edit(1, val))
+        self.spinner.bind(text=lambda inst, val: self._on_edit(2, val))
+        
+        self.add_widget(self.desc_input)
+        self.add_widget(self.price_input)
+        self.add_widget(self.spinner)
+        self.add_widget(self.del_btn)
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """Vuelca en los widgets existentes los datos de la fila ``index``."""
+        self._syncing = True
+        try:
+            self.index = index
+            self.owner = data['owner']
+            self.desc_input.text = data['desc']
+            self.price_input.text = data['price']
+            self.spinner.values = data['comensales']
+            self.spinner.text = data['comensal']
+        finally:
+            self._syncing = False
+        return super().refresh_view_attrs(rv, index, data)
+    
+    def _on_edit(self, field, value):
+        if self._syncing or self.owner is None:
+            return
+        self.owner.update_item(self.index, field, value)
+    
+    def _on_delete(self, instance):
+        if self.owner is not None:
+            self.owner.remove_item(self.index)
 
 class ItemsScreen(Screen):
     """Pantalla para revisar, editar y asignar items a comensales."""
@@ -70,12 +294,25 @@ class ItemsScreen(Screen):
         super().__init__(**kwargs)
         self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
-        # Lista de items
-        self.items_grid = GridLayout(cols=4, spacing=5, size_hint_y=None)
-        self.items_grid.bind(minimum_height=self.items_grid.setter('height'))
-        
-        scroll = ScrollView(size_hint=(1, 0.6))
-        scroll.add_widget(self.items_grid)
+        # Cabecera fija de la lista de ítems
+        header = BoxLayout(size_hint=(1, 0.05))
+        header.add_widget(Label(text='Descripción'))
+        header.add_widget(Label(text='Precio'))
+        header.add_widget(Label(text='Comensal', size_hint_x=0.7))
+        header.add_widget(Label(text='', size_hint_x=0.3))
+        
+        # Lista de items: RecycleView reutiliza un número fijo de filas
+        # sin importar cuántos ítems tenga el ticket
+        self.items_view = RecycleView(size_hint=(1, 0.55), viewclass=ItemRow)
+        items_layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, dp(40)),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=5
+        )
+        items_layout.bind(minimum_height=items_layout.setter('height'))
+        self.items_view.add_widget(items_layout)
         
         # Comensales
         self.comensales_box = BoxLayout(orientation='horizontal', size_hint=(1, 0.1), spacing=5)
@@ -94,7 +331,8 @@ class ItemsScreen(Screen):
         self.control_layout.add_widget(self.next_btn)
         
         self.layout.add_widget(Label(text='Revisa, edita y asigna cada ítem a un comensal:', size_hint=(1, 0.05)))
-        self.layout.add_widget(scroll)
+        self.layout.add_widget(header)
+        self.layout.add_widget(self.items_view)
         self.layout.add_widget(Label(text='Comensales:', size_hint=(1, 0.05)))
         self.layout.add_widget(self.comensales_box)
         self.layout.add_widget(self.control_layout)
@@ -104,34 +342,15 @@ class ItemsScreen(Screen):
         self.comensales = []
     
     def set_items(self, items):
-        """Carga los items detectados en la interfaz."""
-        self.items = [list(item) + [None] for item in items]  # [desc, price, comensal]
+        """Carga los items detectados, con las descripciones corregidas por el catálogo."""
+        # [desc, price, comensal]
+        self.items = [[self._snap(desc), price, None] for desc, price in items]
         if not self.comensales:
             self.comensales = [f'Comensal {i+1}' for i in range(len(items))]
         self.refresh()
     
     def refresh(self):
-        self.items_grid.clear_widgets()
-        self.items_grid.height = 40 * (len(self.items) + 1)
-        # Cabecera
-        self.items_grid.add_widget(Label(text='Descripción'))
-        self.items_grid.add_widget(Label(text='Precio'))
-        self.items_grid.add_widget(Label(text='Comensal'))
-        self.items_grid.add_widget(Label(text=''))
-        # Filas de ítems
-        for idx, (desc, price, comensal) in enumerate(self.items):
-            desc_input = TextInput(text=desc, multiline=False)
-            price_input = TextInput(text=str(price), multiline=False, input_filter='float')
-            spinner = Spinner(text=comensal or (self.comensales[0] if self.comensales else ''),
-                              values=self.comensales, size_hint_x=0.7)
-            del_btn = Button(text='X', size_hint_x=0.3, on_press=lambda x, i=idx: self.remove_item(i))
-            desc_input.bind(text=lambda inst, val, i=idx: self.update_item(i, 0, val))
-            price_input.bind(text=lambda inst, val, i=idx: self.update_item(i, 1, val))
-            spinner.bind(text=lambda inst, val, i=idx: self.update_item(i, 2, val))
-            self.items_grid.add_widget(desc_input)
-            self.items_grid.add_widget(price_input)
-            self.items_grid.add_widget(spinner)
-            self.items_grid.add_widget(del_btn)
+        self.refresh_items()
         # Comensales
         self.comensales_box.clear_widgets()
         for idx, name in enumerate(self.comensales):
@@ -144,6 +363,17 @@ class ItemsScreen(Screen):
             self.comensales_box.add_widget(input_box)
         self.comensales_box.add_widget(self.add_comensal_btn)
     
+    def refresh_items(self):
+        """Regenera el modelo de datos del RecycleView (no crea widgets)."""
+        default = self.comensales[0] if self.comensales else ''
+        self.items_view.data = [{
+            'owner': self,
+            'desc': desc,
+            'price': str(price),
+            'comensal': comensal or default,
+            'comensales': self.comensales
+        } for desc, price, comensal in self.items]
+    
     def update_item(self, idx, field, value):
         if field == 1:
             try:
@@ -151,20 +381,33 @@ class ItemsScreen(Screen):
             except Exception:
                 value = '0.0'
         self.items[idx][field] = value
-        self.refresh()
+        # Solo se actualiza el modelo: la fila visible ya muestra el valor
+        # editado y volver a construir la lista haría perder el foco
+        key = ('desc', 'price', 'comensal')[field]
+        self.items_view.data[idx][key] = value
+    
+    def _snap(self, description):
+        # Si el catálogo aún se está cargando no se espera: la pantalla no se congela
+        if not container.is_loaded('catalog'):
+            return description
+        try:
+            return get_catalog_service().snap(description)
+        except Exception as e:
+            logger.error("Error corrigiendo la descripción: %s", e)
+            return description
     
     def update_comensal(self, idx, value):
         self.comensales[idx] = value
-        self.refresh()
+        self.refresh_items()
     
     def add_item(self, instance):
         self.items.append(['', '0.0', self.comensales[0] if self.comensales else ''])
-        self.refresh()
+        self.refresh_items()
     
     def remove_item(self, idx):
         if len(self.items) > 1:
             self.items.pop(idx)
-            self.refresh()
+            self.refresh_items()
     
     def add_comensal(self, instance):
         self.comensales.append(f'Comensal {len(self.comensales)+1}')
@@ -180,6 +423,13 @@ class ItemsScreen(Screen):
             self.refresh()
     
     def next_screen(self, instance):
+        with profiler.profile_session('split', metadata={'items': len(self.items),
+                                                        'comensales': len(self.comensales)}):
+            bill = self._build_bill()
+        self.manager.get_screen('summary').show_summary(bill)
+        self.manager.current = 'summary'
+    
+    def _build_bill(self):
         # Validar y construir objetos
         diners = [Diner(id=str(uuid.uuid4()), name=name, items=[], tip_percentage=Decimal('0')) for name in self.comensales]
         items = []
@@ -193,9 +443,8 @@ class ItemsScreen(Screen):
             items.append(item)
             if diner:
                 diner.items.append(item)
-        bill = Bill(id=str(uuid.uuid4()), date=datetime.now(), items=items, diners=diners, total_amount=sum(i.price for i in items), tip_percentage=Decimal('0'))
-        self.manager.get_screen('summary').show_summary(bill)
-        self.manager.current = 'summary'
+        return Bill(id=str(uuid.uuid4()), date=datetime.now(), items=items, diners=diners,
+                    total_amount=sum(i.price for i in items), tip_percentage=Decimal('0'))
     
     def previous_screen(self, instance):
         self.manager.current = 'camera'
@@ -274,8 +523,6 @@ class SummaryScreen(Screen):
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.storage_service = StorageService()
-        self.share_service = ShareService()
         
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
@@ -325,6 +572,14 @@ class SummaryScreen(Screen):
         
         self.add_widget(layout)
     
+    @property
+    def storage_service(self):
+        return get_storage_service()
+    
+    @property
+    def share_service(self):
+        return get_share_service()
+    
     def show_summary(self, bill):
         """Muestra el resumen de la cuenta."""
         self.items_layout.clear_widgets()
@@ -345,12 +600,36 @@ class SummaryScreen(Screen):
         # Share current bill
         pass
 
+class HistoryRow(RecycleDataViewBehavior, ButtonBehavior, BoxLayout):
+    """Fila reciclable del historial de facturas (miniatura del ticket y texto)."""
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.bill = None
+        self.owner = None
+        self.thumbnail = Image(size_hint_x=None, width=dp(50), allow_stretch=True)
+        self.label = Label()
+        self.add_widget(self.thumbnail)
+        self.add_widget(self.label)
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """Asocia la fila reciclada con la factura ``index``."""
+        self.bill = data['bill']
+        self.owner = data['owner']
+        self.label.text = data['text']
+        # Solo las filas visibles piden su miniatura (nunca la foto completa)
+        self.thumbnail.source = self.owner.thumbnail_for(self.bill) or ''
+        return super().refresh_view_attrs(rv, index, {})
+    
+    def on_press(self):
+        if self.owner is not None:
+            self.owner.view_bill(self.bill)
+
 class HistoryScreen(Screen):
     """Pantalla de historial de facturas."""
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.storage_service = StorageService()
         
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
@@ -362,32 +641,67 @@ class HistoryScreen(Screen):
         )
         layout.add_widget(title)
         
-        # Bills list
-        scroll = ScrollView()
-        self.bills_layout = GridLayout(
-            cols=1,
-            spacing=10,
-            size_hint_y=None
+        # Bills list: un RecycleView mantiene constante el número de botones
+        self.bills_view = RecycleView(viewclass=HistoryRow)
+        bills_layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, 50),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=10
         )
-        self.bills_layout.bind(minimum_height=self.bills_layout.setter('height'))
-        scroll.add_widget(self.bills_layout)
-        layout.add_widget(scroll)
+        bills_layout.bind(minimum_height=bills_layout.setter('height'))
+        self.bills_view.add_widget(bills_layout)
+        layout.add_widget(self.bills_view)
+        self._thumbnail_refresh = None
+        self._awaiting_thumbnails = set()
         
         self.add_widget(layout)
     
+    @property
+    def storage_service(self):
+        return get_storage_service()
+    
     def update_bills(self):
-        self.bills_layout.clear_widgets()
-        bills = self.storage_service.list_bills()
-        
-        for bill in bills:
-            btn = Button(
-                text=f"{bill['timestamp']} - ${bill['total']:.2f}",
-                size_hint_y=None,
-                height=50
-            )
-            btn.bind(on_press=lambda x, b=bill: self.view_bill(b))
-            self.bills_layout.add_widget(btn)
+        self.set_bills(self.storage_service.list_bills())
+    
+    def set_bills(self, bills):
+        """Carga la lista de facturas en el modelo de datos del RecycleView."""
+        self.bills_view.data = [{
+            'owner': self,
+            'bill': bill,
+            'text': f"{bill['timestamp']} - ${bill['total']:.2f}"
+        } for bill in bills]
             
+    def thumbnail_for(self, bill):
+        """
+        Ruta de la miniatura de la foto de una factura, o None si no tiene
+        foto o la miniatura aún se está generando (la lista se refresca
+        cuando termina).
+        """
+        ref = bill.get('image_ref')
+        if not ref:
+            return None
+        blobs = self.storage_service.blobs
+        path = blobs.thumbnail_path(ref)
+        future = blobs.pending_thumbnail(ref) if path is None else None
+        # Solo se refresca cuando termina una miniatura en curso: una foto
+        # borrada o corrupta no deja la lista refrescándose
+        if future is not None and ref not in self._awaiting_thumbnails:
+            self._awaiting_thumbnails.add(ref)
+            future.add_done_callback(
+                lambda f: Clock.schedule_once(lambda dt: self._thumbnail_ready(ref)))
+        return path
+    
+    def _thumbnail_ready(self, ref):
+        self._awaiting_thumbnails.discard(ref)
+        if self._thumbnail_refresh is None:
+            self._thumbnail_refresh = Clock.schedule_once(self._refresh_thumbnails, 0.2)
+    
+    def _refresh_thumbnails(self, dt):
+        self._thumbnail_refresh = None
+        self.bills_view.refresh_from_data()
+    
     def view_bill(self, bill):
         # View bill details
         pass
@@ -399,8 +713,18 @@ class BillSplitterApp(App):
         super().__init__(**kwargs)
         self.sm = ScreenManager()
         self.current_bill = None
-        self.storage_service = StorageService()
-        self.bills_history = self.storage_service.get_all_bills()
+        self._bills_history = None
+    
+    @property
+    def storage_service(self):
+        return get_storage_service()
+    
+    @property
+    def bills_history(self):
+        """Historial completo, cargado la primera vez que se consulta."""
+        if self._bills_history is None:
+            self._bills_history = self.storage_service.get_all_bills()
+        return self._bills_history
         
     def build(self):
         """Construye la interfaz de la aplicación."""
@@ -431,7 +755,7 @@ class BillSplitterApp(App):
         
     def _load_history(self):
         """Carga el historial de facturas desde el almacenamiento."""
-        # La carga se realiza en __init__ usando StorageService
+        # La carga es diferida: se realiza al acceder a bills_history
         pass
     
     def _save_history(self):
@@ -442,11 +766,10 @@ class BillSplitterApp(App):
     def on_stop(self):
         """Se llama cuando la aplicación se cierra."""
         # No es necesario guardar explícitamente aquí con StorageService basado en SQLite
-        # self._save_history()
-        # Limpiar recursos temporales si existen
-        # if self.current_bill:
-        #     self.current_bill.cleanup()
-        pass
+        # Limpiar los archivos generados en esta sesión (sin construir el
+        # servicio si nunca se usó)
+        if container.is_loaded('share'):
+            get_share_service().cleanup()
 
 class MainScreen(Screen):
     """Pantalla principal de la aplicación."""
@@ -528,6 +851,14 @@ class SettingsScreen(Screen):
         lang_layout.add_widget(lang_btn)
         settings.add_widget(lang_layout)
         
+        # Perfilado (también con BILLSPLIT_PROFILE=1)
+        profile_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(48))
+        profile_layout.add_widget(Label(text='Perfilado de rendimiento:'))
+        self.profile_btn = Button(on_press=self.toggle_profiling)
+        self._update_profile_button()
+        profile_layout.add_widget(self.profile_btn)
+        settings.add_widget(profile_layout)
+        
         layout.add_widget(settings)
         self.add_widget(layout)
     
@@ -544,6 +875,19 @@ class SettingsScreen(Screen):
         """Cambia el idioma de la aplicación."""
         # TODO: Implementar cambio de idioma
         pass
+    
+    def toggle_profiling(self, *args):
+        """Activa o desactiva el perfilado de las sesiones de OCR y reparto."""
+        if profiler.settings.enabled:
+            profiler.configure(enabled=False)
+        else:
+            # Los perfiles se guardan junto a los datos de la aplicación
+            storage_dir = get_storage_service().storage_dir
+            profiler.configure(enabled=True, output_dir=os.path.join(storage_dir, 'profiles'))
+        self._update_profile_button()
+    
+    def _update_profile_button(self):
+        self.profile_btn.text = 'Desactivar' if profiler.settings.enabled else 'Activar'
 
 class HistoryItem(BoxLayout):
     """Widget para mostrar un item del historial."""
@@ -588,6 +932,13 @@ class HistoryItem(BoxLayout):
         date_str = date.strftime('%d/%m/%Y %H:%M')
         content.add_widget(Label(text=f'Fecha: {date_str}'))
         
+        # Foto del ticket (solo aquí se decodifica la imagen completa)
+        photo = None
+        if bill_data.get('image_ref'):
+            photo = get_storage_service().blobs.path(bill_data['image_ref'])
+        if photo:
+            content.add_widget(Image(source=photo, allow_stretch=True))
+        
         # Items
         items_layout = GridLayout(cols=2, spacing=dp(8))
         for item in bill_data['items']:
@@ -0,0 +1,10 @@
+import pytest
+import shutil
+import tempfile
+
+@pytest.fixture
+def temp_dir():
+    """Fixture para crear un directorio temporal (se borra con su contenido)."""
+    temp_dir = tempfile.mkdtemp()
+    yield temp_dir
+    shutil.rmtree(temp_dir)
@@ -0,0 +1,254 @@
+import pytest
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.api_server import ApiServer, BackgroundServer, calculate_split
+from src.services.image_quality import ImageQualityError, QualityVerdict
+from src.services.storage_service import StorageService
+
+class FakeOCRService:
+    """OCR de prueba: la 'imagen' es el texto 'descripcion precio'."""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+
+    def process_image(self, image):
+        if self.gate is not None:
+            self.gate.wait()
+        desc, price = image.rsplit(' ', 1)
+        return {desc: float(price)}
+
+    def process_receipts(self, image):
+        return [self.process_image(part) for part in image.decode().split('|')]
+
+def _request(port, method, path, body=b''):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request(method, path, body=body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+def test_calculate_split():
+    """Prueba el reparto por comensal con propina."""
+    result = calculate_split({
+        'items': [
+            {'description': 'Hamburguesa', 'price': '10.99', 'diner': 'Juan'},
+            {'description': 'Refresco', 'price': '2.50', 'diner': 'Juan'},
+            {'description': 'Papas fritas', 'price': '3.99', 'diner': 'María'},
+        ],
+        'tip_percentage': 15
+    })
+
+    diners = {d['name']: d for d in result['diners']}
+    assert diners['Juan']['subtotal'] == '13.49'
+    assert diners['Juan']['tip_amount'] == '2.02'
+    assert diners['Juan']['total'] == '15.51'
+    assert result['tip_amount'] == '2.62'
+
+def test_ocr_requests_are_batched():
+    """Prueba que peticiones concurrentes se agrupan en micro-lotes."""
+    server = ApiServer(FakeOCRService(), port=0, decoder=lambda data: data.decode(),
+                       workers=1, max_batch=8, max_wait=0.05)
+    with BackgroundServer(server):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(
+                lambda i: _request(server.port, 'POST', '/ocr', f'Item{i} {i}.50'.encode()),
+                range(8)))
+
+        assert all(status == 200 for status, _ in responses)
+        assert responses[3][1]['items'] == {'Item3': 3.5}
+
+        status, metrics = _request(server.port, 'GET', '/metrics')
+        assert status == 200
+        assert metrics['routes']['/ocr']['count'] == 8
+        assert metrics['ocr']['batches'] < 8
+
+def test_ocr_batch_runs_in_parallel():
+    """Prueba que las imágenes de un mismo lote se leen en hilos distintos."""
+    barrier = threading.Barrier(2, timeout=5)
+
+    class ParallelOCRService(FakeOCRService):
+        def process_image(self, image):
+            # Con un solo hilo por lote la barrera nunca se completa
+            barrier.wait()
+            return super().process_image(image)
+
+    server = ApiServer(ParallelOCRService(), port=0, decoder=lambda data: data.decode(),
+                       workers=2, max_batch=2, max_wait=0.5)
+    with BackgroundServer(server):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            statuses = list(pool.map(
+                lambda i: _request(server.port, 'POST', '/ocr', f'Item{i} {i}.50'.encode())[0],
+                range(2)))
+
+    assert statuses == [200, 200]
+
+def test_malformed_request_line():
+    """Prueba que una línea de petición mal formada recibe un 400."""
+    server = ApiServer(FakeOCRService(), port=0)
+    with BackgroundServer(server):
+        with socket.create_connection(('127.0.0.1', server.port), timeout=10) as sock:
+            sock.sendall(b'BASURA\r\n\r\n')
+            response = sock.makefile('rb').readline()
+
+    assert response.startswith(b'HTTP/1.1 400')
+
+def test_ocr_backpressure():
+    """Prueba que con la cola llena se responde 503."""
+    gate = threading.Event()
+    server = ApiServer(FakeOCRService(gate), port=0, decoder=lambda data: data.decode(),
+                       workers=1, max_batch=1, max_wait=0, queue_size=1)
+    with BackgroundServer(server):
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(_request, server.port, 'POST', '/ocr', b'Item 1.00')
+                       for _ in range(6)]
+            # Con un hilo bloqueado y cola de 1, alguna petición debe rechazarse
+            deadline = time.monotonic() + 5
+            while not server.metrics.rejected and time.monotonic() < deadline:
+                time.sleep(0.01)
+            gate.set()
+            statuses = [f.result()[0] for f in futures]
+
+        assert 503 in statuses
+        assert 200 in statuses
+
+def test_bills_roundtrip(temp_dir):
+    """Prueba guardar y listar cuentas a través de la API."""
+    server = ApiServer(FakeOCRService(), StorageService(os.path.join(temp_dir, 'data')), port=0)
+    with BackgroundServer(server):
+        status, saved = _request(server.port, 'POST', '/bills',
+                                 json.dumps({'items': {'Refresco': 2.5}}).encode())
+        assert status == 200
+
+        status, listed = _request(server.port, 'GET', '/bills')
+        assert status == 200
+        assert listed['bills'][0]['filename'] == saved['filename']
+
+def test_unknown_route():
+    """Prueba una ruta inexistente."""
+    server = ApiServer(FakeOCRService(), port=0)
+    with BackgroundServer(server):
+        status, body = _request(server.port, 'GET', '/nada')
+        assert status == 404
+        assert 'error' in body
+
+def test_ocr_multiple_receipts():
+    """Prueba el OCR de una foto con varios tickets."""
+    server = ApiServer(FakeOCRService(), port=0)
+    with BackgroundServer(server):
+        status, body = _request(server.port, 'POST', '/ocr/receipts', b'Flan 4.00|Refresco 2.50')
+
+    assert status == 200
+    assert body['receipts'] == [{'items': {'Flan': 4.0}}, {'items': {'Refresco': 2.5}}]
+
+def test_ocr_receipts_share_the_ocr_queue():
+    """Prueba que las fotos con varios tickets pasan por la cola acotada del OCR."""
+    gate = threading.Event()
+    server = ApiServer(FakeOCRService(gate), port=0, workers=1, max_batch=1, max_wait=0,
+                       queue_size=1)
+    with BackgroundServer(server):
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(_request, server.port, 'POST', '/ocr/receipts', b'Flan 4.00')
+                       for _ in range(6)]
+            deadline = time.monotonic() + 5
+            while not server.metrics.rejected and time.monotonic() < deadline:
+                time.sleep(0.01)
+            gate.set()
+            statuses = [f.result()[0] for f in futures]
+
+    assert 503 in statuses
+    assert 200 in statuses
+
+@pytest.mark.parametrize('path, body', [
+    ('/split', []),
+    ('/split', 'hola'),
+    ('/split', {'items': [1]}),
+    ('/split', {'items': {'Flan': 4.0}}),
+    ('/bills', [1, 2]),
+    ('/bills', 'hola'),
+    ('/bills', {'items': [1]}),
+    ('/bills', {'items': {'Flan': 'cuatro'}}),
+])
+def test_malformed_bill_is_rejected(temp_dir, path, body):
+    """Prueba que un cuerpo que no es una cuenta recibe un 400 y no un 500."""
+    storage = StorageService(os.path.join(temp_dir, 'data'))
+    server = ApiServer(FakeOCRService(), storage, port=0)
+    with BackgroundServer(server):
+        status, response = _request(server.port, 'POST', path, json.dumps(body).encode())
+
+    assert status == 400
+    assert 'error' in response
+    assert storage.list_bills() == []
+
+class BlurryOCRService:
+    def process_image(self, image):
+        raise ImageQualityError(QualityVerdict(ok=False, reasons=['blur'], sharpness=12.0))
+
+def test_ocr_rejects_bad_capture():
+    """Prueba que una captura rechazada por calidad devuelve 422."""
+    server = ApiServer(BlurryOCRService(), port=0, decoder=lambda data: data)
+    with BackgroundServer(server):
+        status, body = _request(server.port, 'POST', '/ocr', b'foto')
+
+    assert status == 422
+    assert body['quality']['reasons'] == ['blur']
+    assert 'movida' in body['error']
+
+class FakeShareService:
+    def render_pdf(self, bill_data):
+        return memoryview(b'%PDF-fake ' + json.dumps(bill_data).encode())
+
+    def render_json(self, bill_data):
+        return json.dumps(bill_data).encode()
+
+def test_render_pdf_is_streamed():
+    """Prueba que el PDF generado en memoria se devuelve en la respuesta."""
+    server = ApiServer(FakeOCRService(), port=0, share_service=FakeShareService())
+    with BackgroundServer(server):
+        conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=10)
+        try:
+            conn.request('POST', '/render/pdf', body=json.dumps({'items': {'Refresco': 2.5}}))
+            response = conn.getresponse()
+            body = response.read()
+        finally:
+            conn.close()
+
+    assert response.status == 200
+    assert response.getheader('Content-Type') == 'application/pdf'
+    assert body.startswith(b'%PDF')
+    assert b'Refresco' in body
+
+def test_prometheus_metrics(temp_dir):
+    """Prueba que las métricas de los servicios se exportan para Prometheus."""
+    from src.services.instrumentation import registry
+
+    was_enabled = registry.enabled
+    registry.reset()
+    registry.enable()
+    try:
+        server = ApiServer(FakeOCRService(), StorageService(os.path.join(temp_dir, 'data')), port=0)
+        with BackgroundServer(server):
+            _request(server.port, 'GET', '/bills')
+            conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=10)
+            try:
+                conn.request('GET', '/metrics/prometheus')
+                response = conn.getresponse()
+                body = response.read().decode('utf-8')
+            finally:
+                conn.close()
+            status, metrics = _request(server.port, 'GET', '/metrics')
+    finally:
+        registry.reset()
+        registry.enabled = was_enabled
+
+    assert response.status == 200
+    assert response.getheader('Content-Type').startswith('text/plain')
+    assert 'billsplit_operation_duration_seconds_count{operation="storage.list_bills"} 1' in body
+    assert metrics['services']['storage.list_bills']['count'] == 1
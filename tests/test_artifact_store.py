@@ -0,0 +1,80 @@
+import pytest
+import os
+import time
+
+from src.services.artifact_store import ArtifactStore
+
+def _write(directory, name, size=10):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+def test_sweep_removes_expired_files(temp_dir):
+    """Prueba que el TTL elimina los archivos que nadie usa."""
+    store = ArtifactStore(temp_dir, ttl=60, start_sweeper=False)
+    path = store.register(_write(temp_dir, 'bill.pdf'))
+
+    assert store.sweep() == 0
+    assert store.sweep(now=time.time() + 120) == 1
+    assert not os.path.exists(path)
+    assert store.total_bytes == 0
+
+def test_leased_file_is_not_removed(temp_dir):
+    """Prueba que un archivo con lease sobrevive al TTL y a la cuota."""
+    store = ArtifactStore(temp_dir, ttl=60, quota_bytes=5, start_sweeper=False)
+    path = _write(temp_dir, 'bill.pdf')
+    store._add(os.path.realpath(path), 10, time.time())
+
+    with store.lease(path):
+        assert store.sweep(now=time.time() + 120) == 0
+        assert os.path.exists(path)
+
+    assert store.sweep(now=time.time() + 120) == 1
+    assert not os.path.exists(path)
+
+def test_quota_evicts_least_recently_used(temp_dir):
+    """Prueba que la cuota expulsa primero lo usado hace más tiempo."""
+    store = ArtifactStore(temp_dir, quota_bytes=25, start_sweeper=False)
+    old = store.register(_write(temp_dir, 'old.pdf'))
+    recent = store.register(_write(temp_dir, 'recent.pdf'))
+    store.acquire(old)
+    store.release(old)  # old pasa a ser el más reciente
+
+    store.register(_write(temp_dir, 'new.pdf'))
+
+    assert os.path.exists(old)
+    assert not os.path.exists(recent)
+    assert store.total_bytes <= 25
+
+def test_store_is_shared_per_directory(temp_dir):
+    """Prueba que dos usuarios del mismo directorio comparten leases."""
+    first = ArtifactStore.for_directory(temp_dir, start_sweeper=False)
+    second = ArtifactStore.for_directory(os.path.join(temp_dir, '.'))
+    path = first.register(_write(temp_dir, 'bill.pdf'))
+
+    with first.lease(path):
+        assert second.discard([path]) == 0
+    assert second.discard([path]) == 1
+
+def test_unregistered_files_are_left_alone(temp_dir):
+    """Prueba que los archivos que no generó el almacén no se borran."""
+    path = _write(temp_dir, 'usuario.pdf')
+
+    store = ArtifactStore(temp_dir, ttl=0, quota_bytes=0, start_sweeper=False)
+
+    assert store.total_bytes == 0
+    assert store.sweep(now=time.time() + 1) == 0
+    assert store.discard([path]) == 0
+    assert os.path.exists(path)
+
+def test_touch_only_known_files(temp_dir):
+    """Prueba que touch reconoce los archivos registrados que siguen en disco."""
+    store = ArtifactStore(temp_dir, start_sweeper=False)
+    path = store.register(_write(temp_dir, 'bill.pdf'))
+
+    assert store.touch(path)
+    assert not store.touch(_write(temp_dir, 'ajeno.pdf'))
+    os.remove(path)
+    assert not store.touch(path)
+    assert store.total_bytes == 0
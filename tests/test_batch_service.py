@@ -0,0 +1,125 @@
+import pytest
+from decimal import Decimal
+import os
+
+from src.services.batch_service import BatchPipeline, find_images
+from src.services.storage_service import StorageService
+
+class FakeOCRService:
+    """OCR de prueba: el 'texto' de cada imagen es el propio contenido."""
+
+    def read(self, image, source=None):
+        if image == 'roto':
+            raise RuntimeError("Tesseract falló")
+        return image
+
+    def finish(self, text):
+        items = {}
+        for line in text.splitlines():
+            desc, price = line.rsplit(' ', 1)
+            items[desc] = float(price)
+        return items
+
+    def validate_items(self, items):
+        return bool(items)
+
+class FakeShareService:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+
+    def generate_summary(self, bill_data):
+        return "\n".join(f"{item}: ${price:.2f}" for item, price in bill_data['items'].items())
+
+def test_find_images(temp_dir):
+    """Prueba que solo se listan imágenes, en orden."""
+    for name in ('b.png', 'a.JPG', 'notas.txt'):
+        open(os.path.join(temp_dir, name), 'w').close()
+
+    paths = find_images(temp_dir)
+
+    assert [os.path.basename(p) for p in paths] == ['a.JPG', 'b.png']
+
+def test_batch_pipeline(temp_dir):
+    """Prueba el procesamiento de un lote completo."""
+    images = {
+        'ticket1.png': "Hamburguesa 10.99\nRefresco 2.50",
+        'ticket2.png': "Papas fritas 3.99",
+        'ticket3.png': "",
+    }
+    storage = StorageService(os.path.join(temp_dir, 'data'))
+    share = FakeShareService(temp_dir)
+    pipeline = BatchPipeline(FakeOCRService(), storage, share, ocr_workers=2, queue_size=1,
+                             image_loader=lambda path: images[path])
+
+    progress = []
+    results, stats = pipeline.run(images, progress=lambda done, total, r: progress.append(done))
+
+    assert stats.total == 3
+    assert stats.processed == 3
+    assert stats.invalid == 1
+    assert stats.failed == 0
+    assert progress == [1, 2, 3]
+
+    by_path = {r.path: r for r in results}
+    assert by_path['ticket1.png'].items == [('Hamburguesa', Decimal('10.99')),
+                                            ('Refresco', Decimal('2.50'))]
+    with open(by_path['ticket1.png'].summary_path, encoding='utf-8') as f:
+        assert 'Hamburguesa: $10.99' in f.read()
+
+    # Cada ticket se guarda en su propio archivo
+    assert len({r.filename for r in results}) == 3
+    assert len(storage.list_bills()) == 3
+
+def test_batch_pipeline_unreadable_image(temp_dir):
+    """Prueba que una imagen ilegible se cuenta como error."""
+    storage = StorageService(os.path.join(temp_dir, 'data'))
+    pipeline = BatchPipeline(FakeOCRService(), storage, FakeShareService(temp_dir),
+                             image_loader=lambda path: None)
+
+    results, stats = pipeline.run(['roto.png'])
+
+    assert stats.failed == 1
+    assert results[0].error is not None
+    assert storage.list_bills() == []
+
+def test_batch_pipeline_ocr_failure(temp_dir):
+    """Prueba que un fallo del OCR se cuenta como error y no como ticket inválido."""
+    storage = StorageService(os.path.join(temp_dir, 'data'))
+    pipeline = BatchPipeline(FakeOCRService(), storage, FakeShareService(temp_dir),
+                             image_loader=lambda path: path)
+
+    results, stats = pipeline.run(['roto', 'Flan 4.00'])
+
+    assert stats.failed == 1
+    assert stats.invalid == 0
+    assert {r.path: r.error for r in results}['roto'] == "Tesseract falló"
+    assert len(storage.list_bills()) == 1
+
+def test_batch_capture(temp_dir, monkeypatch):
+    """Prueba que ``batch --capture`` guarda cada ticket en el corpus."""
+    import numpy as np
+    from src.services.capture_service import CaptureStore
+    from src.services.ocr_service import OCRService
+
+    corpus = CaptureStore(os.path.join(temp_dir, 'corpus'))
+    ocr = OCRService(capture_store=corpus)
+    ocr.einvoice = False
+    monkeypatch.setattr(ocr, 'recognize', lambda image: "Hamburguesa 10.99")
+    images = {}
+    for name, pixels in (('ticket1.png', 255), ('ticket2.png', 0)):
+        path = os.path.join(temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(name.encode())
+        images[path] = np.full((64, 64), pixels, np.uint8)
+    pipeline = BatchPipeline(ocr, StorageService(os.path.join(temp_dir, 'data')),
+                             FakeShareService(temp_dir), image_loader=lambda path: images[path],
+                             image_hasher=None)
+
+    results, stats = pipeline.run(images)
+
+    assert stats.failed == 0
+    assert len(corpus) == 2
+    assert all(record['items'] == {'Hamburguesa': 10.99} for record in corpus)
+    # Se guarda el archivo original, no la imagen decodificada
+    assert sorted(corpus.load_image(record['sha256']) for record in corpus) == [b'ticket1.png',
+                                                                                 b'ticket2.png']
@@ -0,0 +1,121 @@
+import pytest
+import os
+import sqlite3
+
+import cv2
+import numpy as np
+
+from src.services.blob_store import BlobStore
+from src.services.storage_service import StorageService
+
+def _photo(width=3000, height=4000):
+    """Foto JPEG de un ticket claro sobre fondo gris."""
+    image = np.full((height, width, 3), 90, dtype=np.uint8)
+    cv2.rectangle(image, (500, 300), (2500, 3700), (235, 235, 235), -1)
+    for y in range(500, 3500, 120):
+        cv2.putText(image, "Hamburguesa  10.99", (600, y), cv2.FONT_HERSHEY_SIMPLEX, 3,
+                    (20, 20, 20), 6)
+    _, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    return jpeg.tobytes()
+
+def test_put_deduplicates_and_compresses(temp_dir):
+    """Prueba que la misma foto se guarda una vez, reducida y recomprimida."""
+    store = BlobStore(temp_dir, format='jpg', quality=70, max_side=2000)
+    photo = _photo()
+    path = os.path.join(temp_dir, 'ticket.jpg')
+    with open(path, 'wb') as f:
+        f.write(photo)
+
+    ref = store.put(photo)
+    assert store.put(path) == ref
+    assert ref == f"{BlobStore.content_hash(photo)}.jpg"
+
+    stored = store.path(ref)
+    assert os.path.getsize(stored) < len(photo)
+    assert max(cv2.imread(stored).shape[:2]) == 2000
+    blobs = [name for _, _, files in os.walk(temp_dir) for name in files
+             if name.startswith(ref[:8]) and '.thumb' not in name]
+    assert blobs == [ref]
+
+def test_thumbnail_in_background(temp_dir):
+    """Prueba que la miniatura se genera en segundo plano."""
+    store = BlobStore(temp_dir, thumbnail_side=128)
+    ref = store.put(_photo())
+    store.wait(timeout=10)
+
+    thumbnail = store.thumbnail_path(ref)
+    assert thumbnail is not None
+    assert max(cv2.imread(thumbnail).shape[:2]) == 128
+    store.shutdown()
+
+def test_thumbnail_regenerated_on_demand(temp_dir):
+    """Prueba que una miniatura borrada se vuelve a programar al pedirla."""
+    store = BlobStore(temp_dir)
+    ref = store.put(_photo())
+    store.wait(timeout=10)
+    os.remove(store.thumbnail_path(ref))
+
+    assert store.thumbnail_path(ref) is None
+    store.wait(timeout=10)
+    assert store.thumbnail_path(ref) is not None
+    store.shutdown()
+
+def test_failed_thumbnail_is_not_retried(temp_dir):
+    """Prueba que una foto corrupta o inexistente no deja trabajos pendientes."""
+    store = BlobStore(temp_dir)
+    missing = 'cd' * 32 + '.jpg'
+    assert store.thumbnail_path(missing) is None
+    assert store.pending_thumbnail(missing) is None
+
+    corrupt = 'ab' * 32 + '.jpg'
+    os.makedirs(os.path.dirname(store._path(corrupt)))
+    with open(store._path(corrupt), 'wb') as f:
+        f.write(b'no es una imagen')
+    assert store.thumbnail_path(corrupt) is None
+    future = store.pending_thumbnail(corrupt)
+    assert future is not None
+    store.wait(timeout=10)
+
+    assert future.exception() is not None
+    assert store.thumbnail_path(corrupt) is None
+    assert store.pending_thumbnail(corrupt) is None
+    store.shutdown()
+
+def test_load_for_ocr(temp_dir):
+    """Prueba releer la foto guardada en gris para el OCR."""
+    store = BlobStore(temp_dir)
+    ref = store.put(_photo())
+
+    image = store.load(ref)
+    assert image.ndim == 2
+    assert store.delete(ref)
+    with pytest.raises(FileNotFoundError):
+        store.load(ref)
+    store.shutdown()
+
+def test_storage_keeps_bill_photo(temp_dir):
+    """Prueba que la cuenta guarda la referencia a su foto."""
+    storage = StorageService(temp_dir)
+    filename = storage.save_bill({'items': {'Hamburguesa': 10.99}}, image=_photo())
+
+    ref = storage.load_bill(filename)['image_ref']
+    assert storage.blobs.path(ref) is not None
+    assert storage.list_bills()[0]['image_ref'] == ref
+    storage.blobs.wait(timeout=10)
+
+def test_bills_table_migration(temp_dir):
+    """Prueba que una base de datos anterior gana la columna image_ref."""
+    conn = sqlite3.connect(os.path.join(temp_dir, 'bills.db'))
+    conn.execute('CREATE TABLE bills (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, '
+                 'total REAL NOT NULL, items TEXT NOT NULL, metadata TEXT)')
+    conn.execute("INSERT INTO bills (date, total, items) VALUES ('2024-01-01', 10.99, '[]')")
+    conn.commit()
+    conn.close()
+
+    storage = StorageService(temp_dir)
+    assert storage.get_bill(1)['image_ref'] is None
+
+    ref = storage.set_bill_image(1, _photo())
+    assert storage.get_all_bills()[0]['image_ref'] == ref
+    assert storage.set_bill_image(99, _photo()) is None
+    storage.blobs.wait(timeout=10)
@@ -0,0 +1,106 @@
+import pytest
+
+from src.services.capture_service import CaptureStore, ReplayRunner, compare_items
+
+class FakeEngine:
+    """Motor de prueba: la 'imagen' son líneas 'descripcion precio'."""
+
+    def __init__(self, price_offset=0.0):
+        self.price_offset = price_offset
+        self.threads = set()
+
+    def params(self):
+        return {'engine': 'fake', 'price_offset': self.price_offset}
+
+    def read_items(self, image):
+        if image == b'roto':
+            raise RuntimeError("imagen ilegible")
+        items = {}
+        for line in image.decode('utf-8').splitlines():
+            desc, price = line.rsplit(' ', 1)
+            items[desc] = float(price) + self.price_offset
+        return items
+
+def _fill(store):
+    engine = FakeEngine()
+    for image in (b'Hamburguesa 10.99\nRefresco 2.50', b'Tacos 8.00', b'Cerveza 4.50\nFlan 3.00'):
+        store.capture(image, engine.params(), image.decode('utf-8'), engine.read_items(image))
+
+def test_capture_and_load(temp_dir):
+    """Prueba que la captura guarda imagen, parámetros, texto e items."""
+    store = CaptureStore(temp_dir)
+    image = b'Tacos 8.00'
+    sha256 = store.capture(image, {'lang': 'spa'}, 'Tacos 8.00', {'Tacos': 8.0})
+
+    record = store.load(sha256)
+    assert record['params'] == {'lang': 'spa'}
+    assert record['text'] == 'Tacos 8.00'
+    assert record['items'] == record['ground_truth'] == {'Tacos': 8.0}
+    assert store.load_image(sha256) == image
+    assert len(store) == 1
+
+def test_recapture_keeps_ground_truth(temp_dir):
+    """Prueba que volver a capturar no pisa la verdad corregida."""
+    store = CaptureStore(temp_dir)
+    sha256 = store.capture(b'Tacos 8.00', {}, 'Tacos 8.00', {'Tacos': 8.0})
+    store.set_ground_truth(sha256, {'Tacos al pastor': 8.0})
+    store.capture(b'Tacos 8.00', {}, 'Tacos 8.00', {'Tacos': 8.0})
+
+    assert store.load(sha256)['ground_truth'] == {'Tacos al pastor': 8.0}
+    assert len(store) == 1
+
+def test_compare_items():
+    """Prueba la comparación tolerante a mayúsculas y espacios."""
+    counts = compare_items({'Hamburguesa  doble': 10.99, 'Refresco': 2.5},
+                           {'hamburguesa doble': 10.99, 'Refresco': 2.0, 'Propina': 1.0})
+    assert counts == {'expected': 2, 'found': 3, 'matched': 2, 'price_matched': 1}
+
+def test_replay_reports_accuracy_and_latency(temp_dir):
+    """Prueba la reproducción del corpus con el mismo motor."""
+    store = CaptureStore(temp_dir)
+    _fill(store)
+
+    report = ReplayRunner(store, FakeEngine, workers=3).run()
+    summary = report.summary()
+
+    assert summary['receipts'] == 3
+    assert summary['exact_receipts'] == 3
+    assert summary['item_recall'] == summary['price_accuracy'] == 1.0
+    assert summary['latency_ms']['p50'] <= summary['latency_ms']['p99']
+    assert summary['params'] == {'engine': 'fake', 'price_offset': 0.0}
+    assert [r.sha256 for r in report.results] == sorted(r.sha256 for r in report.results)
+
+def test_replay_with_other_config(temp_dir):
+    """Prueba que otra configuración del motor se refleja en la exactitud."""
+    store = CaptureStore(temp_dir)
+    _fill(store)
+
+    summary = ReplayRunner(store, lambda: FakeEngine(price_offset=1.0), workers=2).run().summary()
+
+    assert summary['item_recall'] == 1.0
+    assert summary['price_accuracy'] == 0.0
+    assert summary['exact_receipts'] == 0
+
+def test_replay_counts_errors(temp_dir):
+    """Prueba que un ticket que falla se informa sin detener la reproducción."""
+    store = CaptureStore(temp_dir)
+    _fill(store)
+    store.capture(b'roto', {}, '', {'Agua': 1.0})
+    progress = []
+
+    report = ReplayRunner(store, FakeEngine, workers=2).run(
+        progress=lambda done, total, result: progress.append((done, total)))
+
+    assert report.summary()['errors'] == 1
+    assert report.summary()['receipts'] == 4
+    assert progress[-1] == (4, 4)
+
+def test_replay_reports_engine_errors(temp_dir):
+    """Prueba que un fallo del motor cuenta como error y no como ticket sin items."""
+    store = CaptureStore(temp_dir)
+    store.capture(b'roto', {}, '', {'Agua': 1.0})
+
+    summary = ReplayRunner(store, FakeEngine, workers=1).run().summary()
+
+    assert summary['errors'] == 1
+    assert summary['item_recall'] == 0.0
@@ -0,0 +1,79 @@
+import pytest
+
+from src.services.catalog_service import CatalogService, deletes, levenshtein, normalize
+from src.services.storage_service import StorageService
+
+@pytest.fixture
+def catalog():
+    """Catálogo con algunos platos."""
+    catalog = CatalogService()
+    for description in ["Hamburguesa", "Hamburguesa doble", "Refresco", "Papas fritas",
+                        "Tacos al pastor", "Coca 600ml", "Café americano"]:
+        catalog.add(description)
+    return catalog
+
+def test_normalize():
+    """Prueba la forma canónica de las descripciones."""
+    assert normalize("  Café  AMERICANO. ") == "cafe americano"
+    assert normalize("Refresc0") == "refresco"
+    assert normalize("Coca 600ml") == "coca 600ml"
+    assert normalize("--") == ""
+
+def test_levenshtein_bounded():
+    """Prueba la distancia de edición acotada."""
+    assert levenshtein("hamburgesa", "hamburguesa", 2) == 1
+    assert levenshtein("tacos", "tacos", 0) == 0
+    assert levenshtein("kitten", "sitting", 3) == 3
+    assert levenshtein("kitten", "sitting", 2) == 3
+    assert levenshtein("a", "abcdef", 2) == 3
+
+def test_deletes():
+    """Prueba las variantes con borrados."""
+    assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert "a" in deletes("abc", 2)
+
+def test_snap_ocr_errors(catalog):
+    """Prueba corregir descripciones mal leídas."""
+    assert catalog.snap("Hamburgesa") == "Hamburguesa"
+    assert catalog.snap("Refresc0") == "Refresco"
+    assert catalog.snap("HAMBURGUESA DOBIE") == "Hamburguesa doble"
+    assert catalog.snap("Tacos al pastr") == "Tacos al pastor"
+    assert catalog.snap("Cafe americano") == "Café americano"
+    # Sin nada parecido se conserva la original
+    assert catalog.snap("Enchiladas suizas") == "Enchiladas suizas"
+
+def test_search_ranking():
+    """Prueba el orden por distancia, comercio y frecuencia."""
+    catalog = CatalogService()
+    catalog.add("Taco", count=1)
+    catalog.add("Tacos", count=5)
+    catalog.add("Tazo", merchant="CAFETERIA")
+
+    assert [m.text for m in catalog.search("Tacoz", limit=2)] == ["Tacos", "Taco"]
+    matches = catalog.search("Tako", merchant="CAFETERIA")
+    assert matches[0].text == "Tazo"
+    assert matches[0].distance == 1
+    assert 0 < matches[0].score < 1
+
+def test_incremental_add(catalog):
+    """Prueba que una descripción nueva se encuentra sin reconstruir el índice."""
+    assert catalog.snap("Enchiladas suisas") == "Enchiladas suisas"
+    catalog.add("Enchiladas suizas")
+    assert catalog.snap("Enchiladas suisas") == "Enchiladas suizas"
+    # La grafía más usada es la que se muestra
+    catalog.add("ENCHILADAS SUIZAS", count=3)
+    assert catalog.snap("enchiladas suisas") == "ENCHILADAS SUIZAS"
+    assert len(catalog) == 8
+
+def test_storage_updates_catalog(temp_dir):
+    """Prueba que el catálogo se carga del almacenamiento y se actualiza al guardar."""
+    storage = StorageService(temp_dir)
+    storage.save_bill({'items': {'Hamburguesa': 120.0}})
+
+    catalog = CatalogService()
+    assert catalog.load_from_storage(storage) == 1
+    storage.catalog = catalog
+
+    storage.save_bill({'items': {'Limonada': 35.0}, 'merchant': 'CAFETERIA'})
+    assert catalog.snap("Limonda") == "Limonada"
+    assert catalog.search("Limonada")[0].count == 1
@@ -0,0 +1,115 @@
+import pytest
+import threading
+
+from src.services.container import ServiceContainer
+
+def test_service_is_built_lazily():
+    """Prueba que la fábrica no se ejecuta hasta pedir el servicio."""
+    calls = []
+    container = ServiceContainer()
+    container.register('demo', lambda: calls.append(1) or object())
+
+    assert calls == []
+    assert container.is_loaded('demo') is False
+
+    container.get('demo')
+    assert calls == [1]
+    assert container.is_loaded('demo') is True
+
+def test_service_is_singleton_across_threads():
+    """Prueba que hilos concurrentes reciben la misma instancia."""
+    calls = []
+    container = ServiceContainer()
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    container.register('demo', factory)
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        results.append(container.get('demo'))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+def test_reset_rebuilds_service():
+    """Prueba que reset descarta la instancia construida."""
+    container = ServiceContainer()
+    container.register('demo', object)
+
+    first = container.get('demo')
+    container.reset()
+
+    assert container.get('demo') is not first
+
+def test_unknown_service():
+    """Prueba pedir un servicio no registrado."""
+    with pytest.raises(KeyError):
+        ServiceContainer().get('inexistente')
+
+def test_factory_depends_on_other_service():
+    """Prueba que una fábrica puede pedir otro servicio aún no construido."""
+    container = ServiceContainer()
+    container.register('storage', object)
+    container.register('ocr', lambda: ('ocr', container.get('storage')))
+
+    ocr = container.get('ocr')
+
+    assert ocr[1] is container.get('storage')
+
+def test_slow_service_does_not_block_others():
+    """Prueba que construir un servicio lento no bloquea pedir otro."""
+    container = ServiceContainer()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return object()
+
+    container.register('slow', slow)
+    container.register('fast', object)
+    thread = threading.Thread(target=container.get, args=('slow',))
+    thread.start()
+    started.wait(5)
+
+    assert container.get('fast') is not None
+    assert container.is_loaded('slow') is False
+    release.set()
+    thread.join()
+    assert container.is_loaded('slow') is True
+
+def test_circular_dependency():
+    """Prueba que una dependencia circular falla en lugar de colgarse."""
+    container = ServiceContainer()
+    container.register('a', lambda: container.get('b'))
+    container.register('b', lambda: container.get('a'))
+
+    with pytest.raises(RuntimeError):
+        container.get('a')
+
+def test_catalog_service_with_storage(tmp_path, monkeypatch):
+    """Prueba que el catálogo compartido se construye y recibe las cuentas nuevas."""
+    from src.services import container as container_module
+
+    monkeypatch.chdir(tmp_path)
+    container_module.container.reset()
+    try:
+        catalog = container_module.get_catalog_service()
+        storage = container_module.get_storage_service()
+        assert storage.catalog is catalog
+
+        storage.save_bill({'items': {'Limonada': 35.0}})
+        assert catalog.snap('Limonda') == 'Limonada'
+    finally:
+        container_module.container.reset()
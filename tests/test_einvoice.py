@@ -0,0 +1,87 @@
+import pytest
+import json
+from decimal import Decimal
+
+from src.services import einvoice
+from src.services.einvoice import EInvoice, parse_payload, read_einvoice, register_parser
+
+CFDI = ("https://verificacfdi.facturaelectronica.sat.gob.mx/default.aspx?"
+        "id=5803EB8D-81CD-4557-8719-26632D2FA434&re=XOJI740919U48&rr=XEXX010101000"
+        "&tt=0000001234.560000&fe=qsIe6w==")
+TICKETBAI = ("https://batuz.eus/QRTBAI/?id=TBAI-00000006Y-251019-btFpwP8dcLGAF-237"
+             "&s=T&nf=27174&i=15.51&cr=007")
+VERIFACTU = ("https://www2.agenciatributaria.gob.es/wlpl/TIKE-CONT/ValidarQR?"
+             "nif=89890001K&numserie=12345678-G33&fecha=01-09-2024&importe=241.4")
+
+def test_parse_cfdi():
+    """Prueba el QR de un CFDI: solo trae el total."""
+    invoice = parse_payload(CFDI)
+
+    assert invoice.format == 'cfdi'
+    assert invoice.total == Decimal('1234.56')
+    assert invoice.issuer == 'XOJI740919U48'
+    assert invoice.items == {}
+
+def test_parse_ticketbai():
+    """Prueba el QR de TicketBAI."""
+    invoice = parse_payload(TICKETBAI)
+
+    assert invoice.format == 'ticketbai'
+    assert invoice.total == Decimal('15.51')
+    assert invoice.issuer == '00000006Y'
+    assert invoice.invoice_id == '27174'
+
+def test_parse_verifactu():
+    """Prueba el QR de Verifactu."""
+    invoice = parse_payload(VERIFACTU)
+
+    assert invoice.format == 'verifactu'
+    assert invoice.total == Decimal('241.40')
+    assert invoice.issuer == '89890001K'
+
+def test_parse_json_receipt():
+    """Prueba un ticket en JSON con el detalle de items."""
+    payload = json.dumps({
+        'items': [{'description': 'Hamburguesa', 'price': '10.99'},
+                  {'description': 'Refresco', 'price': 2.5}],
+        'total': '13.49'
+    })
+    invoice = parse_payload(payload)
+
+    assert invoice.format == 'json'
+    assert invoice.items == {'Hamburguesa': 10.99, 'Refresco': 2.5}
+    assert invoice.total == Decimal('13.49')
+
+    assert parse_payload(json.dumps({'items': {'Flan': 4}})).items == {'Flan': 4.0}
+
+def test_unknown_payloads():
+    """Prueba que los payloads desconocidos o mal formados se ignoran."""
+    assert parse_payload("https://ejemplo.com/menu") is None
+    assert parse_payload("{no es json") is None
+    assert parse_payload(json.dumps({'items': [{'description': 'x', 'price': 'gratis'}]})) is None
+    assert parse_payload("texto libre") is None
+
+def test_register_parser():
+    """Prueba que se pueden registrar formatos nuevos."""
+    @register_parser
+    def parse_test(payload):
+        if payload.startswith('PRUEBA:'):
+            return EInvoice('prueba', items={'Café': 1.5}, raw=payload)
+        return None
+
+    try:
+        assert parse_payload('PRUEBA:1').items == {'Café': 1.5}
+    finally:
+        einvoice.PARSERS.remove(parse_test)
+
+def test_read_einvoice_from_image():
+    """Prueba la lectura de un QR generado con OpenCV."""
+    import cv2
+
+    qr = cv2.QRCodeEncoder.create().encode(TICKETBAI)
+    image = cv2.resize(qr, None, fx=8, fy=8, interpolation=cv2.INTER_NEAREST)
+    image = cv2.copyMakeBorder(image, 80, 80, 80, 80, cv2.BORDER_CONSTANT, value=255)
+
+    invoice = read_einvoice(image)
+    assert invoice is not None
+    assert invoice.total == Decimal('15.51')
@@ -0,0 +1,92 @@
+import pytest
+import threading
+
+from src.services.frame_scheduler import FrameScheduler
+
+def _identity(frame):
+    """Los 'fotogramas' de prueba son directamente su hash."""
+    return frame
+
+def test_waits_for_stable_frames():
+    """Prueba que el OCR solo se lanza tras N fotogramas estables."""
+    processed = []
+    scheduler = FrameScheduler(processed.append, stable_frames=3, hasher=_identity)
+    try:
+        # El primer fotograma y un salto de 8 bits reinician la estabilidad
+        assert scheduler.offer(0b0) is None
+        assert scheduler.offer(0b11111111) is None
+        assert scheduler.offer(0b11111111) is None
+        future = scheduler.offer(0b11111110)
+        assert future is not None
+        future.result(timeout=5)
+
+        assert processed == [0b11111110]
+        assert scheduler.stats.moving == 3
+    finally:
+        scheduler.shutdown()
+
+def test_skips_unchanged_view():
+    """Prueba que no se repite el OCR si la vista no cambió."""
+    processed = []
+    scheduler = FrameScheduler(processed.append, stable_frames=2, change_threshold=10,
+                               hasher=_identity)
+    try:
+        scheduler.offer(0)
+        scheduler.offer(0).result(timeout=5)
+        for _ in range(5):
+            assert scheduler.offer(1) is None
+        assert scheduler.stats.unchanged == 5
+
+        # Otro ticket: más de 10 bits distintos
+        new_view = (1 << 20) - 1
+        scheduler.offer(new_view)
+        scheduler.offer(new_view).result(timeout=5)
+        assert processed == [0, new_view]
+    finally:
+        scheduler.shutdown()
+
+def test_single_job_in_flight():
+    """Prueba que nunca hay más de un OCR en curso."""
+    gate = threading.Event()
+    running = []
+    active = []
+
+    def process(frame):
+        active.append(frame)
+        running.append(len(active))
+        gate.wait(5)
+        active.remove(frame)
+
+    scheduler = FrameScheduler(process, stable_frames=1, change_threshold=0, hasher=_identity)
+    try:
+        first = scheduler.offer(0)
+        assert first is not None
+        assert scheduler.busy
+        assert scheduler.offer(0b1) is None
+        assert scheduler.offer(0b11) is None
+        assert scheduler.stats.busy == 2
+
+        gate.set()
+        first.result(timeout=5)
+        assert max(running) == 1
+    finally:
+        scheduler.shutdown()
+
+def test_result_callback():
+    """Prueba que el resultado llega al callback con su fotograma."""
+    results = []
+    done = threading.Event()
+
+    def on_result(frame, future):
+        results.append((frame, future.result()))
+        done.set()
+
+    scheduler = FrameScheduler(lambda frame: {'Flan': 4.0}, on_result=on_result,
+                               stable_frames=1, hasher=_identity)
+    try:
+        scheduler.offer(7)
+        assert done.wait(5)
+        assert results == [(7, {'Flan': 4.0})]
+        assert not scheduler.busy
+    finally:
+        scheduler.shutdown()
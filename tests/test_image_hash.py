@@ -0,0 +1,56 @@
+import pytest
+
+import cv2
+import numpy as np
+
+from src.services.image_hash import dhash, hamming, phash
+
+def _background():
+    # Degradado horizontal: celdas vecinas claramente distintas
+    return np.tile(np.linspace(110, 220, 1280, dtype=np.uint8), (720, 1))
+
+def _frame():
+    image = _background()
+    for y in range(100, 650, 60):
+        cv2.putText(image, "Hamburguesa  10.99", (100, y), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 0, 3)
+    return image
+
+def test_hamming():
+    """Prueba la distancia de Hamming."""
+    assert hamming(0b1010, 0b1010) == 0
+    assert hamming(0b1010, 0b0101) == 4
+
+def test_dhash_is_stable():
+    """Prueba que ruido y brillo no cambian apenas el hash."""
+    frame = _frame()
+    noisy = cv2.add(frame, np.random.default_rng(0).integers(0, 6, frame.shape, dtype=np.uint8))
+    brighter = cv2.add(frame, 10)
+
+    assert dhash(frame) < 1 << 64
+    assert hamming(dhash(frame), dhash(noisy)) <= 4
+    assert hamming(dhash(frame), dhash(brighter)) <= 4
+
+def test_dhash_detects_changes():
+    """Prueba que otra escena da un hash distinto."""
+    other = np.ascontiguousarray(_background()[:, ::-1])
+
+    assert hamming(dhash(_frame()), dhash(other)) > 10
+
+def test_dhash_color():
+    """Prueba que acepta fotogramas BGR."""
+    gray = _frame()
+    color = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    assert hamming(dhash(gray), dhash(color)) <= 2
+
+def test_phash_same_receipt():
+    """Prueba que otra foto del mismo ticket da un pHash cercano y otro ticket no."""
+    frame = _frame()
+    # Recompresión JPEG y un ligero reencuadre
+    _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
+    retaken = cv2.resize(cv2.imdecode(jpeg, cv2.IMREAD_GRAYSCALE)[10:-10, 15:-15], (1280, 720))
+    other = _background()
+    for y in range(100, 650, 120):
+        cv2.putText(other, "Tacos al pastor  45.00", (300, y), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 5)
+
+    assert hamming(phash(frame), phash(retaken)) <= 10
+    assert hamming(phash(frame), phash(other)) > 10
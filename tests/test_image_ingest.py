@@ -0,0 +1,60 @@
+import pytest
+import os
+
+import cv2
+import numpy as np
+
+from src.services.image_ingest import decode_image, image_size, reduction_factor, to_pil
+
+def _jpeg(width=4000, height=3000):
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    cv2.putText(image, "Hamburguesa 10.99", (100, 300), cv2.FONT_HERSHEY_SIMPLEX, 8, (0, 0, 0), 12)
+    ok, data = cv2.imencode('.jpg', image)
+    assert ok
+    return data.tobytes()
+
+def test_reduction_factor():
+    """Prueba la elección del factor de reducción."""
+    assert reduction_factor(4000, 3000, 2000) == 2
+    assert reduction_factor(6000, 4000, 1500) == 4
+    assert reduction_factor(1200, 800, 2000) == 1
+    assert reduction_factor(4000, 3000, 0) == 1
+
+def test_decode_bytes_reduced_gray():
+    """Prueba que los bytes se decodifican en gris y reducidos."""
+    data = _jpeg()
+    assert image_size(data) == (4000, 3000)
+
+    image = decode_image(data, target_side=2000)
+    assert image.shape == (1500, 2000)
+    assert image.dtype == np.uint8
+
+    assert decode_image(memoryview(data), target_side=2000).shape == (1500, 2000)
+    assert decode_image(bytearray(data), target_side=0).shape == (3000, 4000)
+
+def test_decode_path(temp_dir):
+    """Prueba la decodificación desde una ruta."""
+    path = os.path.join(temp_dir, 'ticket.jpg')
+    with open(path, 'wb') as f:
+        f.write(_jpeg())
+
+    assert decode_image(path, target_side=1000).shape == (750, 1000)
+
+def test_decode_array_passthrough():
+    """Prueba que los arrays ya decodificados no se copian."""
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    assert decode_image(image) is image
+
+def test_decode_invalid():
+    """Prueba el error con datos que no son una imagen."""
+    with pytest.raises(ValueError):
+        decode_image(b'no es una imagen')
+
+def test_to_pil_shares_memory():
+    """Prueba que la imagen de PIL comparte la memoria del array."""
+    gray = np.zeros((20, 30), dtype=np.uint8)
+    pil_image = to_pil(gray)
+    gray[5, 7] = 200
+
+    assert pil_image.size == (30, 20)
+    assert pil_image.getpixel((7, 5)) == 200
@@ -0,0 +1,62 @@
+import pytest
+
+import cv2
+import numpy as np
+
+from src.services.image_quality import QualityThresholds, assess_quality, estimate_skew
+
+def _receipt(width=1600, height=2000):
+    """Ticket sintético: líneas de texto negro sobre papel claro."""
+    image = np.full((height, width), 225, dtype=np.uint8)
+    for i, y in enumerate(range(150, height - 100, 90)):
+        cv2.putText(image, f"Hamburguesa {i}    {i + 10}.99", (80, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+    return image
+
+def test_sharp_receipt_passes():
+    """Prueba que un ticket nítido supera el control."""
+    verdict = assess_quality(_receipt())
+
+    assert verdict.ok, verdict.reasons
+    assert verdict.width == 1600
+    assert verdict.elapsed_ms > 0
+
+def test_blurry_receipt_is_rejected():
+    """Prueba el rechazo de una foto desenfocada."""
+    blurry = cv2.GaussianBlur(_receipt(), (0, 0), 12)
+    verdict = assess_quality(blurry)
+
+    assert not verdict.ok
+    assert 'blur' in verdict.reasons
+    assert verdict.message
+
+def test_glare_is_rejected():
+    """Prueba el rechazo de una foto con reflejos."""
+    image = _receipt()
+    image[200:1200, 200:1400] = 255
+    verdict = assess_quality(image)
+
+    assert 'glare' in verdict.reasons
+    assert verdict.glare_fraction > 0.15
+
+def test_low_resolution_is_rejected():
+    """Prueba el rechazo por resolución."""
+    small = cv2.resize(_receipt(), (480, 600), interpolation=cv2.INTER_AREA)
+    assert 'resolution' in assess_quality(small).reasons
+
+def test_skew_is_estimated():
+    """Prueba la estimación de la inclinación."""
+    image = _receipt()
+    height, width = image.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), 25, 1.0)
+    rotated = cv2.warpAffine(image, matrix, (width, height), borderValue=225)
+
+    assert abs(estimate_skew(_receipt()) or 0) < 3
+    verdict = assess_quality(rotated, QualityThresholds(max_skew=15))
+    assert 'skew' in verdict.reasons
+    assert 20 < verdict.skew_degrees < 30
+
+def test_color_image_is_accepted():
+    """Prueba que también acepta imágenes BGR."""
+    image = cv2.cvtColor(_receipt(), cv2.COLOR_GRAY2BGR)
+    assert assess_quality(image).ok
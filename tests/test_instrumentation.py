@@ -0,0 +1,108 @@
+import pytest
+import json
+import os
+
+from src.services import instrumentation
+from src.services.instrumentation import MetricsRegistry, registry, span, timed
+
+@pytest.fixture
+def metrics():
+    """Fixture que activa el registro global y lo deja como estaba."""
+    was_enabled = registry.enabled
+    registry.reset()
+    registry.enable()
+    yield registry
+    registry.reset()
+    registry.enabled = was_enabled
+
+@timed('test.double')
+def double(value):
+    if value < 0:
+        raise ValueError("negativo")
+    return value * 2
+
+def test_disabled_records_nothing():
+    """Prueba que desactivado no se registra nada."""
+    was_enabled = registry.enabled
+    registry.disable()
+    registry.reset()
+    try:
+        assert double(2) == 4
+        with span('test.block'):
+            pass
+        assert registry.snapshot() == {}
+    finally:
+        registry.enabled = was_enabled
+
+def test_timed_counts_calls_and_errors(metrics):
+    """Prueba que se cuentan llamadas, errores y latencias."""
+    for value in range(9):
+        double(value)
+    with pytest.raises(ValueError):
+        double(-1)
+
+    stats = metrics.snapshot()['test.double']
+    assert stats['count'] == 10
+    assert stats['errors'] == 1
+    assert stats['error_rate'] == pytest.approx(0.1)
+    assert sum(stats['buckets'].values()) <= 10
+    assert stats['p50_ms'] <= stats['p99_ms'] <= stats['max_ms']
+
+def test_span_and_record_error(metrics):
+    """Prueba el context manager y los errores capturados por el servicio."""
+    with span('test.block'):
+        pass
+    instrumentation.record_error('test.block')
+
+    stats = metrics.snapshot()['test.block']
+    assert stats['count'] == 1
+    assert stats['errors'] == 1
+
+def test_histogram_quantiles():
+    """Prueba la estimación de cuantiles por bucket."""
+    metrics = MetricsRegistry(enabled=True)
+    for _ in range(90):
+        metrics.observe('op', 0.002)
+    for _ in range(10):
+        metrics.observe('op', 0.3)
+
+    stats = metrics.snapshot()['op']
+    assert stats['p50_ms'] == pytest.approx(2.5)
+    assert stats['p99_ms'] == pytest.approx(300)
+
+def test_prometheus_export():
+    """Prueba el formato de texto de Prometheus."""
+    metrics = MetricsRegistry(enabled=True)
+    metrics.observe('ocr.extract_text', 0.2)
+    metrics.observe('ocr.extract_text', 3.0, error=True)
+    text = metrics.to_prometheus()
+
+    assert '# TYPE billsplit_operation_duration_seconds histogram' in text
+    bucket = 'billsplit_operation_duration_seconds_bucket{operation="ocr.extract_text",le='
+    assert bucket + '"0.25"} 1' in text
+    assert bucket + '"+Inf"} 2' in text
+    assert 'billsplit_operation_duration_seconds_count{operation="ocr.extract_text"} 2' in text
+    assert 'billsplit_operation_errors_total{operation="ocr.extract_text"} 1' in text
+
+def test_write_json(temp_dir):
+    """Prueba el volcado a JSON."""
+    metrics = MetricsRegistry(enabled=True)
+    metrics.observe('storage.get_bill', 0.004)
+    path = os.path.join(temp_dir, 'metrics.json')
+    metrics.write_json(path)
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['operations']['storage.get_bill']['count'] == 1
+
+def test_configure_from_env():
+    """Prueba la activación por variable de entorno."""
+    was_enabled = registry.enabled
+    try:
+        registry.disable()
+        instrumentation.configure_from_env({'BILLSPLIT_METRICS': '0'})
+        assert not registry.enabled
+        instrumentation.configure_from_env({'BILLSPLIT_METRICS': '1'})
+        assert registry.enabled
+    finally:
+        registry.enabled = was_enabled
@@ -0,0 +1,107 @@
+import pytest
+import io
+import json
+import logging
+import threading
+
+from src.services.logging_config import log_duration, parse_levels, setup_logging, shutdown_logging
+
+@pytest.fixture
+def restore_logging():
+    """Fixture que deja el logging raíz como estaba."""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    for name in ('services.ocr_service', 'src.services.ocr_service'):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+def _records(stream):
+    shutdown_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_json_records_with_fields(restore_logging):
+    """Prueba que los registros JSON llevan los campos estructurados."""
+    stream = io.StringIO()
+    setup_logging(level='INFO', json_format=True, stream=stream)
+    logging.getLogger('services.batch_service').info(
+        "Lote terminado: %d tickets", 3, extra={'event': 'batch.run', 'duration_ms': 12.5})
+
+    record, = _records(stream)
+    assert record['message'] == "Lote terminado: 3 tickets"
+    assert record['level'] == 'INFO'
+    assert record['logger'] == 'services.batch_service'
+    assert record['event'] == 'batch.run'
+    assert record['duration_ms'] == 12.5
+
+def test_formatting_happens_off_thread(restore_logging):
+    """Prueba que el mensaje se compone en el hilo del listener."""
+    formatted_in = []
+
+    class Arg:
+        def __str__(self):
+            formatted_in.append(threading.current_thread().name)
+            return 'x'
+
+    stream = io.StringIO()
+    setup_logging(level='INFO', json_format=True, stream=stream)
+    logging.getLogger('services.ocr_service').info("valor %s", Arg())
+    _records(stream)
+
+    assert formatted_in
+    assert threading.current_thread().name not in formatted_in
+
+def test_subsystem_levels(restore_logging):
+    """Prueba los niveles por subsistema, también con el prefijo src."""
+    stream = io.StringIO()
+    setup_logging(level='DEBUG', levels={'services.ocr_service': 'WARNING'},
+                  json_format=True, stream=stream)
+    logging.getLogger('services.ocr_service').info("oculto")
+    logging.getLogger('src.services.ocr_service').info("oculto")
+    logging.getLogger('services.storage_service').debug("visible")
+
+    assert [r['message'] for r in _records(stream)] == ["visible"]
+
+def test_exception_is_kept(restore_logging):
+    """Prueba que el traceback llega al registro."""
+    stream = io.StringIO()
+    setup_logging(level='INFO', json_format=True, stream=stream)
+    try:
+        raise ValueError("ticket ilegible")
+    except ValueError:
+        logging.getLogger('services.ocr_service').exception("Error procesando imagen")
+
+    record, = _records(stream)
+    assert 'ValueError: ticket ilegible' in record['exc']
+
+def test_log_duration(restore_logging):
+    """Prueba el registro de duración con campos añadidos en el bloque."""
+    stream = io.StringIO()
+    setup_logging(level='DEBUG', json_format=True, stream=stream)
+    log = logging.getLogger('services.ocr_service')
+    with log_duration(log, 'ocr.process_image') as fields:
+        fields['items'] = 4
+
+    record, = _records(stream)
+    assert record['event'] == 'ocr.process_image'
+    assert record['items'] == 4
+    assert record['duration_ms'] >= 0
+
+def test_log_duration_disabled_level(restore_logging):
+    """Prueba que sin el nivel habilitado no se registra nada."""
+    stream = io.StringIO()
+    setup_logging(level='INFO', json_format=True, stream=stream)
+    with log_duration(logging.getLogger('services.ocr_service'), 'ocr.process_image'):
+        pass
+
+    assert _records(stream) == []
+
+def test_parse_levels():
+    """Prueba el formato de BILLSPLIT_LOG_LEVELS."""
+    assert parse_levels("services.ocr_service=debug, kivy=ERROR,,mal") == {
+        'services.ocr_service': 'DEBUG', 'kivy': 'ERROR'}
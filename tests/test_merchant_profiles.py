@@ -0,0 +1,100 @@
+import pytest
+import os
+
+from src.services.merchant_profiles import (MerchantProfile, Word, header_key, learn_profile,
+                                            parse_lines, parse_price, same_header, words_to_lines)
+from src.services.storage_service import StorageService
+
+def _data(lines):
+    """Salida de image_to_data a partir de [(texto, left, top)] por línea."""
+    data = {key: [] for key in ('text', 'conf', 'block_num', 'par_num', 'line_num',
+                                'left', 'top', 'width', 'height')}
+    for line_num, words in enumerate(lines, 1):
+        for text, left, top in words:
+            data['text'].append(text)
+            data['conf'].append('90')
+            data['block_num'].append(1)
+            data['par_num'].append(1)
+            data['line_num'].append(line_num)
+            data['left'].append(left)
+            data['top'].append(top)
+            data['width'].append(15 * len(text))
+            data['height'].append(20)
+    return data
+
+RECEIPT = [
+    [("TAQUERIA", 100, 20), ("EL", 250, 20), ("GÜERO", 300, 20)],
+    [("Tacos", 40, 300), ("al", 130, 300), ("pastor", 170, 300), ("45.00", 600, 300)],
+    [("Refresco", 40, 340), ("25.50", 600, 340)],
+    [("TOTAL", 40, 400), ("70.50", 600, 400)],
+]
+
+def test_header_key():
+    """Prueba la normalización del encabezado."""
+    text = "  Taquería el Güero.\n\nSucursal #3\nTacos 45.00"
+    assert header_key(text) == "TAQUERÍA EL GÜERO | SUCURSAL 3"
+    assert header_key("--\n") == ""
+
+def test_same_header():
+    """Prueba la confirmación del perfil por el texto del encabezado."""
+    assert same_header("TAQUERIA EL GUER0", "TAQUERIA EL GUERO")
+    assert not same_header("PIZZERIA NAPOLI", "TAQUERIA EL GUERO")
+    assert not same_header("", "TAQUERIA EL GUERO")
+
+def test_parse_price():
+    """Prueba los formatos de precio."""
+    assert parse_price("45.00") == 45.0
+    assert parse_price("$1,234.50") == 1234.5
+    assert parse_price("12,50") == 12.5
+    assert parse_price("1.234,50", ',') == 1234.5
+    assert parse_price("Tacos") is None
+    assert parse_price("45") is None
+
+def test_learn_and_parse_with_profile():
+    """Prueba que el perfil aprendido lee los ítems por su columna de precios."""
+    lines = words_to_lines(_data(RECEIPT))
+    items = {'Tacos al pastor': 45.0, 'Refresco': 25.5}
+
+    profile = learn_profile(lines, items, (1000, 800), key='TAQUERIA EL GUERO')
+    assert profile is not None
+    assert profile.item_region[1] < 0.3
+    assert profile.price_x_range[0] > 0.5
+
+    # La región de ítems se lee recortada: coordenadas relativas a ella
+    x0, y0, x1, _ = profile.item_region
+    region_left, region_top = int(x0 * 800), int(y0 * 1000)
+    shifted = [[(t, left - region_left, top - region_top) for t, left, top in line]
+               for line in RECEIPT[1:]]
+    parsed = parse_lines(words_to_lines(_data(shifted)), profile, int((x1 - x0) * 800))
+    assert parsed == items
+
+def test_learn_needs_item_lines():
+    """Prueba que sin líneas de ítems no se aprende un perfil."""
+    lines = words_to_lines(_data(RECEIPT[:2]))
+    assert learn_profile(lines, {'Tacos al pastor': 45.0}, (1000, 800), key='x') is None
+
+def test_storage_profiles(temp_dir):
+    """Prueba guardar y buscar perfiles de comercio."""
+    storage = StorageService(temp_dir)
+    profile = MerchantProfile(key='TAQUERIA EL GUERO', header_text='TAQUERIA EL GUERO',
+                              logo_hash=0xF0F0F0F0F0F0F0F0, price_x_range=(0.7, 1.0))
+    storage.save_merchant_profile(profile.to_dict())
+
+    found = storage.find_merchant_profile(header_text='TAQUERIA EL GUERO')
+    assert MerchantProfile.from_dict(found) == profile
+    assert found['hits'] == 0
+
+    # Hash del logo con 3 bits distintos
+    near = storage.find_merchant_profile(logo_hash=0xF0F0F0F0F0F0F0F7)
+    assert near['key'] == 'TAQUERIA EL GUERO'
+    assert storage.find_merchant_profile(logo_hash=0x0F0F0F0F0F0F0F0F) is None
+
+    storage.record_merchant_hit('TAQUERIA EL GUERO')
+    storage.save_merchant_profile(dict(profile.to_dict(), psm=4))
+    saved = storage.get_merchant_profile('TAQUERIA EL GUERO')
+    assert saved['hits'] == 1
+    assert saved['psm'] == 4
+
+    assert [p['key'] for p in storage.list_merchant_profiles()] == ['TAQUERIA EL GUERO']
+    assert storage.delete_merchant_profile('TAQUERIA EL GUERO')
+    assert storage.get_merchant_profile('TAQUERIA EL GUERO') is None
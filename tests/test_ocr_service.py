@@ -121,4 +121,52 @@ def test_validate_items():
     assert service.validate_items(items, Decimal('20.00')) is False
     
     # Validar con lista vacía
-    assert service.validate_items([]) is False 
\ No newline at end of file
+    assert service.validate_items([]) is False 
+
+def test_failed_merchant_learning_is_not_retried(monkeypatch):
+    """Prueba que el perfil se aprende en segundo plano y no se reintenta si falla."""
+    import numpy as np
+    import pytesseract
+    
+    calls = []
+    def image_to_data(*args, **kwargs):
+        calls.append(1)
+        # Sin líneas de ítems: no se puede aprender el perfil
+        return {'text': [], 'conf': [], 'block_num': [], 'par_num': [], 'line_num': [],
+                'left': [], 'top': [], 'width': [], 'height': []}
+    monkeypatch.setattr(pytesseract, 'image_to_data', image_to_data)
+    service = OCRService(profile_store=object())
+    image = np.full((200, 100), 255, np.uint8)
+    
+    for _ in range(3):
+        service._schedule_learning(image, {'Tacos': 45.0}, 'TAQUERIA', 1234)
+        service.wait_learning()
+    
+    assert len(calls) == 1
+    assert 'TAQUERIA' in service._unlearnable
+
+def test_merchant_logo_match_is_confirmed_by_header(monkeypatch):
+    """Prueba que un logo parecido con otro encabezado no usa el perfil del comercio."""
+    import numpy as np
+    from src.services import ocr_service
+    
+    class FakeProfiles:
+        def find_merchant_profile(self, header_text=None, logo_hash=None, max_distance=6):
+            if logo_hash is not None:
+                return {'key': 'TAQUERIA EL GUERO', 'header_text': 'TAQUERIA EL GUERO'}
+            return None
+    
+    monkeypatch.setattr(ocr_service, 'dhash', lambda image: 1234)
+    service = OCRService(profile_store=FakeProfiles())
+    monkeypatch.setattr(service, 'preprocess_image', lambda image, **kwargs: image)
+    image = np.full((200, 100), 255, np.uint8)
+    
+    monkeypatch.setattr(service, 'recognize', lambda image: "Taqueria el Guero")
+    profile, header_text, logo_hash = service.match_merchant(image)
+    assert profile.key == 'TAQUERIA EL GUERO'
+    
+    monkeypatch.setattr(service, 'recognize', lambda image: "Pizzeria Napoli")
+    profile, header_text, logo_hash = service.match_merchant(image)
+    assert profile is None
+    assert header_text == 'PIZZERIA NAPOLI'
+    assert logo_hash == 1234
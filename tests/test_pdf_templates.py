@@ -0,0 +1,50 @@
+import pytest
+import io
+import re
+
+from src.services.pdf_templates import get_template
+
+def _count_pages(data):
+    return len(re.findall(rb'/Type\s*/Page\b', data))
+
+def test_template_is_cached():
+    """Prueba que la plantilla se construye una vez por configuración."""
+    assert get_template("Bill Splitter - Receipt") is get_template("Bill Splitter - Receipt")
+    assert get_template("Bill Splitter - Receipt") is not get_template()
+
+def test_render_single_page():
+    """Prueba renderizar una cuenta corta en una página."""
+    template = get_template("Bill Splitter - Receipt")
+    buffer = io.BytesIO()
+    
+    template.render(buffer, rows=[("Hamburguesa", "$10.99")], totals=[("Total:", "$10.99", True)])
+    
+    assert buffer.getvalue().startswith(b'%PDF')
+    assert _count_pages(buffer.getvalue()) == 1
+
+def test_render_paginates_rows():
+    """Prueba que las filas que no caben pasan a páginas nuevas."""
+    template = get_template()
+    count = template.rows_first_page + template.rows_per_page + 1
+    rows = [(f"Item {i}", "$1.00") for i in range(count)]
+    buffer = io.BytesIO()
+    
+    template.render(buffer, rows=rows, totals=[("Total:", f"${len(rows)}.00", True)], title="Juan")
+    
+    assert _count_pages(buffer.getvalue()) == 3
+
+def test_header_defined_once_per_canvas():
+    """Prueba que cada plantilla define su cabecera una vez por documento sin tocar el canvas."""
+    from reportlab.pdfgen import canvas
+    
+    receipt, summary = get_template("Bill Splitter - Receipt"), get_template()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    for _ in range(2):
+        receipt.draw_header(c, subtitle="Date: 2024-01-01 12:00")
+        summary.draw_header(c, title="Juan")
+        c.showPage()
+    c.save()
+    
+    assert not any('billsplit' in name for name in vars(c))
+    assert _count_pages(buffer.getvalue()) == 2
@@ -0,0 +1,99 @@
+import pytest
+import hashlib
+import json
+import os
+import time
+
+from src.services import profiler
+from src.services.image_ingest import image_sha256
+from src.services.profiler import SamplingProfiler, profile_session
+
+@pytest.fixture
+def profiling(temp_dir):
+    """Fixture que activa el perfilado en un directorio temporal."""
+    previous = profiler.settings
+    profiler.configure(enabled=True, output_dir=temp_dir, interval=0.001, min_duration=0.0)
+    yield temp_dir
+    profiler.settings = previous
+
+def busy_receipt(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+class FakeOCRService:
+    def process_image(self, image):
+        return {image.decode('utf-8'): 1.0}
+
+def test_sampling_profiler_collects_stacks():
+    """Prueba que el perfilador registra la función que consume tiempo."""
+    sampler = SamplingProfiler(interval=0.001)
+    sampler.start()
+    busy_receipt(0.1)
+    sampler.stop()
+
+    assert sampler.samples > 0
+    collapsed = sampler.collapsed()
+    assert 'busy_receipt (test_profiler.py' in collapsed
+    stack, count = collapsed.splitlines()[0].rsplit(' ', 1)
+    assert int(count) > 0
+
+def test_disabled_session_writes_nothing(temp_dir):
+    """Prueba que sin activar no se escribe ningún perfil."""
+    previous = profiler.settings
+    profiler.configure(enabled=False, output_dir=temp_dir)
+    try:
+        with profile_session('ocr', image=b'ticket') as session:
+            session.record(items={})
+    finally:
+        profiler.settings = previous
+
+    assert os.listdir(temp_dir) == []
+
+def test_session_writes_profile_and_input(profiling):
+    """Prueba que la sesión guarda pilas, metadatos e imagen de entrada."""
+    image = b'Hamburguesa'
+    with profile_session('ocr', image=image, metadata={'source': 'test'}) as session:
+        busy_receipt(0.05)
+        session.record(items={'Hamburguesa': 10.99})
+
+    with open(session.path, encoding='utf-8') as f:
+        meta = json.load(f)
+    assert meta['kind'] == 'ocr'
+    assert meta['image_sha256'] == hashlib.sha256(image).hexdigest()
+    assert meta['samples'] > 0
+    assert meta['metadata'] == {'source': 'test', 'items': {'Hamburguesa': 10.99}}
+
+    collapsed_path = session.path[:-len('.json')] + '.collapsed'
+    with open(collapsed_path, encoding='utf-8') as f:
+        assert 'busy_receipt' in f.read()
+
+    assert profiler.load_profile_input(session.path) == image
+    replay = profiler.replay_profile(session.path, FakeOCRService())
+    assert replay['items'] == {'Hamburguesa': 1.0}
+    assert replay['image_sha256'] == meta['image_sha256']
+
+def test_fast_sessions_are_skipped(profiling):
+    """Prueba que con un umbral solo se guardan las sesiones lentas."""
+    profiler.configure(min_duration=10)
+    with profile_session('split') as session:
+        pass
+
+    assert session.path is None
+    assert os.listdir(profiling) == []
+
+def test_error_is_recorded(profiling):
+    """Prueba que una sesión que falla también deja su perfil."""
+    with pytest.raises(ValueError):
+        with profile_session('split') as session:
+            raise ValueError("ticket ilegible")
+
+    with open(session.path, encoding='utf-8') as f:
+        assert 'ticket ilegible' in json.load(f)['error']
+
+def test_image_sha256_of_buffers():
+    """Prueba el hash de imágenes codificadas en bytes o buffers."""
+    expected = hashlib.sha256(b'abc').hexdigest()
+    assert image_sha256(b'abc') == image_sha256(bytearray(b'abc')) == expected
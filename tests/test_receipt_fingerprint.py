@@ -0,0 +1,132 @@
+import pytest
+import os
+
+from src.services.receipt_fingerprint import (CHUNK_BITS, CHUNKS, chunk_probes, from_hex,
+                                              hash_chunks, item_signature, to_hex)
+from src.services.storage_service import StorageService
+
+ITEMS = {'Hamburguesa': 120.0, 'Refresco': 25.5, 'Papas fritas': 45.0, 'Café americano': 30.0,
+         'Flan': 40.0, 'Agua mineral': 20.0}
+
+def _distance(a, b):
+    return (a ^ b).bit_count()
+
+def test_item_signature():
+    """Prueba que la firma ignora el orden y tolera errores de OCR."""
+    signature = item_signature(ITEMS)
+
+    assert item_signature(list(reversed(list(ITEMS.items())))) == signature
+    assert item_signature([{'description': d, 'price': p} for d, p in ITEMS.items()]) == signature
+    misread = dict(ITEMS)
+    misread['Hamburgesa'] = misread.pop('Hamburguesa')
+    assert _distance(item_signature(misread), signature) <= 6
+    assert _distance(item_signature({'Tacos al pastor': 45.0, 'Limonada': 35.0}), signature) > 6
+    assert item_signature({}) is None
+
+def test_hash_chunks_and_hex():
+    """Prueba el troceado del hash y la conversión a hexadecimal."""
+    value = 0x0123456789ABCDEF
+    assert hash_chunks(value) == [0x0123, 0x4567, 0x89AB, 0xCDEF]
+    assert from_hex(to_hex(value)) == value
+    assert from_hex(value) == value
+    assert from_hex(None) is None
+
+def test_chunk_probes_cover_radius():
+    """Prueba que a distancia <= r algún trozo coincide con una de las sondas."""
+    value = 0x0123456789ABCDEF
+    probes = chunk_probes(value, 7)
+    assert len(probes) == CHUNKS
+    assert all(len(values) == 1 + CHUNK_BITS for values in probes)
+    # 7 bits cambiados repartidos entre los cuatro trozos
+    other = value ^ 0b11 ^ (0b11 << 16) ^ (0b11 << 32) ^ (1 << 48)
+    assert any(chunk in values for chunk, values in zip(hash_chunks(other), probes))
+
+def test_storage_detects_duplicates(temp_dir):
+    """Prueba que guardar otra lectura del mismo ticket lo marca como duplicado."""
+    storage = StorageService(temp_dir)
+    first = storage.save_bill({'items': dict(ITEMS), 'image_hash': 0xF0F0F0F0F0F0F0F0})
+
+    misread = dict(ITEMS)
+    misread['Refresc0'] = misread.pop('Refresco')
+    second = {'items': misread, 'image_hash': f"{0xF0F0F0F0F0F0F0F3:x}"}
+    second_ref = storage.save_bill(second)
+    assert second['possible_duplicates'] == [first]
+    assert second['image_hash'] == 'f0f0f0f0f0f0f0f3'
+
+    # Mismos ítems pero otra foto muy distinta: otro ticket
+    other_photo = {'items': dict(ITEMS), 'image_hash': 0x0F0F0F0F0F0F0F0F}
+    storage.save_bill(other_photo)
+    assert 'possible_duplicates' not in other_photo
+
+    # Sin ítems se compara solo la foto
+    found = storage.find_duplicate_bills(image_hash=0xF0F0F0F0F0F0F0F0)
+    assert [d['bill_ref'] for d in found][0] == first
+    assert found[0]['items_distance'] is None
+
+    # Al borrar una cuenta sale del índice
+    assert storage.delete_bill(first)
+    found = storage.find_duplicate_bills(items_hash=item_signature(ITEMS),
+                                         image_hash=0xF0F0F0F0F0F0F0F0)
+    assert [d['bill_ref'] for d in found] == [second_ref]
+
+def test_backfill_fingerprints(temp_dir):
+    """Prueba indexar cuentas guardadas antes de las huellas."""
+    storage = StorageService(temp_dir)
+    filename = storage.save_bill({'items': dict(ITEMS)})
+    with storage._get_db() as (conn, cur):
+        cur.execute('DELETE FROM receipt_fingerprints')
+        conn.commit()
+
+    assert storage.backfill_fingerprints() == 1
+    assert storage.backfill_fingerprints() == 0
+    assert storage.find_duplicate_bills(items_hash=item_signature(ITEMS))[0]['bill_ref'] == filename
+
+def test_single_item_bills(temp_dir):
+    """Prueba que dos cuentas de un ítem con el mismo precio no se confunden."""
+    assert _distance(item_signature({'Cafe': 2.5}), item_signature({'Cerveza grande': 2.5})) > 6
+
+    # Con menos de MIN_ITEMS ítems y sin foto no se marca nada
+    storage = StorageService(temp_dir)
+    storage.save_bill({'items': {'Cafe': 2.5}})
+    second = {'items': {'Cafe': 2.5}}
+    storage.save_bill(second)
+    assert 'possible_duplicates' not in second
+
+def test_misread_price_with_matching_photo(temp_dir):
+    """Prueba que un precio mal leído no impide detectar el duplicado si la foto coincide."""
+    items = dict(ITEMS, **{'Tacos al pastor': 45.0, 'Limonada': 35.0, 'Ensalada': 60.0,
+                           'Pastel': 55.0})
+    storage = StorageService(temp_dir)
+    first = storage.save_bill({'items': dict(items), 'image_hash': 0xF0F0F0F0F0F0F0F0})
+
+    # El OCR se comió el punto decimal: 25.50 -> 255
+    misread = dict(items, Refresco=255.0)
+    assert _distance(item_signature(misread), item_signature(items)) > 6
+    second = {'items': misread, 'image_hash': 0xF0F0F0F0F0F0F0F1}
+    storage.save_bill(second)
+    assert second['possible_duplicates'] == [first]
+
+def test_invalid_image_hash_is_ignored(temp_dir):
+    """Prueba que un image_hash mal formado no impide guardar la cuenta."""
+    storage = StorageService(temp_dir)
+    bill = {'items': dict(ITEMS), 'image_hash': 'no-es-hex'}
+
+    filename = storage.save_bill(bill)
+
+    assert 'image_hash' not in storage.load_bill(filename)
+
+def test_image_hash_from_photo(temp_dir, monkeypatch):
+    """Prueba que save_bill calcula el hash de la foto si no se lo pasan."""
+    from src.services import storage_service
+
+    monkeypatch.setattr(storage_service, 'decode_image', lambda image: image)
+    monkeypatch.setattr(storage_service, 'phash', lambda image: 0xF0F0F0F0F0F0F0F0)
+    monkeypatch.setattr(StorageService, '_store_image', lambda self, bill_data, image: None)
+    storage = StorageService(temp_dir)
+    first = storage.save_bill({'items': dict(ITEMS)}, image=b'foto')
+
+    second = {'items': dict(ITEMS), 'image_hash': 'no-es-hex'}
+    storage.save_bill(second, image=b'foto')
+
+    assert second['image_hash'] == 'f0f0f0f0f0f0f0f0'
+    assert second['possible_duplicates'] == [first]
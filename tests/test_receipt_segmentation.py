@@ -0,0 +1,53 @@
+import pytest
+
+import cv2
+import numpy as np
+
+from src.services.ocr_service import OCRService
+from src.services.receipt_segmentation import ReceiptRegion, find_receipts
+
+def _photo(boxes, size=(3000, 4000)):
+    """Foto sintética: tickets blancos con texto sobre una mesa oscura."""
+    height, width = size
+    image = np.full((height, width), 60, dtype=np.uint8)
+    for x, y, w, h in boxes:
+        image[y:y + h, x:x + w] = 235
+        for line_y in range(y + 80, y + h - 40, 70):
+            cv2.putText(image, "Tacos  12.50", (x + 40, line_y), cv2.FONT_HERSHEY_SIMPLEX,
+                        1.6, 0, 3)
+    return image
+
+THREE = [(200, 300, 900, 2200), (1500, 400, 900, 2000), (2800, 250, 900, 2400)]
+
+def test_finds_receipts_in_reading_order():
+    """Prueba la detección de tres tickets colocados en fila."""
+    regions = find_receipts(_photo(THREE))
+
+    assert len(regions) == 3
+    assert regions[0].x < regions[1].x < regions[2].x
+    for region, (x, y, w, h) in zip(regions, THREE):
+        assert abs(region.width - w) < 150
+        assert abs(region.height - h) < 150
+
+def test_single_receipt_is_whole_image():
+    """Prueba que una foto de un solo ticket no se recorta."""
+    image = _photo([(0, 0, 4000, 3000)])
+    assert find_receipts(image) == [ReceiptRegion(0, 0, 4000, 3000)]
+
+def test_crop_is_a_view():
+    """Prueba que el recorte no copia la imagen."""
+    image = _photo(THREE)
+    crop = ReceiptRegion(10, 20, 30, 40).crop(image)
+    assert crop.shape == (40, 30)
+    assert np.shares_memory(crop, image)
+
+def test_process_receipts_returns_one_list_per_receipt(monkeypatch):
+    """Prueba que cada ticket se procesa por separado y en orden."""
+    service = OCRService()
+    service.einvoice = False
+    monkeypatch.setattr(service, 'extract_text', lambda crop: f"Ancho {crop.shape[1]}")
+
+    results = service.process_receipts(_photo(THREE))
+
+    assert len(results) == 3
+    assert all(list(items) == ['Ancho'] for items in results)
@@ -0,0 +1,97 @@
+import pytest
+from decimal import Decimal
+import os
+import time
+
+from src.services.render_cache import RenderCache, content_hash
+
+class Renderer:
+    """Renderizador de prueba que cuenta las llamadas."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return text.encode('utf-8')
+
+def test_content_hash_is_stable():
+    """Prueba que el hash no depende del orden de las claves."""
+    a = {'items': {'Hamburguesa': Decimal('10.99'), 'Refresco': Decimal('2.50')}}
+    b = {'items': {'Refresco': Decimal('2.50'), 'Hamburguesa': Decimal('10.99')}}
+
+    assert content_hash(a, 'pdf') == content_hash(b, 'pdf')
+    assert content_hash(a, 'pdf') != content_hash(a, 'summary.txt')
+
+def test_repeated_render_is_cached(temp_dir):
+    """Prueba que la misma cuenta solo se renderiza una vez."""
+    cache = RenderCache(temp_dir)
+    render = Renderer()
+    bill = {'id': 1, 'items': {'Refresco': 2.5}}
+
+    first = cache.get_or_render(bill, 'summary.txt', lambda: render('v1'), owner=1)
+    start = time.perf_counter()
+    for _ in range(1000):
+        again = cache.get_or_render(bill, 'summary.txt', lambda: render('v1'), owner=1)
+    per_hit = (time.perf_counter() - start) / 1000
+
+    assert first == again == b'v1'
+    assert render.calls == 1
+    assert cache.hits == 1000
+    assert per_hit < 0.001
+
+def test_edited_bill_invalidates_previous_render(temp_dir):
+    """Prueba que editar la cuenta descarta el render anterior."""
+    cache = RenderCache(temp_dir)
+    old_path = cache.get_or_render_path({'id': 1, 'items': {'Refresco': 2.5}}, 'pdf',
+                                        lambda: b'viejo', owner=1)
+    new_path = cache.get_or_render_path({'id': 1, 'items': {'Refresco': 3.0}}, 'pdf',
+                                        lambda: b'nuevo', owner=1)
+
+    assert old_path != new_path
+    assert not os.path.exists(old_path)
+    with open(new_path, 'rb') as f:
+        assert f.read() == b'nuevo'
+
+def test_lru_eviction_bounds_memory_and_disk(temp_dir):
+    """Prueba que memoria y disco respetan sus límites expulsando lo más viejo."""
+    cache = RenderCache(temp_dir, max_memory_bytes=250, max_disk_bytes=350)
+    for i in range(10):
+        cache.get_or_render_path({'n': i}, 'pdf', lambda: b'x' * 100)
+
+    assert sum(len(d) for d in cache._memory.values()) <= 250
+    total_disk = sum(os.path.getsize(os.path.join(temp_dir, n)) for n in os.listdir(temp_dir))
+    assert total_disk <= 350
+
+    # Las entradas más recientes siguen disponibles sin volver a renderizar
+    render = Renderer()
+    cache.get_or_render({'n': 9}, 'pdf', lambda: render('x'))
+    assert render.calls == 0
+
+def test_memory_evictions_are_served_from_disk(temp_dir):
+    """Prueba que lo que la memoria expulsa se lee del disco sin volver a renderizar."""
+    cache = RenderCache(temp_dir, max_memory_entries=1)
+    cache.get_or_render({'n': 1}, 'pdf', lambda: b'uno')
+    cache.get_or_render({'n': 2}, 'pdf', lambda: b'dos')
+    render = Renderer()
+
+    assert cache.get_or_render({'n': 1}, 'pdf', lambda: render('otro')) == b'uno'
+    assert render.calls == 0
+    assert len(os.listdir(temp_dir)) == 2
+
+def test_cache_without_directory_stays_in_memory():
+    """Prueba que sin directorio la caché solo usa memoria."""
+    cache = RenderCache()
+
+    assert cache.get_or_render({'n': 1}, 'pdf', lambda: b'pdf') == b'pdf'
+    assert cache.get_or_render({'n': 1}, 'pdf', lambda: b'otro') == b'pdf'
+
+def test_disk_entries_survive_restart(temp_dir):
+    """Prueba que una nueva instancia reutiliza lo que quedó en disco."""
+    RenderCache(temp_dir).get_or_render_path({'n': 1}, 'pdf', lambda: b'pdf')
+    render = Renderer()
+
+    data = RenderCache(temp_dir).get_or_render({'n': 1}, 'pdf', lambda: render('otro'))
+
+    assert data == b'pdf'
+    assert render.calls == 0
@@ -3,18 +3,14 @@ from decimal import Decimal
 from datetime import datetime
 import uuid
 import os
-import tempfile
+import re
+import io
+import json
+import time
 
 from src.models.models import Bill, Item, Diner
 from src.services.share_service import ShareService
 
-@pytest.fixture
-def temp_dir():
-    """Fixture para crear un directorio temporal."""
-    temp_dir = tempfile.mkdtemp()
-    yield temp_dir
-    os.rmdir(temp_dir)
-
 @pytest.fixture
 def sample_bill():
     """Fixture para crear una cuenta de ejemplo."""
@@ -78,6 +74,7 @@ def test_generate_pdf_summary(temp_dir, sample_bill):
     assert pdf_path is not None
     assert os.path.exists(pdf_path)
     assert pdf_path.endswith('.pdf')
+    assert os.path.dirname(pdf_path) == temp_dir
     
     # Limpiar
     os.remove(pdf_path)
@@ -133,4 +130,124 @@ def test_share_summary_email(temp_dir, sample_bill):
     service.temp_dir = temp_dir
     
     # TODO: Implementar prueba de email cuando se implemente la funcionalidad
-    pass 
\ No newline at end of file
+    pass
+
+def test_generate_all_summaries(temp_dir, sample_bill):
+    """Prueba la generación en paralelo de los PDFs de todos los comensales."""
+    service = ShareService()
+    service.temp_dir = temp_dir
+    
+    paths = service.generate_all_summaries(sample_bill, workers=2)
+    
+    # Un PDF por comensal, en el orden de los comensales
+    assert len(paths) == len(sample_bill.diners)
+    assert paths == sorted(paths)
+    for path in paths:
+        assert os.path.exists(path)
+        assert path.endswith('.pdf')
+        os.remove(path)
+
+def test_generate_all_summaries_combined(temp_dir, sample_bill):
+    """Prueba la generación de un único PDF con todos los comensales."""
+    service = ShareService()
+    service.temp_dir = temp_dir
+    
+    paths = service.generate_all_summaries(sample_bill, combined=True)
+    
+    assert len(paths) == 1
+    with open(paths[0], 'rb') as f:
+        # Una página por comensal
+        assert len(re.findall(rb'/Type\s*/Page\b', f.read())) == len(sample_bill.diners)
+    os.remove(paths[0])
+
+def test_render_pdf_in_memory(temp_dir):
+    """Prueba generar el PDF en memoria sin escribir en disco."""
+    service = ShareService(temp_dir)
+    
+    pdf = service.render_pdf({'items': {'Hamburguesa': 10.99, 'Refresco': 2.50}})
+    
+    assert isinstance(pdf, memoryview)
+    assert bytes(pdf[:4]) == b'%PDF'
+    # Solo la caché de render, ningún archivo de salida
+    assert os.listdir(temp_dir) == ['.render_cache']
+
+def test_write_json_to_stream(temp_dir):
+    """Prueba escribir el JSON en un stream proporcionado por el llamador."""
+    service = ShareService(temp_dir)
+    stream = io.BytesIO()
+    
+    service.write_json({'items': {'Refresco': 2.50}}, stream)
+    
+    assert json.loads(stream.getvalue()) == {'items': {'Refresco': 2.50}}
+    assert os.listdir(temp_dir) == []
+
+def test_repeated_share_uses_render_cache(temp_dir):
+    """Prueba que compartir dos veces la misma cuenta no vuelve a renderizar."""
+    service = ShareService(temp_dir)
+    bill_data = {'id': 1, 'items': {'Hamburguesa': 10.99}}
+    
+    first = service.render_pdf(bill_data)
+    second = service.render_pdf(bill_data)
+    assert bytes(first) == bytes(second)
+    assert service.render_cache.misses == 1
+    assert service.render_cache.hits == 1
+    
+    # Editar la cuenta produce un documento nuevo
+    bill_data['items']['Refresco'] = 2.50
+    assert 'Refresco' in service.generate_summary(bill_data)
+    assert service.render_cache.misses == 2
+
+def test_repeated_share_returns_existing_file(temp_dir):
+    """Prueba que compartir de nuevo una cuenta sin cambios no reescribe su PDF."""
+    service = ShareService(temp_dir)
+    bill_data = {'id': 1, 'created_at': '2024-01-01T12:30:00', 'items': {'Hamburguesa': 10.99}}
+    
+    path = service.share_bill(bill_data)
+    written = os.stat(path).st_mtime_ns
+    
+    assert service.share_bill(bill_data) == path
+    assert os.stat(path).st_mtime_ns == written
+    assert service._render_date(bill_data) == '2024-01-01 12:30'
+
+def test_shared_pdf_is_leased_outside_render_cache(temp_dir):
+    """Prueba que el PDF compartido no depende de la caché de render."""
+    service = ShareService(temp_dir)
+    bill_data = {'id': 1, 'items': {'Hamburguesa': 10.99}}
+    
+    path = service.share_bill(bill_data)
+    assert os.path.dirname(path) == temp_dir
+    
+    with service.lease(path):
+        # Editar la cuenta descarta el render anterior de la caché, no el archivo compartido
+        bill_data['items']['Refresco'] = 2.50
+        service.render_pdf(bill_data)
+        service.render_cache.clear()
+        service.cleanup()
+        assert os.path.exists(path)
+    
+    service.artifacts.discard([path])
+    assert not os.path.exists(path)
+
+def test_cleanup_keeps_files_shared_by_another_instance(temp_dir):
+    """Prueba que cleanup no borra un PDF que otra instancia sigue compartiendo."""
+    first, second = ShareService(temp_dir), ShareService(temp_dir)
+    bill_data = {'id': 1, 'created_at': '2024-01-01T12:30:00', 'items': {'Hamburguesa': 10.99}}
+    
+    path = first.share_bill(bill_data)
+    assert first.share_bill(bill_data) == second.share_bill(bill_data) == path
+    
+    first.cleanup()
+    assert os.path.exists(path)
+    second.cleanup()
+    assert not os.path.exists(path)
+
+def test_old_shares_are_left_to_the_artifact_store(temp_dir):
+    """Prueba que una instancia de larga vida no retiene sin límite lo que compartió."""
+    service = ShareService(temp_dir)
+    service.max_shared = 2
+    
+    paths = [service.share_bill({'id': i, 'items': {'Flan': 4.0 + i}}) for i in range(4)]
+    
+    assert list(service._shared) == paths[2:]
+    assert service.artifacts.sweep(now=time.time() + 2 * service.artifacts.ttl) == 2
+    assert [os.path.exists(p) for p in paths] == [False, False, True, True]
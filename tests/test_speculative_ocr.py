@@ -0,0 +1,135 @@
+import pytest
+import threading
+from concurrent.futures import CancelledError
+
+from src.services.image_quality import ImageQualityError, QualityVerdict
+from src.services.speculative_ocr import STAGES, SpeculativeOCR
+
+class FakeImage:
+    """Imagen ya decodificada (decode_image la devuelve tal cual)."""
+    shape = (10, 10)
+
+    def __init__(self, text):
+        self.text = text
+
+class FakeOCRService:
+    """
+    OCR de prueba con las mismas etapas que ``OCRService.process_image``:
+    la 'imagen' lleva el texto y ``gate`` bloquea Tesseract.
+    """
+
+    def __init__(self, gate=None, verdict=None):
+        self.verdict = verdict
+        self.gate = gate
+        self.recognized = []
+
+    def process_image(self, image, on_stage=None):
+        emit = on_stage or (lambda stage, value: None)
+        emit('decode', image)
+        emit('einvoice', None)
+        emit('quality', self.verdict)
+        if self.verdict is not None and not self.verdict.ok:
+            raise ImageQualityError(self.verdict)
+        emit('preprocess', image)
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.recognized.append(image.text)
+        emit('text', image.text)
+        if image.text is None:
+            # OCRService registra el error y devuelve {}
+            return {}
+        desc, price = image.text.rsplit(' ', 1)
+        items = {desc: float(price)}
+        emit('items', items)
+        return items
+
+def test_accept_reuses_result():
+    """Prueba que al confirmar se reutiliza el resultado ya calculado."""
+    service = FakeOCRService()
+    speculative = SpeculativeOCR(service)
+    try:
+        job = speculative.start(FakeImage('Hamburguesa 10.99'))
+        assert job.result(timeout=5) == {'Hamburguesa': 10.99}
+
+        assert speculative.accept().result(timeout=5) == {'Hamburguesa': 10.99}
+        assert service.recognized == ['Hamburguesa 10.99']
+        assert job.completed_stages() == list(STAGES)
+    finally:
+        speculative.shutdown()
+
+def test_stage_callbacks():
+    """Prueba que cada etapa notifica su progreso."""
+    speculative = SpeculativeOCR(FakeOCRService())
+    seen = []
+    done = threading.Event()
+    try:
+        job = speculative.start(FakeImage('Flan 4.00'))
+        job.on_stage(lambda stage, future: (seen.append(stage), stage == 'items' and done.set()))
+        assert done.wait(5)
+        assert sorted(seen, key=STAGES.index) == list(STAGES)
+    finally:
+        speculative.shutdown()
+
+def test_retake_cancels():
+    """Prueba que repetir la foto cancela el trabajo en curso."""
+    gate = threading.Event()
+    service = FakeOCRService(gate)
+    speculative = SpeculativeOCR(service)
+    try:
+        first = speculative.start(FakeImage('Refresco 2.50'))
+        first.futures['preprocess'].result(timeout=5)
+        speculative.retake()
+        gate.set()
+
+        assert first.cancelled
+        with pytest.raises(CancelledError):
+            first.result(timeout=5)
+
+        second = speculative.start(FakeImage('Café 1.50'))
+        assert speculative.accept().result(timeout=5) == {'Café': 1.5}
+        assert second.completed_stages()[-1] == 'items'
+    finally:
+        speculative.shutdown()
+
+def test_new_capture_replaces_previous():
+    """Prueba que una nueva captura cancela la anterior."""
+    gate = threading.Event()
+    speculative = SpeculativeOCR(FakeOCRService(gate))
+    try:
+        first = speculative.start(FakeImage('Refresco 2.50'))
+        second = speculative.start(FakeImage('Flan 4.00'))
+        gate.set()
+
+        assert first.cancelled
+        assert second.result(timeout=5) == {'Flan': 4.0}
+    finally:
+        speculative.shutdown()
+
+def test_quality_rejection_propagates():
+    """Prueba que una captura rechazada falla en las etapas siguientes."""
+    verdict = QualityVerdict(ok=False, reasons=['glare'])
+    service = FakeOCRService(verdict=verdict)
+    speculative = SpeculativeOCR(service)
+    try:
+        job = speculative.start(FakeImage('Flan 4.00'))
+        with pytest.raises(ImageQualityError):
+            job.result(timeout=5)
+        assert job.futures['quality'].result() is verdict
+        assert service.recognized == []
+    finally:
+        speculative.shutdown()
+
+def test_accept_without_capture():
+    """Prueba confirmar sin captura."""
+    with pytest.raises(RuntimeError):
+        SpeculativeOCR(FakeOCRService()).accept()
+
+def test_failed_ocr_fails_job():
+    """Prueba que un error del OCR falla el trabajo en lugar de devolver {}."""
+    speculative = SpeculativeOCR(FakeOCRService())
+    try:
+        job = speculative.start(FakeImage(None))
+        with pytest.raises(RuntimeError):
+            job.result(timeout=5)
+    finally:
+        speculative.shutdown()
@@ -0,0 +1,90 @@
+import pytest
+from decimal import Decimal
+
+from src.services.summary_renderer import CHANNELS, Channel, SummaryRenderer
+
+@pytest.fixture
+def view():
+    """Fixture con la vista de un comensal."""
+    return {
+        'name': 'Juan',
+        'date': '2024-01-01 21:00',
+        'items': [('Hamburguesa', Decimal('10.99')), ('Refresco', Decimal('2.50'))],
+        'subtotal': Decimal('13.49'),
+        'tip_amount': Decimal('2.025'),
+        'total': Decimal('15.515'),
+    }
+
+def test_render_clipboard(view):
+    """Prueba el resumen para el portapapeles."""
+    text = SummaryRenderer().render(view)
+
+    assert text.splitlines() == [
+        "Resumen de cuenta para Juan",
+        "Fecha: 2024-01-01 21:00",
+        "Hamburguesa: $10.99",
+        "Refresco: $2.50",
+        "Subtotal: $13.49",
+        "Propina: $2.03",
+        "Total: $15.52",
+    ]
+
+def test_format_currency():
+    """Prueba redondeo half-up, separadores y símbolo."""
+    assert SummaryRenderer().format_currency(1234.5) == "$1,234.50"
+    assert SummaryRenderer().format_currency(Decimal('0.125')) == "$0.13"
+    euros = SummaryRenderer(currency_symbol='€', thousands_sep='.', decimal_sep=',')
+    assert euros.format_currency(Decimal('1234567.891')) == "€1.234.567,89"
+
+def test_whatsapp_escapes_markup(view):
+    """Prueba que las descripciones no activan el formato de WhatsApp."""
+    view['items'] = [('Pizza *especial*', Decimal('9.00'))]
+    text = SummaryRenderer().render(view, 'whatsapp')
+
+    assert text.startswith("*Resumen de cuenta para Juan*")
+    assert "Pizza *especial*" not in text
+    assert "Pizza *\u200bespecial*\u200b" in text
+
+def test_control_characters_are_removed(view):
+    """Prueba que el ruido del OCR no rompe el mensaje."""
+    view['items'] = [('Ham\x0cburguesa\nDoble', Decimal('1.00'))]
+    text = SummaryRenderer().render(view)
+
+    assert "Hamburguesa Doble: $1.00" in text.splitlines()
+
+def test_length_limit_keeps_totals(view):
+    """Prueba que al recortar se conservan la cabecera y los totales."""
+    view['items'] = [(f'Plato {i}', Decimal('1.00')) for i in range(100)]
+    channels = dict(CHANNELS, sms=Channel(name='sms', header="{name}", line="{description} {price}",
+                                          footer="Total {total}", max_length=160))
+    text = SummaryRenderer(channels=channels).render(view, 'sms')
+
+    assert len(text) <= 160
+    assert text.startswith("Juan")
+    assert text.endswith("Total $15.52")
+    assert "ítems más" in text
+
+def test_render_views_batch(view):
+    """Prueba que el lote coincide con el render individual y mantiene el orden."""
+    renderer = SummaryRenderer()
+    other = dict(view, name='Ana', items=[('Café', Decimal('3.00'))])
+    views = [view, other] * 50
+
+    messages = renderer.render_views(views, 'email')
+
+    assert len(messages) == 100
+    assert messages[0] == renderer.render(view, 'email')
+    assert messages[1] == renderer.render(other, 'email')
+
+def test_template_with_custom_field_order(view):
+    """Prueba plantillas de ítem con el precio antes que la descripción."""
+    channels = {'ticket': Channel(name='ticket', header="{name} 100%", line="{price} {description}",
+                                  footer="{total}")}
+    text = SummaryRenderer(channels=channels).render(view, 'ticket')
+
+    assert text.splitlines()[:2] == ["Juan 100%", "$10.99 Hamburguesa"]
+
+def test_unknown_channel(view):
+    """Prueba que un canal desconocido es un error."""
+    with pytest.raises(ValueError):
+        SummaryRenderer().render(view, 'fax')